@@ -0,0 +1,42 @@
+import click
+import time
+from gitconsensus.comments import CommentRenderer
+from gitconsensus.votes import ABSTAIN, NO, VoteTally, YES
+
+
+def buildTally(voters, doubles=0):
+    tally = VoteTally()
+    for index in range(voters):
+        tally.add('voter%s' % (index,), [YES, NO, ABSTAIN][index % 3])
+    for index in range(doubles):
+        tally.exclude('voter%s' % (index,))
+    return tally
+
+
+def timeRender(tally, limit, runs):
+    renderer = CommentRenderer(limit)
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        comment = renderer.render('merged', tally, True, True)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, len(comment)
+
+
+@click.command()
+@click.option('--voters', multiple=True, type=int, help='Number of voters to render (repeatable).')
+@click.option('--doubles', default=0.1, help='Fraction of voters who voted twice and are excluded.')
+@click.option('--runs', default=5, help='Runs per size; the fastest is reported.')
+def main(voters, doubles, runs):
+    click.echo('%10s %12s %12s %12s' % ('Voters', 'Limited ms', 'Full ms', 'Full chars'))
+    for count in voters or [100, 1000, 10000, 100000]:
+        tally = buildTally(count, int(count * doubles))
+        limited = timeRender(tally, CommentRenderer().limit, runs)[0]
+        # Rendering without a limit shows that the cost stays linear however long the comment gets.
+        full, full_length = timeRender(tally, float('inf'), runs)
+        click.echo('%10s %12.2f %12.2f %12s' % (count, limited * 1000, full * 1000, full_length))
+
+
+if __name__ == '__main__':
+    main()
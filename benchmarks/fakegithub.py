@@ -0,0 +1,535 @@
+import base64
+import datetime
+import hashlib
+import http.server
+import json
+import multiprocessing
+import random
+import re
+import requests
+import threading
+import time
+from urllib.parse import parse_qs, urlencode, urlparse
+from gitconsensus.stats import getEndpoint
+
+default_rules = """
+version: 3
+extra_labels: true
+pull_requests:
+  quorum: 5
+  threshold: 0.65
+  merge_delay: 24
+  timeout: 720
+"""
+
+reaction_content = {
+    '+1': 'THUMBS_UP',
+    '-1': 'THUMBS_DOWN',
+    'confused': 'CONFUSED',
+    'laugh': 'LAUGH',
+    'heart': 'HEART',
+}
+
+repository_urls = [
+    'archive_url', 'assignees_url', 'blobs_url', 'branches_url', 'clone_url', 'collaborators_url', 'comments_url',
+    'commits_url', 'compare_url', 'contents_url', 'contributors_url', 'deployments_url', 'downloads_url',
+    'events_url', 'forks_url', 'git_commits_url', 'git_refs_url', 'git_tags_url', 'git_url', 'hooks_url',
+    'html_url', 'issue_comment_url', 'issue_events_url', 'issues_url', 'keys_url', 'labels_url', 'languages_url',
+    'merges_url', 'milestones_url', 'notifications_url', 'pulls_url', 'releases_url', 'ssh_url', 'stargazers_url',
+    'statuses_url', 'subscribers_url', 'subscription_url', 'svn_url', 'tags_url', 'teams_url', 'trees_url', 'url',
+]
+
+user_urls = [
+    'avatar_url', 'events_url', 'followers_url', 'following_url', 'gists_url', 'html_url', 'organizations_url',
+    'received_events_url', 'repos_url', 'starred_url', 'subscriptions_url', 'url',
+]
+
+
+def formatTimestamp(timestamp):
+    return timestamp.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class SyntheticRepository:
+    """A generated repository with `pulls` open pull requests, each with `reactions` votes, `files` changed files and
+    `commits` commits.
+
+    Pull requests are spread over the last `max_age` hours and get a mix of votes, so some pass, some fail and some are
+    old enough to be closed. The same seed always produces the same repository.
+    """
+
+    def __init__(self, owner, name, pulls=50, reactions=20, files=5, commits=3, max_age=1000, seed=0, rules=None):
+        self.owner = owner
+        self.name = name
+        # False leaves the repository without a .gitconsensus.yaml.
+        self.rules = default_rules if rules is None else rules
+        self.contributors = ['voter%s' % (index,) for index in range(0, reactions, 2)]
+        self.pulls = {}
+        self.comments = 0
+        self.merged = []
+        self.closed = []
+
+        rng = random.Random(seed)
+        now = datetime.datetime.utcnow().replace(microsecond=0)
+        for number in range(1, pulls + 1):
+            created_at = now - datetime.timedelta(hours=rng.randint(1, max_age))
+            commit_times = sorted(created_at + datetime.timedelta(minutes=rng.randint(0, 60)) for _ in range(commits))
+            support = rng.choice([0.2, 0.5, 0.9])
+            self.pulls[number] = {
+                'number': number,
+                'title': 'Synthetic pull request %s' % (number,),
+                'created_at': created_at,
+                'updated_at': commit_times[-1] if commit_times else created_at,
+                'state': 'open',
+                'labels': [],
+                'files': ['src/module%s/file%s.py' % (number, index) for index in range(files)],
+                'commits': [{'sha': '%040x' % (rng.getrandbits(160),), 'date': date} for date in commit_times],
+                'reactions': [{
+                    'id': number * 100000 + index,
+                    'content': '+1' if rng.random() < support else rng.choice(['-1', 'confused', 'heart']),
+                    'user': {'login': 'voter%s' % (index,)},
+                } for index in range(reactions)],
+            }
+            if files and number % 10 == 0:
+                self.pulls[number]['files'][0] = 'LICENSE'
+            if not commits:
+                self.pulls[number]['commits'] = [{'sha': '%040x' % (rng.getrandbits(160),), 'date': created_at}]
+
+    def getOpen(self):
+        return [pull for number, pull in sorted(self.pulls.items()) if pull['state'] == 'open']
+
+
+class FakeGithub:
+    """Answer the parts of the Github REST and GraphQL apis that gitconsensus uses, from synthetic repositories.
+
+    The server runs in its own process, so it adds neither memory nor CPU time to the process being measured. Every
+    request is delayed by `latency` seconds and counted; the counts are available from `getRequests()`.
+    """
+
+    def __init__(self, repositories, latency=0.0):
+        self.repositories = repositories
+        self.latency = latency
+        self.process = None
+        self.url = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        parent, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=serve, args=(self.repositories, self.latency, child), daemon=True)
+        self.process.start()
+        port = parent.recv()
+        self.url = 'http://127.0.0.1:%s' % (port,)
+
+    def stop(self):
+        if self.process:
+            self.process.terminate()
+            self.process.join()
+            self.process = None
+
+    def control(self, name):
+        # Control requests are answered outside the api prefix and are not counted.
+        return requests.get('%s/_fake/%s' % (self.url, name)).json()
+
+    def getRequests(self):
+        return self.control('requests')
+
+    def getState(self):
+        return self.control('state')
+
+
+def serve(repositories, latency, connection):
+    handler = FakeGithubHandler
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    httpd.daemon_threads = True
+    httpd.repositories = {'%s/%s' % (repository.owner, repository.name): repository for repository in repositories}
+    httpd.latency = latency
+    httpd.lock = threading.Lock()
+    httpd.requests = {'total': 0, 'reads': 0, 'writes': 0, 'not_modified': 0, 'endpoints': {}}
+    connection.send(httpd.server_address[1])
+    httpd.serve_forever()
+
+
+class FakeGithubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without this every keep-alive response waits on a delayed ACK.
+    disable_nagle_algorithm = True
+
+    routes = [
+        ('GET', r'/repos/([^/]+)/([^/]+)', 'getRepository'),
+        ('GET', r'/repos/([^/]+)/([^/]+)/contents/\.gitconsensus\.yaml', 'getRules'),
+        ('GET', r'/repos/([^/]+)/([^/]+)/contributors', 'getContributors'),
+        ('GET', r'/repos/([^/]+)/([^/]+)/collaborators', 'getCollaborators'),
+        ('GET', r'/repos/([^/]+)/([^/]+)/collaborators/([^/]+)', 'isCollaborator'),
+        ('GET', r'/repos/([^/]+)/([^/]+)/pulls/(\d+)', 'getPull'),
+        ('PATCH', r'/repos/([^/]+)/([^/]+)/pulls/(\d+)', 'updatePull'),
+        ('GET', r'/repos/([^/]+)/([^/]+)/pulls/(\d+)/files', 'getFiles'),
+        ('GET', r'/repos/([^/]+)/([^/]+)/pulls/(\d+)/commits', 'getPullCommits'),
+        ('PUT', r'/repos/([^/]+)/([^/]+)/pulls/(\d+)/merge', 'mergePull'),
+        ('GET', r'/repos/([^/]+)/([^/]+)/issues/(\d+)', 'getIssue'),
+        ('GET', r'/repos/([^/]+)/([^/]+)/issues/(\d+)/labels', 'getLabels'),
+        ('PUT', r'/repos/([^/]+)/([^/]+)/issues/(\d+)/labels', 'replaceLabels'),
+        ('POST', r'/repos/([^/]+)/([^/]+)/issues/(\d+)/comments', 'createComment'),
+        ('GET', r'/repos/([^/]+)/([^/]+)/issues/(\d+)/reactions', 'getReactions'),
+        ('GET', r'/repos/([^/]+)/([^/]+)/commits/([0-9a-f]+)', 'getCommit'),
+    ]
+
+    def do_GET(self):
+        self.dispatch()
+
+    do_POST = do_PUT = do_PATCH = do_GET
+
+    def log_message(self, *args):
+        pass
+
+    def dispatch(self):
+        url = urlparse(self.path)
+        self.query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        self.body = json.loads(self.rfile.read(length)) if length else None
+
+        if url.path.startswith('/_fake/'):
+            return self.control(url.path[len('/_fake/'):])
+
+        self.count(url.path)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if url.path == '/api/graphql':
+            return self.graphql()
+        if url.path.startswith('/api/v3/'):
+            path = url.path[len('/api/v3'):]
+            for method, pattern, name in self.routes:
+                match = re.fullmatch(pattern, path)
+                if method == self.command and match:
+                    repository = self.server.repositories.get('%s/%s' % match.groups()[:2])
+                    if repository:
+                        with self.server.lock:
+                            return getattr(self, name)(repository, *match.groups()[2:])
+        self.respond({'message': 'Not Found'}, 404)
+
+    def count(self, path):
+        with self.server.lock:
+            counts = self.server.requests
+            counts['total'] += 1
+            write = self.command not in ['GET', 'HEAD'] and path != '/api/graphql'
+            counts['writes' if write else 'reads'] += 1
+            endpoint = getEndpoint(path)
+            counts['endpoints'][endpoint] = counts['endpoints'].get(endpoint, 0) + 1
+
+    def control(self, name):
+        if name == 'requests':
+            return self.respond(self.server.requests)
+        state = {}
+        for full_name, repository in self.server.repositories.items():
+            state[full_name] = {
+                'open': [pull['number'] for pull in repository.getOpen()],
+                'merged': repository.merged,
+                'closed': repository.closed,
+                'comments': repository.comments,
+                'labels': {pull['number']: pull['labels'] for pull in repository.pulls.values() if pull['labels']},
+            }
+        self.respond(state)
+
+    def respond(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def respondPage(self, items):
+        per_page = int(self.query.get('per_page', 30))
+        page = int(self.query.get('page', 1))
+        last = max(1, (len(items) + per_page - 1) // per_page)
+        links = []
+        base = 'http://%s%s' % (self.headers['Host'], urlparse(self.path).path)
+        for rel, number in [('next', page + 1), ('last', last)]:
+            if page < last:
+                links.append('<%s?%s>; rel="%s"' % (base, urlencode(dict(self.query, page=number)), rel))
+        headers = {'Link': ', '.join(links)} if links else None
+        self.respond(items[(page - 1) * per_page:page * per_page], headers=headers)
+
+    def getUrl(self, *parts):
+        return '/'.join(['http://%s/api/v3' % (self.headers['Host'],)] + [str(part) for part in parts])
+
+    def getPullRecord(self, repository, number):
+        pull = repository.pulls.get(int(number))
+        if not pull:
+            self.respond({'message': 'Not Found'}, 404)
+        return pull
+
+    # Payloads
+
+    def buildUser(self, login, **extra):
+        user = {name: self.getUrl('users', login) for name in user_urls}
+        user.update({'login': login, 'id': int(hashlib.sha1(login.encode('utf-8')).hexdigest()[:6], 16), 'gravatar_id': '', 'type': 'User',
+                     'site_admin': False})
+        user.update(extra)
+        return user
+
+    def buildRepository(self, repository):
+        payload = {name: self.getUrl('repos', repository.owner, repository.name) for name in repository_urls}
+        payload.update({
+            'id': 1, 'name': repository.name, 'full_name': '%s/%s' % (repository.owner, repository.name),
+            'owner': self.buildUser(repository.owner), 'private': False, 'fork': False, 'archived': False,
+            'description': 'Synthetic benchmark repository', 'homepage': None, 'language': 'Python',
+            'default_branch': 'master', 'mirror_url': None, 'size': 1, 'forks_count': 0, 'network_count': 0,
+            'open_issues_count': len(repository.getOpen()), 'stargazers_count': 0, 'subscribers_count': 0,
+            'watchers_count': 0, 'has_downloads': True, 'has_issues': True, 'has_pages': False,
+            'has_projects': False, 'has_wiki': False, 'created_at': '2017-01-01T00:00:00Z',
+            'updated_at': '2017-01-01T00:00:00Z', 'pushed_at': '2017-01-01T00:00:00Z',
+            'permissions': {'admin': True, 'push': True, 'pull': True},
+        })
+        return payload
+
+    def buildLabel(self, repository, name):
+        return {'name': name, 'color': 'ededed', 'description': None,
+                'url': self.getUrl('repos', repository.owner, repository.name, 'labels', name)}
+
+    def buildDestination(self, repository, ref, sha):
+        return {'ref': ref, 'label': '%s:%s' % (repository.owner, ref), 'sha': sha,
+                'user': self.buildUser(repository.owner), 'repo': self.buildRepository(repository)}
+
+    def buildPull(self, repository, pull):
+        url = self.getUrl('repos', repository.owner, repository.name, 'pulls', pull['number'])
+        issue_url = self.getUrl('repos', repository.owner, repository.name, 'issues', pull['number'])
+        merged = pull['number'] in repository.merged
+        return {
+            'id': pull['number'], 'number': pull['number'], 'title': pull['title'], 'body': '', 'body_html': '',
+            'body_text': '', 'state': pull['state'], 'locked': False, 'active_lock_reason': None, 'draft': False,
+            'url': url, 'html_url': url, 'diff_url': url, 'patch_url': url, 'issue_url': issue_url,
+            'commits_url': url + '/commits', 'comments_url': issue_url + '/comments',
+            'review_comments_url': url + '/comments', 'review_comment_url': url + '/comments{/number}',
+            'statuses_url': url, 'user': self.buildUser('author'), 'assignee': None, 'assignees': [],
+            'requested_reviewers': [], 'requested_teams': [], 'milestone': None, 'labels': [],
+            'author_association': 'CONTRIBUTOR', 'created_at': formatTimestamp(pull['created_at']),
+            'updated_at': formatTimestamp(pull['updated_at']), 'closed_at': None, 'merged_at': None,
+            'merged': merged, 'merged_by': None, 'merge_commit_sha': None, 'mergeable': True,
+            'mergeable_state': 'clean', 'comments': 0, 'review_comments': 0, 'commits': len(pull['commits']),
+            'additions': len(pull['files']), 'deletions': 0, 'changed_files': len(pull['files']),
+            'head': self.buildDestination(repository, 'feature-%s' % (pull['number'],), pull['commits'][-1]['sha']),
+            'base': self.buildDestination(repository, 'master', '0' * 40),
+            '_links': {'self': {'href': url}, 'html': {'href': url}, 'issue': {'href': issue_url},
+                       'comments': {'href': issue_url + '/comments'}},
+        }
+
+    def buildIssue(self, repository, pull):
+        url = self.getUrl('repos', repository.owner, repository.name, 'issues', pull['number'])
+        return {
+            'id': pull['number'], 'number': pull['number'], 'title': pull['title'], 'body': '', 'body_html': '',
+            'body_text': '', 'state': pull['state'], 'locked': False, 'url': url, 'html_url': url,
+            'comments_url': url + '/comments', 'events_url': url + '/events', 'labels_url': url + '/labels{/name}',
+            'user': self.buildUser('author'), 'assignee': None, 'assignees': [], 'milestone': None,
+            'closed_by': None, 'comments': 0, 'created_at': formatTimestamp(pull['created_at']),
+            'updated_at': formatTimestamp(pull['updated_at']), 'closed_at': None,
+            'labels': [self.buildLabel(repository, name) for name in pull['labels']],
+            'pull_request': {'url': self.getUrl('repos', repository.owner, repository.name, 'pulls', pull['number'])},
+        }
+
+    def buildCommit(self, repository, commit):
+        url = self.getUrl('repos', repository.owner, repository.name, 'commits', commit['sha'])
+        author = {'name': 'author', 'email': 'author@example.com', 'date': formatTimestamp(commit['date'])}
+        return {
+            'sha': commit['sha'], 'url': url, 'html_url': url, 'comments_url': url + '/comments',
+            'author': self.buildUser('author'), 'committer': self.buildUser('author'), 'parents': [],
+            'commit': {'url': url, 'message': 'Synthetic commit', 'author': author, 'committer': author,
+                       'tree': {'sha': '0' * 40, 'url': url}, 'comment_count': 0},
+            'files': [], 'stats': {'additions': 0, 'deletions': 0, 'total': 0},
+        }
+
+    # REST endpoints
+
+    def getRepository(self, repository):
+        self.respond(self.buildRepository(repository))
+
+    def getRules(self, repository):
+        if not repository.rules:
+            return self.respond({'message': 'Not Found'}, 404)
+        sha = hashlib.sha1(repository.rules.encode('utf-8')).hexdigest()
+        etag = '"%s"' % (sha,)
+        if self.headers.get('If-None-Match') == etag:
+            self.server.requests['not_modified'] += 1
+            return self.respond(None, 304, {'ETag': etag})
+        content = base64.b64encode(repository.rules.encode('utf-8')).decode('ascii')
+        self.respond({'name': '.gitconsensus.yaml', 'path': '.gitconsensus.yaml', 'encoding': 'base64',
+                      'content': content, 'sha': sha}, headers={'ETag': etag})
+
+    def getContributors(self, repository):
+        self.respondPage([self.buildUser(login, contributions=1) for login in repository.contributors])
+
+    def getCollaborators(self, repository):
+        permissions = {'admin': True, 'push': True, 'pull': True}
+        self.respondPage([self.buildUser(repository.owner, permissions=permissions)])
+
+    def isCollaborator(self, repository, login):
+        self.respond(None, 204 if login == repository.owner else 404)
+
+    def getPull(self, repository, number):
+        pull = self.getPullRecord(repository, number)
+        if pull:
+            self.respond(self.buildPull(repository, pull))
+
+    def updatePull(self, repository, number):
+        pull = self.getPullRecord(repository, number)
+        if pull:
+            if self.body.get('state') == 'closed' and pull['state'] == 'open':
+                pull['state'] = 'closed'
+                repository.closed.append(pull['number'])
+            self.respond(self.buildPull(repository, pull))
+
+    def getFiles(self, repository, number):
+        pull = self.getPullRecord(repository, number)
+        if pull:
+            self.respondPage([{
+                'sha': '0' * 40, 'filename': filename, 'status': 'modified', 'additions': 1, 'deletions': 0,
+                'changes': 1, 'blob_url': '', 'raw_url': '', 'contents_url': '', 'patch': '',
+            } for filename in pull['files']])
+
+    def getPullCommits(self, repository, number):
+        pull = self.getPullRecord(repository, number)
+        if pull:
+            self.respondPage([self.buildCommit(repository, commit) for commit in pull['commits']])
+
+    def mergePull(self, repository, number):
+        pull = self.getPullRecord(repository, number)
+        if not pull:
+            return
+        if pull['state'] != 'open':
+            return self.respond({'message': 'Pull Request is not mergeable'}, 405)
+        if (self.body or {}).get('sha') not in [None, pull['commits'][-1]['sha']]:
+            return self.respond({'message': 'Head branch was modified. Review and try the merge again.'}, 409)
+        pull['state'] = 'closed'
+        repository.merged.append(pull['number'])
+        self.respond({'sha': pull['commits'][-1]['sha'], 'merged': True, 'message': 'Pull Request successfully merged'})
+
+    def getIssue(self, repository, number):
+        pull = self.getPullRecord(repository, number)
+        if pull:
+            self.respond(self.buildIssue(repository, pull))
+
+    def getLabels(self, repository, number):
+        pull = self.getPullRecord(repository, number)
+        if pull:
+            self.respondPage([self.buildLabel(repository, name) for name in pull['labels']])
+
+    def replaceLabels(self, repository, number):
+        pull = self.getPullRecord(repository, number)
+        if pull:
+            pull['labels'] = list(self.body if isinstance(self.body, list) else self.body.get('labels', []))
+            self.respond([self.buildLabel(repository, name) for name in pull['labels']])
+
+    def createComment(self, repository, number):
+        pull = self.getPullRecord(repository, number)
+        if pull:
+            repository.comments += 1
+            url = self.getUrl('repos', repository.owner, repository.name, 'issues', 'comments', repository.comments)
+            now = formatTimestamp(datetime.datetime.utcnow())
+            self.respond({
+                'id': repository.comments, 'url': url, 'html_url': url, 'body': self.body['body'], 'body_html': '',
+                'body_text': '', 'user': self.buildUser(repository.owner), 'created_at': now, 'updated_at': now,
+                'author_association': 'OWNER',
+                'issue_url': self.getUrl('repos', repository.owner, repository.name, 'issues', number),
+            }, 201)
+
+    def getReactions(self, repository, number):
+        pull = self.getPullRecord(repository, number)
+        if pull:
+            self.respondPage(pull['reactions'])
+
+    def getCommit(self, repository, sha):
+        for pull in repository.pulls.values():
+            for commit in pull['commits']:
+                if commit['sha'] == sha:
+                    return self.respond(self.buildCommit(repository, commit))
+        self.respond({'message': 'Not Found'}, 404)
+
+    # GraphQL
+
+    def graphql(self):
+        query = self.body['query']
+        variables = self.body.get('variables') or {}
+        if 'repositoryOwner(' in query:
+            return self.discover(variables)
+        repository = self.server.repositories.get('%s/%s' % (variables.get('owner'), variables.get('name')))
+        if not repository:
+            return self.respond({'data': {'repository': None}, 'errors': [{'message': 'Could not resolve to a Repository'}]})
+        full = 'files(first' in query
+        with self.server.lock:
+            if 'pullRequests(' in query:
+                first = int(re.search(r'pullRequests\([^)]*first: (\d+)', query).group(1))
+                offset = int(variables.get('cursor') or 0)
+                pulls = repository.getOpen()
+                page = pulls[offset:offset + first]
+                data = {'pullRequests': {
+                    'pageInfo': {'hasNextPage': offset + first < len(pulls), 'endCursor': str(offset + first)},
+                    'nodes': [self.buildNode(pull, full) for pull in page],
+                }}
+            elif 'pullRequest(number: $number)' in query:
+                pull = repository.pulls[variables['number']]
+                field = 'files' if full else 'reactions'
+                data = {'pullRequest': {field: self.buildConnection(pull, field, int(variables.get('cursor') or 0))}}
+            else:
+                data = {}
+                for alias, number in re.findall(r'(\w+): pullRequest\(number: (\d+)\)', query):
+                    data[alias] = self.buildNode(repository.pulls[int(number)], full)
+        self.respond({'data': {'repository': data}})
+
+    def discover(self, variables):
+        repositories = [repository for full_name, repository in sorted(self.server.repositories.items())
+                        if repository.owner == variables['owner']]
+        if not repositories:
+            return self.respond({'data': {'repositoryOwner': None}})
+        first = int(re.search(r'repositories\(first: (\d+)', self.body['query']).group(1))
+        offset = int(variables.get('cursor') or 0)
+        nodes = []
+        with self.server.lock:
+            for repository in repositories[offset:offset + first]:
+                rules = None
+                if repository.rules:
+                    rules = {'oid': hashlib.sha1(repository.rules.encode('utf-8')).hexdigest(), 'text': repository.rules}
+                nodes.append({'name': repository.name, 'isArchived': False,
+                              'pullRequests': {'totalCount': len(repository.getOpen())}, 'rules': rules})
+        self.respond({'data': {'repositoryOwner': {'repositories': {
+            'pageInfo': {'hasNextPage': offset + first < len(repositories), 'endCursor': str(offset + first)},
+            'nodes': nodes,
+        }}}})
+
+    def buildConnection(self, pull, field, offset, first=100):
+        items = pull[field][offset:offset + first]
+        if field == 'files':
+            nodes = [{'path': filename} for filename in items]
+        else:
+            nodes = [{'content': reaction_content[reaction['content']], 'user': reaction['user']} for reaction in items]
+        connection = {
+            'pageInfo': {'hasNextPage': offset + first < len(pull[field]), 'endCursor': str(offset + first)},
+            'nodes': nodes,
+        }
+        if field == 'reactions':
+            connection['totalCount'] = len(pull['reactions'])
+        return connection
+
+    def buildNode(self, pull, full):
+        reactions = pull['reactions']
+        node = {
+            'number': pull['number'],
+            'title': pull['title'],
+            'createdAt': formatTimestamp(pull['created_at']),
+            'updatedAt': formatTimestamp(pull['updated_at']),
+            'mergeable': 'MERGEABLE',
+            'headRefOid': pull['commits'][-1]['sha'],
+            'labels': {'nodes': [{'name': name} for name in pull['labels']]},
+            'latestReaction': {'totalCount': len(reactions), 'nodes': [{'id': str(reactions[-1]['id'])}] if reactions else []},
+        }
+        if full:
+            node['files'] = self.buildConnection(pull, 'files', 0)
+            node['reactions'] = self.buildConnection(pull, 'reactions', 0)
+            node['commits'] = {'nodes': [{'commit': {'authoredDate': formatTimestamp(pull['commits'][-1]['date'])}}]}
+        return node
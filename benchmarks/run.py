@@ -0,0 +1,158 @@
+import click
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from click.testing import CliRunner
+from benchmarks.fakegithub import FakeGithub, SyntheticRepository
+from gitconsensus.gitconsensus import cli
+
+commands = ['list', 'info', 'merge', 'close']
+
+
+def buildArguments(command, url, cache_dir, workers):
+    arguments = ['--github-url', url, '--write-interval', '0']
+    arguments += ['--cache-dir', cache_dir] if cache_dir else ['--no-cache']
+    arguments += [command, 'bench', 'repository']
+    if command == 'info':
+        arguments.append('1')
+    else:
+        arguments += ['--workers', str(workers)]
+    return arguments
+
+
+def runCommand(command, parameters, trace_memory=False, warm=False):
+    """Run one gitconsensus command end to end against a fresh fake Github and measure it.
+
+    With `warm` the command runs once beforehand to fill the response cache and state database, so the measured run
+    shows what repeated runs cost.
+    """
+    repository = SyntheticRepository('bench', 'repository', parameters['pulls'], parameters['reactions'],
+                                     parameters['files'], parameters['commits'], seed=parameters['seed'])
+    runner = CliRunner()
+    with FakeGithub([repository], parameters['latency']) as server, tempfile.TemporaryDirectory() as directory:
+        cache_dir = os.path.join(directory, 'cache') if parameters['cache'] else None
+        arguments = buildArguments(command, server.url, cache_dir, parameters['workers'])
+        # Credentials are read from the working directory.
+        with open(os.path.join(directory, '.gitcredentials'), 'w') as f:
+            f.write('0\nbenchmark-token\n')
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            if warm:
+                invoke(runner, arguments)
+            before = server.getRequests()
+            if trace_memory:
+                tracemalloc.start()
+            start = time.perf_counter()
+            invoke(runner, arguments)
+            seconds = time.perf_counter() - start
+            peak_memory = None
+            if trace_memory:
+                peak_memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+        finally:
+            os.chdir(cwd)
+        after = server.getRequests()
+        return {
+            'seconds': seconds,
+            'peak_memory': peak_memory,
+            'requests': after['total'] - before['total'],
+            'reads': after['reads'] - before['reads'],
+            'writes': after['writes'] - before['writes'],
+            'endpoints': {endpoint: count - before['endpoints'].get(endpoint, 0)
+                          for endpoint, count in after['endpoints'].items()
+                          if count - before['endpoints'].get(endpoint, 0)},
+            'state': server.getState()['bench/repository'],
+        }
+
+
+def invoke(runner, arguments):
+    result = runner.invoke(cli, arguments, catch_exceptions=False)
+    if result.exit_code != 0:
+        raise click.ClickException('gitconsensus %s failed:\n%s' % (' '.join(arguments), result.output))
+    return result
+
+
+def runBenchmarks(parameters, selected, runs=1, warm=False):
+    results = {}
+    for command in selected:
+        timings = [runCommand(command, parameters, warm=warm) for _ in range(runs)]
+        # Tracing allocations slows everything down, so memory is measured in a separate run.
+        traced = runCommand(command, parameters, trace_memory=True, warm=warm)
+        result = timings[0]
+        result['seconds'] = min(timing['seconds'] for timing in timings)
+        result['peak_memory'] = traced['peak_memory']
+        del result['state']
+        results[command] = result
+    return results
+
+
+def findRegressions(results, baseline, tolerance):
+    regressions = []
+    for command, expected in baseline['results'].items():
+        if command not in results:
+            continue
+        result = results[command]
+        # Request counts are deterministic, so any increase is a regression.
+        if result['requests'] > expected['requests']:
+            regressions.append('%s: %s requests, baseline %s' % (command, result['requests'], expected['requests']))
+        for metric in ['seconds', 'peak_memory']:
+            if expected.get(metric) and result[metric] > expected[metric] * (1 + tolerance):
+                regressions.append('%s: %s %s, baseline %s' % (command, metric, result[metric], expected[metric]))
+    return regressions
+
+
+def formatResults(results):
+    lines = ['%-8s %10s %9s %7s %7s %12s' % ('Command', 'Seconds', 'Requests', 'Reads', 'Writes', 'Peak MiB')]
+    for command, result in results.items():
+        lines.append('%-8s %10.3f %9s %7s %7s %12.2f' % (
+            command, result['seconds'], result['requests'], result['reads'], result['writes'],
+            result['peak_memory'] / (1024 * 1024)))
+    return '\n'.join(lines)
+
+
+@click.command()
+@click.option('--pulls', default=50, help='Open pull requests in the synthetic repository.')
+@click.option('--reactions', default=20, help='Reactions on each pull request.')
+@click.option('--files', default=5, help='Changed files in each pull request.')
+@click.option('--commits', default=3, help='Commits in each pull request.')
+@click.option('--latency', default=0.0, help='Milliseconds the fake server waits before answering each request.')
+@click.option('--workers', default=8, help='Value passed to --workers for list, merge and close.')
+@click.option('--seed', default=0, help='Seed used to generate the repository.')
+@click.option('--command', 'selected', multiple=True, type=click.Choice(commands), help='Command to run (repeatable, defaults to all).')
+@click.option('--runs', default=3, help='Timed runs per command; the fastest is reported.')
+@click.option('--cache/--no-cache', default=False, help='Give each command a response cache and state database.')
+@click.option('--warm', is_flag=True, help='Run each command once before measuring it (implies --cache).')
+@click.option('--output', default=None, help='Write the results as JSON to this file.')
+@click.option('--baseline', default=None, type=click.Path(exists=True), help='Fail if results regress from this JSON file.')
+@click.option('--tolerance', default=0.25, help='Allowed fractional increase in time and memory over the baseline.')
+def main(pulls, reactions, files, commits, latency, workers, seed, selected, runs, cache, warm, output, baseline, tolerance):
+    parameters = {
+        'pulls': pulls,
+        'reactions': reactions,
+        'files': files,
+        'commits': commits,
+        'latency': latency / 1000.0,
+        'workers': workers,
+        'seed': seed,
+        'cache': cache or warm,
+    }
+    results = runBenchmarks(parameters, selected or commands, runs, warm)
+    click.echo(formatResults(results))
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'parameters': parameters, 'results': results}, f, indent=2)
+
+    if baseline:
+        with open(baseline, 'r') as f:
+            regressions = findRegressions(results, json.load(f), tolerance)
+        if regressions:
+            click.echo('\n'.join(['', 'Regressions:'] + regressions))
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import click
+import time
+from benchmarks.fakegithub import formatTimestamp, SyntheticRepository
+from gitconsensus.simulation import buildVariants, Dataset, parseVariation, Simulator
+
+default_variations = [
+    'quorum=3,5,7,9,11',
+    'threshold=0.5,0.6,0.65,0.7,0.8',
+    'merge_delay=false,24,48,72',
+    'timeout=false,360,720',
+]
+
+
+def buildDataset(repository):
+    """Turn a SyntheticRepository into a dataset, with two out of every three pull requests already merged or closed."""
+    pull_requests = []
+    for number, pull in sorted(repository.pulls.items()):
+        state = ['open', 'merged', 'closed'][number % 3]
+        decided_at = pull['updated_at'] if state == 'open' else max(pull['updated_at'], pull['created_at'])
+        pull_requests.append({
+            'number': number,
+            'state': state,
+            'created_at': formatTimestamp(pull['created_at']),
+            'last_commit_at': formatTimestamp(pull['commits'][-1]['date']),
+            'decided_at': formatTimestamp(decided_at),
+            'mergeable': True,
+            'labels': pull['labels'],
+            'changes_license': any(filename.lower().startswith('license') for filename in pull['files']),
+            'changes_consensus': '.gitconsensus.yaml' in pull['files'],
+            'reactions': [{'user': reaction['user']['login'], 'content': reaction['content']}
+                          for reaction in pull['reactions']],
+        })
+    return {
+        'version': 1,
+        'repository': '%s/%s' % (repository.owner, repository.name),
+        'created_at': formatTimestamp(max(pull['updated_at'] for pull in repository.pulls.values())),
+        'rules': {'version': 3, 'pull_requests': {'quorum': 5, 'threshold': 0.65}},
+        'contributors': repository.contributors,
+        'collaborators': None,
+        'pull_requests': pull_requests,
+    }
+
+
+@click.command()
+@click.option('--pulls', default=5000, help='Pull requests in the dataset.')
+@click.option('--reactions', default=20, help='Reactions on each pull request.')
+@click.option('--vary', multiple=True, help='Rule values to try (defaults to a 300 variant grid).')
+@click.option('--scalar', is_flag=True, help='Use the Consensus class even when NumPy is installed.')
+def main(pulls, reactions, vary, scalar):
+    start = time.perf_counter()
+    dataset = Dataset(buildDataset(SyntheticRepository('bench', 'repository', pulls, reactions, files=2, commits=1)))
+    loaded = time.perf_counter()
+    variants = [rules for description, rules in buildVariants(dataset.rules, [parseVariation(text) for text in vary or default_variations])]
+    simulator = Simulator(dataset, vectorized=False if scalar else None)
+    for rules in variants:
+        simulator.simulate(rules)
+    finished = time.perf_counter()
+    click.echo('%s pull requests, %s rule variants, %s' % (len(dataset), len(variants), 'vectorized' if simulator.vectorized else 'scalar'))
+    click.echo('Load: %.3fs  Simulate: %.3fs  Per variant: %.2fms' % (
+        loaded - start, finished - loaded, (finished - loaded) * 1000 / len(variants)))
+
+
+if __name__ == '__main__':
+    main()
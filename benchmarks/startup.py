@@ -0,0 +1,92 @@
+import click
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.fakegithub import FakeGithub, SyntheticRepository
+from benchmarks.run import buildArguments
+
+commands = ['help', 'list', 'info', 'merge', 'close']
+
+
+def parseImportTimes(output):
+    """Return the cumulative microseconds of each top level import from `python -X importtime` output."""
+    imports = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2]
+        # Nested imports are indented below the module that imported them.
+        if name.startswith(' ') and not name.startswith('  '):
+            imports[name.strip()] = imports.get(name.strip(), 0) + int(parts[1])
+    return imports
+
+
+def measureStartup(arguments, directory, runs=5):
+    """Run the cli in a fresh interpreter `runs` times and report the fastest run and what it imported."""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'gitconsensus.gitconsensus'] + arguments,
+                                cwd=directory, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                env=dict(os.environ, PYTHONPATH=os.getcwd()), universal_newlines=True)
+        seconds = time.perf_counter() - start
+        if result.returncode != 0:
+            raise click.ClickException('gitconsensus %s failed:\n%s' % (' '.join(arguments), result.stderr[-2000:]))
+        if best is None or seconds < best['seconds']:
+            imports = parseImportTimes(result.stderr)
+            best = {
+                'seconds': seconds,
+                'import_seconds': sum(imports.values()) / 1000000,
+                'slowest': sorted(imports, key=imports.get, reverse=True)[:5],
+            }
+    return best
+
+
+def runStartup(selected, runs=5):
+    # One small pull request is enough for the commands to run end to end.
+    repository = SyntheticRepository('bench', 'repository', pulls=1, reactions=1, files=1, commits=1)
+    results = {}
+    with FakeGithub([repository]) as server, tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, '.gitcredentials'), 'w') as f:
+            f.write('0\nbenchmark-token\n')
+        for command in selected:
+            arguments = ['--help'] if command == 'help' else buildArguments(command, server.url, None, 1)
+            results[command] = measureStartup(arguments, directory, runs)
+    return results
+
+
+@click.command()
+@click.option('--command', 'selected', multiple=True, type=click.Choice(commands), help='Command to run (repeatable, defaults to all).')
+@click.option('--runs', default=5, help='Runs per command; the fastest is reported.')
+@click.option('--output', default=None, help='Write the results as JSON to this file.')
+@click.option('--baseline', default=None, type=click.Path(exists=True), help='Fail if startup is slower than in this JSON file.')
+@click.option('--tolerance', default=0.25, help='Allowed fractional increase in time over the baseline.')
+def main(selected, runs, output, baseline, tolerance):
+    results = runStartup(selected or commands, runs)
+    click.echo('%-8s %10s %10s  %s' % ('Command', 'Seconds', 'Imports', 'Slowest imports'))
+    for command, result in results.items():
+        click.echo('%-8s %10.3f %10.3f  %s' % (command, result['seconds'], result['import_seconds'], ', '.join(result['slowest'])))
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'results': results}, f, indent=2)
+
+    if baseline:
+        with open(baseline, 'r') as f:
+            expected = json.load(f)['results']
+        regressions = ['%s: %.3f seconds, baseline %.3f' % (command, result['seconds'], expected[command]['seconds'])
+                       for command, result in results.items()
+                       if command in expected and result['seconds'] > expected[command]['seconds'] * (1 + tolerance)]
+        if regressions:
+            click.echo('\n'.join(['', 'Regressions:'] + regressions))
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
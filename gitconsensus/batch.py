@@ -0,0 +1,144 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+columns = [
+    'number',
+    'voters',
+    'yes',
+    'no',
+    'contributors_yes',
+    'hours_since_update',
+    'changes_license',
+    'changes_consensus',
+    'blocked',
+    'mergeable',
+]
+
+boolean_columns = ['changes_license', 'changes_consensus', 'blocked', 'mergeable']
+
+# Reasons a pull request fails validation, in the order Consensus.validate checks them.
+UNCONFIGURED = 'unconfigured'
+BLOCKED = 'blocked'
+NOT_ALLOWED = 'not allowed'
+NOT_MERGEABLE = 'not mergeable'
+NO_QUORUM = 'no quorum'
+NOT_PASSING = 'not passing'
+TOO_NEW = 'too new'
+
+
+def requireNumpy():
+    if numpy is None:
+        raise ImportError('Batch evaluation requires numpy, install it with "pip install gitconsensus[batch]".')
+
+
+class PullRequestTable:
+    """The features consensus rules look at, with one array per feature and one row per pull request."""
+
+    def __init__(self, data):
+        requireNumpy()
+        self.size = len(data['number'])
+        for name in columns:
+            values = data.get(name)
+            if values is None:
+                values = [False] * self.size if name in boolean_columns else [0] * self.size
+            dtype = bool if name in boolean_columns else (float if name == 'hours_since_update' else numpy.int64)
+            array = numpy.asarray(values, dtype=dtype)
+            if array.shape != (self.size,):
+                raise ValueError('Column %s has %s rows, expected %s' % (name, len(array), self.size))
+            setattr(self, name, array)
+
+    def __len__(self):
+        return self.size
+
+    @classmethod
+    def fromPullRequests(cls, requests, rules=None):
+        """Build a table from PullRequest objects.
+
+        Changed files are only classified when `rules` has a lock, delay or delay override that depends on them, as
+        reading them can take extra requests.
+        """
+        needs_files = not rules or bool(rules.license_lock or rules.license_delay or
+                                        rules.consensus_lock or rules.consensus_delay or
+                                        (rules.merge_delay and rules.delay_override))
+        data = {name: [] for name in columns}
+        for request in requests:
+            data['number'].append(int(request.number))
+            data['voters'].append(len(request.users))
+            data['yes'].append(len(request.yes))
+            data['no'].append(len(request.no))
+            data['contributors_yes'].append(len(request.contributors_yes))
+            data['hours_since_update'].append(request.hoursSinceLastUpdate())
+            data['changes_license'].append(needs_files and request.changesLicense())
+            data['changes_consensus'].append(needs_files and request.changesConsensus())
+            data['blocked'].append(request.isBlocked())
+            data['mergeable'].append(bool(request.isMergeable()))
+        return cls(data)
+
+
+class BatchConsensus:
+    """Evaluate every pull request in a PullRequestTable at once with array operations.
+
+    Consensus remains the reference implementation; this gives the same decisions for the same features.
+    """
+
+    def __init__(self, rules):
+        requireNumpy()
+        self.rules = rules
+
+    def isAllowed(self, table):
+        allowed = numpy.ones(len(table), dtype=bool)
+        if self.rules.license_lock:
+            allowed &= ~table.changes_license
+        if self.rules.consensus_lock:
+            allowed &= ~table.changes_consensus
+        return allowed
+
+    def hasQuorum(self, table):
+        if not self.rules.quorum:
+            return numpy.ones(len(table), dtype=bool)
+        return table.voters >= self.rules.quorum
+
+    def hasVotes(self, table):
+        total = table.yes + table.no
+        if not self.rules.threshold:
+            return total > 0
+        ratio = table.yes / numpy.where(total > 0, total, 1)
+        return (total > 0) & (ratio >= self.rules.threshold)
+
+    def hasAged(self, table):
+        rules = self.rules
+        hours = table.hours_since_update
+        delayed = numpy.zeros(len(table), dtype=bool)
+        if rules.license_delay:
+            delayed |= table.changes_license & (hours < rules.license_delay)
+        if rules.consensus_delay:
+            delayed |= table.changes_consensus & (hours < rules.consensus_delay)
+        if not rules.merge_delay:
+            return ~delayed
+        aged = hours >= rules.merge_delay
+        if rules.delay_override:
+            override = ~table.changes_license & ~table.changes_consensus & (table.no == 0)
+            override &= table.contributors_yes >= rules.delay_override
+            if rules.merge_delay_min:
+                override &= hours >= rules.merge_delay_min
+            aged |= override
+        return aged & ~delayed
+
+    def evaluate(self, table):
+        """Return an array of decisions and an array with the first reason each pull request failed, or '' if it
+        passed."""
+        if not self.rules:
+            return numpy.zeros(len(table), dtype=bool), numpy.full(len(table), UNCONFIGURED, dtype=object)
+        failures = [
+            (table.blocked, BLOCKED),
+            (~self.isAllowed(table), NOT_ALLOWED),
+            (~table.mergeable, NOT_MERGEABLE),
+            (~self.hasQuorum(table), NO_QUORUM),
+            (~self.hasVotes(table), NOT_PASSING),
+            (~self.hasAged(table), TOO_NEW),
+        ]
+        reasons = numpy.select([failed for failed, reason in failures],
+                               [reason for failed, reason in failures], default='').astype(object)
+        return reasons == '', reasons
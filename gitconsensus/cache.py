@@ -0,0 +1,157 @@
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+default_max_entries = 5000
+
+# Seconds a cached response is served without contacting Github at all. Anything older is revalidated with a
+# conditional request, which returns a 304 (and does not count against the rate limit) when nothing has changed.
+default_ttls = [
+    (re.compile(r'/contents/\.gitconsensus\.yaml'), 300),
+    (re.compile(r'/(contributors|collaborators)(\?|$)'), 3600),
+]
+
+
+class ResponseCache:
+    """Store Github api responses on disk, keyed by url, along with the validators needed to revalidate them."""
+
+    def __init__(self, directory, ttl=0, ttls=None, max_entries=default_max_entries):
+        self.directory = directory
+        self.ttl = ttl
+        self.ttls = default_ttls if ttls is None else ttls
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self.entries = len(os.listdir(self.directory))
+
+    def key(self, request):
+        # Preview media types and credentials change what the api returns, so they are part of the key.
+        parts = [request.url, request.headers.get('Accept', ''), request.headers.get('Authorization', '')]
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key)
+
+    def ttlFor(self, url):
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return max(ttl, self.ttl)
+        return self.ttl
+
+    def get(self, key):
+        try:
+            with open(self.path(key), 'r') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def isFresh(self, entry):
+        return time.time() - entry['stored_at'] < self.ttlFor(entry['url'])
+
+    def store(self, key, response):
+        entry = {
+            'url': response.url,
+            'status': response.status_code,
+            'headers': dict(response.headers),
+            'body': base64.b64encode(response.content).decode('ascii'),
+            'stored_at': time.time(),
+        }
+        self.write(key, entry)
+        return entry
+
+    def touch(self, key, entry):
+        entry['stored_at'] = time.time()
+        self.write(key, entry)
+
+    def write(self, key, entry):
+        path = self.path(key)
+        temp = '%s.%s.tmp' % (path, threading.get_ident())
+        with open(temp, 'w') as f:
+            json.dump(entry, f)
+        with self.lock:
+            exists = os.path.exists(path)
+            os.replace(temp, path)
+            if not exists:
+                self.entries += 1
+                if self.entries > self.max_entries:
+                    self.evict()
+
+    def invalidate(self, key):
+        with self.lock:
+            try:
+                os.remove(self.path(key))
+                self.entries -= 1
+            except OSError:
+                pass
+
+    def evict(self):
+        # Drop the least recently stored or revalidated tenth of the cache.
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory)]
+        paths.sort(key=lambda path: os.path.getmtime(path))
+        for path in paths[:len(paths) - int(self.max_entries * 0.9)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.entries = len(os.listdir(self.directory))
+
+
+def buildResponse(entry, request):
+    response = Response()
+    response.status_code = entry['status']
+    response.headers = CaseInsensitiveDict(entry['headers'])
+    # The body is stored decoded, so the original transfer encodings no longer apply.
+    response.headers.pop('Content-Encoding', None)
+    response.headers.pop('Transfer-Encoding', None)
+    response.headers.pop('Content-Length', None)
+    response._content = base64.b64decode(entry['body'])
+    response.url = entry['url']
+    response.request = request
+    response.reason = 'OK'
+    response.encoding = 'utf-8'
+    response.from_cache = True
+    return response
+
+
+class CachingAdapter(BaseAdapter):
+    """Transport adapter that answers GET requests from a ResponseCache and revalidates them with ETags."""
+
+    def __init__(self, cache, adapter=None):
+        super(CachingAdapter, self).__init__()
+        self.cache = cache
+        self.adapter = adapter or HTTPAdapter()
+
+    def send(self, request, **kwargs):
+        key = self.cache.key(request)
+        if request.method != 'GET':
+            # Writes usually target the same url that is read back later, such as issue labels.
+            self.cache.invalidate(key)
+            return self.adapter.send(request, **kwargs)
+
+        entry = self.cache.get(key)
+        if entry:
+            if self.cache.isFresh(entry):
+                return buildResponse(entry, request)
+            headers = CaseInsensitiveDict(entry['headers'])
+            if 'ETag' in headers:
+                request.headers['If-None-Match'] = headers['ETag']
+            if 'Last-Modified' in headers:
+                request.headers['If-Modified-Since'] = headers['Last-Modified']
+
+        response = self.adapter.send(request, **kwargs)
+        if response.status_code == 304 and entry:
+            self.cache.touch(key, entry)
+            return buildResponse(entry, request)
+        if response.status_code == 200 and ('ETag' in response.headers or 'Last-Modified' in response.headers):
+            self.cache.store(key, response)
+        return response
+
+    def close(self):
+        self.adapter.close()
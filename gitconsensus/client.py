@@ -0,0 +1,26 @@
+import github3
+import os
+from gitconsensus.cache import CachingAdapter, ResponseCache
+from gitconsensus.ratelimit import RateLimitAdapter, RequestScheduler
+from gitconsensus.stats import StatsAdapter
+from gitconsensus.transport import Transport
+
+
+def getClient(token, cache_dir=None, cache_ttl=0, scheduler=None, url=None, transport=None):
+    if url:
+        client = github3.enterprise_login(token=token, url=url)
+    else:
+        client = github3.login(token=token)
+    # Every request, from github3 or githubApiRequest, passes through the rate limit scheduler. Cached responses that
+    # are still fresh are answered before reaching it.
+    client.request_scheduler = scheduler or RequestScheduler()
+    transport = transport or Transport()
+    transport.configure(client.session)
+    adapter = RateLimitAdapter(client.request_scheduler, transport.buildAdapter())
+    if cache_dir:
+        cache = ResponseCache(os.path.join(cache_dir, 'responses'), ttl=cache_ttl)
+        adapter = CachingAdapter(cache, adapter)
+    adapter = StatsAdapter(adapter=adapter)
+    client.session.mount('https://', adapter)
+    client.session.mount('http://', adapter)
+    return client
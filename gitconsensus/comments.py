@@ -0,0 +1,115 @@
+import io
+from gitconsensus.votes import ABSTAIN, NO, YES
+
+# Github rejects comments longer than this many characters.
+max_comment_length = 65536
+
+totals_template = """
+This Pull Request has been %s by [GitConsensus](https://www.gitconsensus.com/).
+
+## Vote Totals
+
+| Yes | No | Abstain | Voters |
+| --- | -- | ------- | ------ |
+| %s  | %s | %s      | %s     |
+
+
+## Vote Breakdown
+
+"""
+
+results_template = """
+
+
+## Vote Results
+
+| Criteria   | Result |
+| ---------- | ------ |
+| Has Quorum | %s     |
+| Has Votes  | %s     |
+
+"""
+
+table_header = '| User | Yes | No | Abstain |\n|--------|-----|----|----|'
+table_row = '\n| [%s](https://github.com/%s) | %s | %s | %s |'
+table_overflow = '\n| %s more voters are not listed |  |  |  |'
+
+doubles_intro = '\n\n\nThe following users voted for multiple options and were exlcuded: \n'
+doubles_entry = '[%s](https://github.com/%s)'
+doubles_overflow = ' and %s more'
+
+# The marks for each column, with the original column widths, by whether the user picked that option.
+marks = {
+    YES: ('✔', '   '),
+    NO: ('✔', '  '),
+    ABSTAIN: ('✔', '  '),
+}
+
+
+def iterTableRows(votes):
+    for username, options in votes.items():
+        picked = set(options)
+        row = table_row % (username, username, marks[YES][YES not in picked], marks[NO][NO not in picked],
+                           marks[ABSTAIN][ABSTAIN not in picked])
+        # Without prevent_doubles a user who picked several options has a row for each vote, as in the totals.
+        for _ in options:
+            yield row
+
+
+def iterDoubles(doubles):
+    for index, username in enumerate(doubles):
+        yield (', ' if index else '') + doubles_entry % (username, username)
+
+
+def writeLimited(buffer, parts, count, budget, overflow):
+    """Write `parts` to `buffer` until the next one would pass `budget` characters, then say how many were left out.
+
+    Room for the overflow line is always kept, so the written text never exceeds the budget. Returns the number of
+    characters written.
+    """
+    reserve = len(overflow % (count,))
+    written = 0
+    for index, part in enumerate(parts):
+        # The last part needs no room kept after it.
+        if written + len(part) + (reserve if index < count - 1 else 0) > budget:
+            note = overflow % (count - index,)
+            buffer.write(note)
+            return written + len(note)
+        buffer.write(part)
+        written += len(part)
+    return written
+
+
+class CommentRenderer:
+    """Render the comment left on a merged or closed pull request in time linear in the number of voters.
+
+    Rows are streamed into a single buffer. When the comment would pass `limit` characters the vote table, and the list
+    of users who voted twice, stop early and say how many entries were left out, so Github never rejects the comment.
+    The totals always count every vote.
+    """
+
+    def __init__(self, limit=max_comment_length):
+        self.limit = limit
+
+    def render(self, action, tally, has_quorum, has_votes):
+        totals = totals_template % (action, tally.counts[YES], tally.counts[NO], tally.counts[ABSTAIN], tally.total)
+        results = results_template % (has_quorum, has_votes)
+        budget = self.limit - len(totals) - len(table_header) - len(results)
+
+        doubles_budget = 0
+        if tally.doubles:
+            budget -= len(doubles_intro)
+            # The vote table matters more, so the list of excluded users gets at most a quarter of the space.
+            doubles_length = sum(len(part) for part in iterDoubles(tally.doubles))
+            doubles_budget = min(doubles_length, budget // 4)
+            budget -= doubles_budget
+
+        buffer = io.StringIO()
+        buffer.write(totals)
+        buffer.write(table_header)
+        writeLimited(buffer, iterTableRows(tally.votes), tally.total, budget, table_overflow)
+        buffer.write(results)
+        if tally.doubles:
+            buffer.write(doubles_intro)
+            writeLimited(buffer, iterDoubles(tally.doubles), len(tally.doubles), doubles_budget, doubles_overflow)
+        return buffer.getvalue()
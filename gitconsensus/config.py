@@ -1,24 +1,34 @@
 import os
-import yaml
 
-settings = False
-cwd = os.getcwd()
-path = "%s/%s" % (os.getcwd(), '/.gitconsensus.yaml')
+# The local .gitconsensus.yaml is read the first time it is asked for, not whenever the cli starts.
+settings = None
 
 
 def getSettings():
     global settings
+    if settings is None:
+        return reloadSettings()
     return settings
 
 
 def reloadSettings():
     global settings
+    import yaml
+    settings = False
+    path = os.path.join(os.getcwd(), '.gitconsensus.yaml')
     if os.path.isfile(path):
         with open(path, 'r') as f:
             settings = yaml.safe_load(f)
     return settings
 
 
+def getCacheDir():
+    if os.environ.get('GITCONSENSUS_CACHE_DIR'):
+        return os.environ['GITCONSENSUS_CACHE_DIR']
+    cache_home = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(cache_home, 'gitconsensus')
+
+
 def getGitToken():
     token = id = ''
     with open("%s/%s" % (os.getcwd(), '/.gitcredentials'), 'r') as fd:
@@ -27,5 +37,3 @@ def getGitToken():
             "token": fd.readline().strip()
         }
     return False
-
-reloadSettings()
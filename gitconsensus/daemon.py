@@ -0,0 +1,125 @@
+import heapq
+import time
+import traceback
+import yaml
+from gitconsensus.engine import default_workers, Engine
+from gitconsensus.repository import Repository
+
+default_interval = 900
+default_rules_ttl = 3600
+default_contributors_ttl = 3600
+default_commands = ['merge', 'close']
+
+
+def loadServeConfig(path):
+    """Read the list of repositories to serve.
+
+    ```yaml
+    interval: 900
+    repositories:
+      - name: gitconsensus/GitConsensusCLI
+        interval: 300
+        commands: [merge, close]
+    ```
+    """
+    with open(path, 'r') as f:
+        settings = yaml.safe_load(f) or {}
+    if not settings.get('repositories'):
+        raise ValueError('%s does not list any repositories.' % (path,))
+    return settings
+
+
+class RepositoryJob:
+    """Periodically process one repository, keeping its rules and contributor lists warm between ticks."""
+
+    def __init__(self, client, name, commands=None, interval=default_interval, workers=default_workers, state=None,
+                 rules_ttl=default_rules_ttl, contributors_ttl=default_contributors_ttl):
+        self.client = client
+        self.user, self.name = name.split('/', 1)
+        self.commands = commands or default_commands
+        self.interval = interval
+        self.workers = workers
+        self.state = state
+        self.rules_ttl = rules_ttl
+        self.contributors_ttl = contributors_ttl
+        self.repository = None
+        self.rules_loaded = 0
+        self.contributors_loaded = 0
+
+    def getRepository(self):
+        now = time.time()
+        if not self.repository:
+            self.repository = Repository(self.user, self.name, self.client, self.state)
+            self.rules_loaded = self.contributors_loaded = now
+        if now - self.rules_loaded >= self.rules_ttl:
+            self.repository.loadRules()
+            self.rules_loaded = now
+        if now - self.contributors_loaded >= self.contributors_ttl:
+            self.repository.refreshMembers()
+            self.contributors_loaded = now
+        return self.repository
+
+    def expireRules(self):
+        # The next getRepository call reloads the rules.
+        self.rules_loaded = 0
+
+    def run(self, report=None):
+        engine = Engine(self.getRepository(), self.workers)
+        if 'merge' in self.commands:
+            engine.merge(report)
+        if 'close' in self.commands:
+            engine.close(report)
+        if report and getattr(self.client, 'request_scheduler', None):
+            metrics = self.client.request_scheduler.getMetrics()
+            report('Processed %s/%s, requests: %s, retries: %s, remaining: %s' % (
+                self.user, self.name, metrics['requests'], metrics['retries'], metrics.get('core_remaining')))
+
+
+class Scheduler:
+    """Run every job at its own interval, earliest due first."""
+
+    def __init__(self, jobs, report=None, sleep=time.sleep, after=None):
+        self.report = report
+        self.sleep = sleep
+        self.after = after
+        self.queue = [(time.time(), index, job) for index, job in enumerate(jobs)]
+        heapq.heapify(self.queue)
+
+    def runOnce(self):
+        due, index, job = heapq.heappop(self.queue)
+        delay = due - time.time()
+        if delay > 0:
+            self.sleep(delay)
+        try:
+            job.run(self.report)
+        except Exception:
+            # One failing repository should not stop the others from being processed.
+            if self.report:
+                self.report('Error processing %s/%s:\n%s' % (job.user, job.name, traceback.format_exc()))
+        if self.after:
+            self.after()
+        heapq.heappush(self.queue, (time.time() + job.interval, index, job))
+
+    def run(self, ticks=None):
+        while ticks is None or ticks > 0:
+            self.runOnce()
+            if ticks is not None:
+                ticks -= 1
+
+
+def buildJobs(settings, client, state=None):
+    jobs = []
+    for entry in settings['repositories']:
+        if isinstance(entry, str):
+            entry = {'name': entry}
+        jobs.append(RepositoryJob(
+            client,
+            entry['name'],
+            commands=entry.get('commands', settings.get('commands')),
+            interval=entry.get('interval', settings.get('interval', default_interval)),
+            workers=entry.get('workers', settings.get('workers', default_workers)),
+            state=state,
+            rules_ttl=entry.get('rules_ttl', settings.get('rules_ttl', default_rules_ttl)),
+            contributors_ttl=entry.get('contributors_ttl', settings.get('contributors_ttl', default_contributors_ttl)),
+        ))
+    return jobs
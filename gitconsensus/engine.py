@@ -0,0 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
+from gitconsensus.planner import Executor, Planner
+
+default_workers = 8
+default_repository_workers = 4
+
+
+def parallelMap(function, items, workers=default_workers, executor=None):
+    """Apply function to every item using up to `workers` threads, returning results in the original order.
+
+    An `executor` shared between callers is used instead of a new pool, so their combined concurrency stays capped.
+    """
+    items = [item for item in items]
+    if executor and len(items) > 1:
+        return [result for result in executor.map(function, items)]
+    if workers <= 1 or len(items) <= 1:
+        return [function(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        return [result for result in executor.map(function, items)]
+
+
+class Engine:
+    """Fetch and evaluate pull requests concurrently.
+
+    Only reads happen inside the worker threads. Results are handed back sorted by pull request number so callers can
+    perform merges, closes and label changes one at a time in a stable order.
+    """
+
+    def __init__(self, repository, workers=default_workers, executor=None):
+        self.repository = repository
+        self.workers = workers
+        self.executor = executor
+
+    def getPullRequests(self):
+        requests = self.repository.getPullRequests(workers=self.workers, executor=self.executor)
+        return sorted(requests, key=lambda request: int(request.number))
+
+    def evaluate(self, check):
+        requests = self.getPullRequests()
+        results = parallelMap(check, requests, self.workers, self.executor)
+        return [(request, result) for request, result in zip(requests, results)]
+
+    def merge(self, report=None):
+        Executor(self.repository).apply(Planner(self).planMerge(), report)
+
+    def close(self, report=None):
+        Executor(self.repository).apply(Planner(self).planClose(), report)
@@ -1,21 +1,57 @@
 import click
-import github3
+import json
 import os
-import random
-import requests
 from gitconsensus import config
-from gitconsensus.repository import Repository
-import string
+from gitconsensus import planner
+from gitconsensus.engine import default_repository_workers, default_workers, Engine
+
+# Dependencies such as github3, requests and numpy take most of the startup time, so they are imported by the commands
+# that need them rather than here.
 
 @click.group()
+@click.option('--cache/--no-cache', default=None, help='Cache Github api responses and pull request state on disk (on when a cache directory is set).')
+@click.option('--cache-dir', default=None, envvar='GITCONSENSUS_CACHE_DIR', help='Directory for cached data, which turns the cache on (defaults to ~/.cache/gitconsensus).')
+@click.option('--cache-ttl', default=0, help='Seconds to reuse cached responses before revalidating them.')
+@click.option('--incremental/--full', default=True, help='Skip refetching pull requests that have not changed since the last run.')
+@click.option('--github-url', default=None, envvar='GITCONSENSUS_GITHUB_URL', help='Base url of a Github Enterprise server.')
+@click.option('--write-interval', default=None, type=click.FloatRange(0), help='Minimum seconds between write requests (defaults to 1).')
+@click.option('--pool-size', default=None, type=click.IntRange(1), help='Maximum open connections to Github, keep it above --workers (defaults to 32).')
+@click.option('--keep-alive/--no-keep-alive', default=True, help='Reuse connections between requests.')
+@click.option('--connect-timeout', default=None, type=click.FloatRange(0), help='Seconds to wait for a connection to Github (defaults to 10).')
+@click.option('--timeout', 'read_timeout', default=None, type=click.FloatRange(0), help='Seconds to wait for Github to respond (defaults to 60).')
+@click.option('--http2', is_flag=True, help='Multiplex requests over HTTP/2 connections (requires httpx).')
+@click.option('--stats', is_flag=True, help='Print request and timing statistics when the command finishes.')
+@click.option('--stats-file', default=None, help='Write statistics as JSON, or as a Prometheus textfile if it ends in .prom.')
 @click.pass_context
-def cli(ctx):
+def cli(ctx, cache, cache_dir, cache_ttl, incremental, github_url, write_interval, pool_size, keep_alive, connect_timeout,
+        read_timeout, http2, stats, stats_file):
     if ctx.parent:
         print(ctx.parent.get_help())
+    if stats or stats_file:
+        from gitconsensus.stats import collector
+        collector.enabled = True
+        ctx.call_on_close(lambda: report_stats(stats, stats_file))
+    ctx.obj = {
+        # Nothing is written to disk unless asked for, with --cache or by naming a cache directory.
+        'cache_dir': (cache_dir or config.getCacheDir()) if (cache or (cache is None and cache_dir)) else None,
+        'cache_ttl': cache_ttl,
+        'incremental': incremental,
+        'github_url': github_url,
+        'write_interval': write_interval,
+        'pool_size': pool_size,
+        'keep_alive': keep_alive,
+        'connect_timeout': connect_timeout,
+        'read_timeout': read_timeout,
+        'http2': http2,
+        'stats_file': stats_file,
+    }
 
 
 @cli.command(short_help="Obtain an authorization token")
 def auth():
+    import github3
+    import random
+    import string
     username = click.prompt('Username')
     password = click.prompt('Password', hide_input=True)
     def twofacallback(*args):
@@ -42,6 +78,7 @@ def init(template):
         click.echo('.gitconsensus.yaml already exists.')
         exit(-1)
 
+    import requests
     baseurl = 'https://raw.githubusercontent.com/gitconsensus/gitconsensus_examples/master/examples/%s/.gitconsensus.yaml'
     url = baseurl % (template)
     response = requests.get(url)
@@ -57,11 +94,12 @@ def init(template):
 @cli.command(short_help="List open pull requests and their status")
 @click.argument('username')
 @click.argument('repository_name')
-def list(username, repository_name):
+@click.option('--workers', default=default_workers, type=click.IntRange(1), help='Number of pull requests to fetch and evaluate concurrently.')
+def list(username, repository_name, workers):
     repo = get_repository(username, repository_name)
-    requests = repo.getPullRequests()
-    for request in requests:
-        click.echo("PR#%s: %s" % (request.number, request.validate()))
+    engine = Engine(repo, workers)
+    for request, valid in engine.evaluate(lambda request: request.validate()):
+        click.echo("PR#%s: %s" % (request.number, valid))
 
 
 @cli.command(short_help="Display detailed information about a specific pull request")
@@ -108,30 +146,118 @@ def forceclose(username, repository_name, pull_request):
 @cli.command(short_help="Merge open pull requests that validate")
 @click.argument('username')
 @click.argument('repository_name')
-def merge(username, repository_name):
+@click.option('--workers', default=default_workers, type=click.IntRange(1), help='Number of pull requests to fetch and evaluate concurrently.')
+@click.option('--dry-run', is_flag=True, help='Print the planned actions as JSON instead of performing them.')
+@click.option('--plan-file', default=None, help='Save the planned actions to this file instead of performing them.')
+def merge(username, repository_name, workers, dry_run, plan_file):
     repo = get_repository(username, repository_name)
-    requests = repo.getPullRequests()
-    for request in requests:
-        if request.validate():
-            click.echo("Merging PR#%s" % (request.number,))
-            request.vote_merge()
-        else:
-            request.addInfoLabels()
+    plan = planner.Planner(Engine(repo, workers)).planMerge()
+    run_plan(repo, plan, dry_run, plan_file)
 
 
 @cli.command(short_help="Close older unmerged opened pull requests")
 @click.argument('username')
 @click.argument('repository_name')
-def close(username, repository_name):
+@click.option('--workers', default=default_workers, type=click.IntRange(1), help='Number of pull requests to fetch and evaluate concurrently.')
+@click.option('--dry-run', is_flag=True, help='Print the planned actions as JSON instead of performing them.')
+@click.option('--plan-file', default=None, help='Save the planned actions to this file instead of performing them.')
+def close(username, repository_name, workers, dry_run, plan_file):
+    repo = get_repository(username, repository_name)
+    plan = planner.Planner(Engine(repo, workers)).planClose()
+    run_plan(repo, plan, dry_run, plan_file)
+
+
+@cli.command('org-merge', short_help="Merge open pull requests that validate in every configured repository of an organization")
+@click.argument('owner')
+@click.option('--workers', default=default_workers, type=click.IntRange(1), help='Maximum pull requests fetched and evaluated at once, across all repositories.')
+@click.option('--repositories', 'repository_workers', default=default_repository_workers, type=click.IntRange(1), help='Number of repositories to process at once.')
+@click.option('--dry-run', is_flag=True, help='Print the planned actions as JSON instead of performing them.')
+def org_merge(owner, workers, repository_workers, dry_run):
+    from gitconsensus.organization import OrganizationScan
+    scan = OrganizationScan(get_client(), owner, get_state(), workers, repository_workers)
+    try:
+        if dry_run:
+            click.echo(json.dumps(scan.planMerge(lambda message: click.echo(message, err=True)), indent=2))
+        else:
+            scan.merge(click.echo)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+
+@cli.command(short_help="Perform the actions from a saved merge or close plan")
+@click.argument('plan_file', type=click.Path(exists=True))
+def apply(plan_file):
+    try:
+        plan = planner.loadPlan(plan_file)
+        username, repository_name = plan['repository'].split('/', 1)
+        repo = get_repository(username, repository_name)
+        planner.Executor(repo).apply(plan, click.echo)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+
+@cli.command(short_help="Save recent pull requests and their votes for simulate")
+@click.argument('username')
+@click.argument('repository_name')
+@click.argument('dataset_file')
+@click.option('--limit', default=1000, type=click.IntRange(1), help='Number of recent pull requests to save.')
+def dataset(username, repository_name, dataset_file, limit):
+    from gitconsensus import simulation
     repo = get_repository(username, repository_name)
-    requests = repo.getPullRequests()
-    for request in requests:
-        if request.isBlocked():
-            continue
-        if request.shouldClose():
-            click.echo("Closing PR#%s" % (request.number,))
-            request.addInfoLabels()
-            request.close()
+    data = simulation.buildDataset(repo, limit)
+    simulation.saveDataset(data, dataset_file)
+    click.echo("Saved %s pull requests to %s" % (len(data['pull_requests']), dataset_file))
+
+
+@cli.command(short_help="Replay saved pull requests against candidate consensus rules")
+@click.argument('dataset_file', type=click.Path(exists=True))
+@click.argument('rules_files', nargs=-1, type=click.Path(exists=True))
+@click.option('--vary', multiple=True, help='Rule values to try, such as quorum=3,5,7 (repeatable).')
+@click.option('--json', 'as_json', is_flag=True, help='Print the results as JSON.')
+def simulate(dataset_file, rules_files, vary, as_json):
+    import yaml
+    from gitconsensus import simulation
+    data = simulation.Dataset.load(dataset_file)
+    try:
+        variations = [simulation.parseVariation(text) for text in vary]
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--vary')
+
+    bases = []
+    for rules_file in rules_files:
+        with open(rules_file, 'r') as f:
+            bases.append((rules_file, yaml.safe_load(f) or {}))
+    if not bases:
+        if not data.rules:
+            raise click.UsageError('The dataset has no rules, pass one or more rules files.')
+        bases.append(('current', data.rules))
+
+    simulator = simulation.Simulator(data)
+    results = []
+    for name, settings in bases:
+        for description, rules in simulation.buildVariants(settings, variations):
+            result = simulator.simulate(rules)
+            result['rules'] = ' '.join(part for part in [name if len(bases) > 1 or not description else '', description] if part)
+            results.append(result)
+
+    if as_json:
+        click.echo(json.dumps(results, indent=2))
+        return
+    width = max(len('Rules'), max(len(result['rules']) for result in results))
+    click.echo("%s  %7s  %7s  %7s  %7s" % ('Rules'.ljust(width), 'Merged', 'Closed', 'Open', 'Changed'))
+    for result in results:
+        click.echo("%s  %7s  %7s  %7s  %7s" % (
+            result['rules'].ljust(width), result['merged'], result['closed'], result['open'], result['changed']))
+
+
+def run_plan(repo, plan, dry_run, plan_file):
+    if plan_file:
+        planner.savePlan(plan, plan_file)
+        click.echo("Saved %s actions to %s" % (len(plan['actions']), plan_file))
+    elif dry_run:
+        click.echo(json.dumps(plan, indent=2))
+    else:
+        planner.Executor(repo).apply(plan, click.echo)
 
 
 @cli.command(short_help="Add labels and set colors")
@@ -152,10 +278,78 @@ def createlabels(username, repository_name, color_negative, color_positive, colo
     repo.setLabelColor('gc-closed', color_negative)
 
 
-def get_repository(username, repository_name):
+@cli.command(short_help="Continuously process the repositories listed in a config file")
+@click.argument('config_file', type=click.Path(exists=True))
+@click.option('--ticks', default=None, type=int, help='Stop after this many repository runs.')
+def serve(config_file, ticks):
+    from gitconsensus import daemon
+    from gitconsensus.stats import collector
+    settings = daemon.loadServeConfig(config_file)
+    # A single client, and so a single pooled HTTP session, is shared by every repository.
+    jobs = daemon.buildJobs(settings, get_client(), get_state())
+    click.echo("Serving %s repositories" % (len(jobs),))
+    stats_file = click.get_current_context().obj.get('stats_file')
+    after = (lambda: collector.write(stats_file)) if stats_file else None
+    daemon.Scheduler(jobs, report=click.echo, after=after).run(ticks)
+
+
+@cli.command(short_help="Receive Github webhooks and re-evaluate only the pull requests they affect")
+@click.argument('config_file', type=click.Path(exists=True))
+@click.option('--host', default='127.0.0.1', help='Address to listen on.')
+@click.option('--port', default=8080, type=click.IntRange(0, 65535), help='Port to listen on.')
+@click.option('--secret', required=True, envvar='GITCONSENSUS_WEBHOOK_SECRET', help='Secret the webhooks are signed with.')
+def webhooks(config_file, host, port, secret):
+    import threading
+    from gitconsensus import daemon
+    from gitconsensus import webhook
+    settings = daemon.loadServeConfig(config_file)
+    jobs = daemon.buildJobs(settings, get_client(), get_state())
+    processor = webhook.EventProcessor(jobs, report=click.echo)
+    server = webhook.WebhookServer((host, port), secret, processor)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    click.echo("Receiving webhooks for %s repositories on %s:%s" % (len(jobs), host, server.server_address[1]))
+    try:
+        processor.run()
+    finally:
+        server.shutdown()
+
+
+def report_stats(stats, stats_file):
+    from gitconsensus.stats import collector
+    if stats:
+        click.echo(collector.formatSummary(), err=True)
+    if stats_file:
+        collector.write(stats_file)
+
+
+def get_client():
+    from gitconsensus.client import getClient
+    from gitconsensus.ratelimit import default_write_interval, RequestScheduler
+    from gitconsensus.transport import Transport
     credentials = config.getGitToken()
-    client = github3.login(token=credentials['token'])
-    return Repository(username, repository_name, client)
+    options = click.get_current_context().obj or {}
+    write_interval = options.get('write_interval')
+    scheduler = RequestScheduler(write_interval=default_write_interval if write_interval is None else write_interval)
+    settings = {name: options[name] for name in ('pool_size', 'connect_timeout', 'read_timeout')
+                if options.get(name) is not None}
+    transport = Transport('httpx' if options.get('http2') else 'urllib3', keep_alive=options.get('keep_alive', True),
+                          **settings)
+    return getClient(credentials['token'], options.get('cache_dir'), options.get('cache_ttl', 0), scheduler,
+                     options.get('github_url'), transport)
+
+
+def get_state():
+    options = click.get_current_context().obj or {}
+    if options.get('cache_dir') and options.get('incremental'):
+        from gitconsensus.state import StateStore
+        return StateStore(os.path.join(options['cache_dir'], 'state.sqlite'))
+    return None
+
+
+def get_repository(username, repository_name):
+    from gitconsensus.repository import Repository
+    client = get_client()
+    return Repository(username, repository_name, client, get_state())
 
 
 if __name__ == '__main__':
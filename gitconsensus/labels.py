@@ -0,0 +1,10 @@
+# Labels describing the state of an open vote, removed once the pull request is merged or closed.
+status_labels = ['Failing', 'Passing', 'Needs Votes', 'Has Quorum']
+
+# Lower case names of the labels that stop a pull request from being merged or closed.
+blocking_labels = ['wip', 'dontmerge']
+
+
+def applyLabelChanges(current, add=(), remove=()):
+    desired = [label for label in current if label not in remove]
+    return desired + [label for label in add if label not in desired]
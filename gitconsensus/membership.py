@@ -0,0 +1,73 @@
+import threading
+import time
+
+default_ttl = 3600
+
+
+class MembershipIndex:
+    """Hold a repository's contributors and collaborators in sets so voter checks never need a request.
+
+    Both lists are fetched in bulk and, when a StateStore is available, persisted between runs until they are older
+    than `ttl`. Listing collaborators requires push access; without it collaborators are looked up (and remembered)
+    one user at a time.
+    """
+
+    def __init__(self, repository, name, store=None, ttl=default_ttl):
+        self.repository = repository
+        self.name = name
+        self.store = store
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.lists = {}
+        self.loaded_at = {}
+        self.collaborator_lookups = {}
+
+    def isContributor(self, username):
+        return username in self.getMembers('contributors')
+
+    def isCollaborator(self, username):
+        collaborators = self.getMembers('collaborators')
+        if collaborators is not None:
+            return username in collaborators
+        if username not in self.collaborator_lookups:
+            self.collaborator_lookups[username] = self.repository.is_collaborator(username)
+        return self.collaborator_lookups[username]
+
+    def getMembers(self, kind):
+        with self.lock:
+            if kind not in self.lists or self.isExpired(kind):
+                self.load(kind)
+            return self.lists[kind]
+
+    def isExpired(self, kind):
+        return time.time() - self.loaded_at.get(kind, 0) >= self.ttl
+
+    def load(self, kind, force=False):
+        if self.store and not force:
+            stored = self.store.getMembers(self.name, kind)
+            if stored and time.time() - stored[0] < self.ttl:
+                self.loaded_at[kind], self.lists[kind] = stored
+                return
+
+        members = self.fetch(kind)
+        self.lists[kind] = members
+        self.loaded_at[kind] = time.time()
+        if self.store:
+            self.store.saveMembers(self.name, kind, members, self.loaded_at[kind])
+
+    def fetch(self, kind):
+        if kind == 'contributors':
+            return set(str(contributor) for contributor in self.repository.contributors())
+        # Imported here so offline commands, such as simulate, do not load github3.
+        from github3.exceptions import ForbiddenError, NotFoundError
+        try:
+            return set(str(collaborator) for collaborator in self.repository.collaborators())
+        except (ForbiddenError, NotFoundError):
+            return None
+
+    def refresh(self):
+        """Reload lists that have expired, reusing cached responses (and 304s) where nothing changed."""
+        with self.lock:
+            for kind in [kind for kind in self.lists if self.isExpired(kind)]:
+                self.load(kind, force=True)
+            self.collaborator_lookups = {}
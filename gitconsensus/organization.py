@@ -0,0 +1,104 @@
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from gitconsensus.engine import default_repository_workers, default_workers, Engine, parallelMap
+from gitconsensus.planner import Executor, Planner
+from gitconsensus.repository import Repository
+from gitconsensus.rules import getRulesFromText
+from gitconsensus.snapshot import graphqlRequest
+
+# Repositories per discovery page. Each only adds its rules blob and an open pull request count, so pages can be large.
+discovery_page_size = 100
+
+discovery_query = """
+query($owner: String!, $cursor: String) {
+  repositoryOwner(login: $owner) {
+    repositories(first: %s, after: $cursor, ownerAffiliations: [OWNER], orderBy: {field: NAME, direction: ASC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        isArchived
+        pullRequests(states: OPEN) { totalCount }
+        rules: object(expression: "HEAD:.gitconsensus.yaml") { ... on Blob { oid text } }
+      }
+    }
+  }
+}
+""" % (discovery_page_size,)
+
+
+def discoverRepositories(client, owner):
+    """Find the repositories of a user or organization that have a .gitconsensus.yaml on their default branch.
+
+    Returns a list of (name, rules, open pull request count), reading the rules of every repository in the same
+    paged GraphQL query that lists them. Only repositories the owner owns are listed, not ones a user collaborates on.
+    """
+    repositories = []
+    cursor = None
+    while True:
+        data = graphqlRequest(discovery_query, {'owner': owner, 'cursor': cursor}, client)
+        if not data.get('repositoryOwner'):
+            raise ValueError('No user or organization named %s' % (owner,))
+        connection = data['repositoryOwner']['repositories']
+        for node in connection['nodes']:
+            blob = node.get('rules')
+            # Binary or oversized blobs have no text and can not hold usable rules either.
+            if node['isArchived'] or not blob or blob.get('text') is None:
+                continue
+            rules = getRulesFromText(blob['oid'], blob['text'])
+            if rules:
+                repositories.append((node['name'], rules, node['pullRequests']['totalCount']))
+        if not connection['pageInfo']['hasNextPage']:
+            return repositories
+        cursor = connection['pageInfo']['endCursor']
+
+
+class OrganizationScan:
+    """Merge pull requests across every configured repository of a user or organization.
+
+    Up to `repository_workers` repositories are processed at a time. Their pull requests are all fetched and evaluated
+    on one shared pool of `workers` threads, so the number of concurrent reads stays capped however many repositories
+    there are. Writes go through the client's request scheduler as usual.
+    """
+
+    def __init__(self, client, owner, state=None, workers=default_workers, repository_workers=default_repository_workers):
+        self.client = client
+        self.owner = owner
+        self.state = state
+        self.workers = workers
+        self.repository_workers = repository_workers
+
+    def discover(self, report=None):
+        repositories = discoverRepositories(self.client, self.owner)
+        if report:
+            report('Found %s configured repositories in %s' % (len(repositories), self.owner))
+        # Repositories without open pull requests have nothing to merge, so nothing else is fetched for them.
+        return [(name, rules) for name, rules, open_pull_requests in repositories if open_pull_requests]
+
+    def planMerge(self, report=None):
+        """Return a list with a merge plan for each configured repository that has open pull requests."""
+        return [plan for repository, plan in self.run(lambda repository, plan: None, report) if plan]
+
+    def merge(self, report=None):
+        self.run(lambda repository, plan: Executor(repository).apply(plan, self.prefixReport(repository, report)), report)
+
+    def run(self, action, report=None):
+        repositories = self.discover(report)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            def process(entry):
+                name, rules = entry
+                try:
+                    repository = Repository(self.owner, name, self.client, self.state, rules)
+                    plan = Planner(Engine(repository, self.workers, executor)).planMerge()
+                    action(repository, plan)
+                    return repository, plan
+                except Exception:
+                    # One failing repository should not stop the others from being processed.
+                    if report:
+                        report('Error processing %s/%s:\n%s' % (self.owner, name, traceback.format_exc()))
+                    return None, None
+            return parallelMap(process, repositories, self.repository_workers)
+
+    def prefixReport(self, repository, report):
+        if not report:
+            return None
+        return lambda message: report('%s: %s' % (repository.getFullName(), message))
@@ -0,0 +1,133 @@
+import datetime
+import json
+from gitconsensus.labels import applyLabelChanges
+
+plan_version = 1
+
+
+class Planner:
+    """Evaluate pull requests and describe the merges, closes, label changes and comments they need, without writing.
+
+    A plan is a plain dictionary that can be saved as JSON, reviewed, and applied later by an Executor.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.repository = engine.repository
+
+    def newPlan(self):
+        return {
+            'version': plan_version,
+            'repository': self.repository.getFullName(),
+            'created_at': datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'actions': [],
+        }
+
+    def planMerge(self):
+        plan = self.newPlan()
+        for request, valid in self.engine.evaluate(lambda request: request.validate()):
+            if valid:
+                plan['actions'].append(self.buildAction(request, 'merge', 'merged'))
+            else:
+                action = self.buildAction(request, 'label')
+                if action['labels']['add'] or action['labels']['remove']:
+                    plan['actions'].append(action)
+        return plan
+
+    def planClose(self):
+        plan = self.newPlan()
+        for request, expired in self.engine.evaluate(lambda request: not request.isBlocked() and request.shouldClose()):
+            if expired:
+                plan['actions'].append(self.buildAction(request, 'close', 'closed'))
+        return plan
+
+    def planPullRequest(self, request, commands=('merge', 'close')):
+        """Plan what a single pull request needs, for when it is the only one that could have changed."""
+        plan = self.newPlan()
+        if 'merge' in commands and request.validate():
+            plan['actions'].append(self.buildAction(request, 'merge', 'merged'))
+        elif 'close' in commands and not request.isBlocked() and request.shouldClose():
+            plan['actions'].append(self.buildAction(request, 'close', 'closed'))
+        elif 'merge' in commands:
+            action = self.buildAction(request, 'label')
+            if action['labels']['add'] or action['labels']['remove']:
+                plan['actions'].append(action)
+        return plan
+
+    def buildAction(self, request, action, result=None):
+        add, remove = request.getLabelDiff(*request.getLabelChanges(result))
+        planned = {
+            'number': int(request.number),
+            'action': action,
+            'head_sha': request.head_sha,
+            'labels': {'add': add, 'remove': remove},
+        }
+        if result:
+            planned['comment'] = request.buildComment(result)
+        return planned
+
+
+class Executor:
+    """Apply a plan, one action at a time in the order it was written."""
+
+    def __init__(self, repository):
+        self.repository = repository
+
+    def apply(self, plan, report=None):
+        if plan.get('version') != plan_version:
+            raise ValueError('Unsupported plan version %s' % (plan.get('version'),))
+        if plan['repository'] != self.repository.getFullName():
+            raise ValueError('Plan is for %s, not %s' % (plan['repository'], self.repository.getFullName()))
+        results = []
+        for action in plan['actions']:
+            results.append(self.applyAction(action, report))
+        return results
+
+    def applyAction(self, action, report=None):
+        number = action['number']
+        if action['action'] == 'merge':
+            if report:
+                report("Merging PR#%s" % (number,))
+            # Passing the planned head makes Github refuse the merge if new commits arrived after planning.
+            merged = self.repository.mergePullRequest(number, action['head_sha'])
+            if not merged:
+                if report:
+                    report("Unable to merge PR#%s" % (number,))
+                return False
+            self.repository.recordDecision(number, 'merged')
+        elif action['action'] == 'close':
+            if report:
+                report("Closing PR#%s" % (number,))
+            closed = self.repository.closePullRequest(number)
+            if not closed:
+                if report:
+                    report("Unable to close PR#%s" % (number,))
+                return False
+            self.repository.recordDecision(number, 'closed')
+        else:
+            self.repository.recordDecision(number, 'pending')
+
+        labels = action.get('labels', {})
+        issue = None
+        if labels.get('add') or labels.get('remove'):
+            issue = self.repository.repository.issue(number)
+            # The diff is applied to the labels as they are now, not as they were when the plan was made.
+            current = [label.name for label in issue.original_labels]
+            desired = applyLabelChanges(current, labels.get('add', []), labels.get('remove', []))
+            if set(desired) != set(current):
+                issue.replace_labels(desired)
+
+        if action.get('comment'):
+            issue = issue or self.repository.repository.issue(number)
+            issue.create_comment(action['comment'])
+        return True
+
+
+def savePlan(plan, path):
+    with open(path, 'w') as f:
+        json.dump(plan, f, indent=2)
+
+
+def loadPlan(path):
+    with open(path, 'r') as f:
+        return json.load(f)
@@ -0,0 +1,185 @@
+import random
+import threading
+import time
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+WRITE = 0
+READ = 1
+
+# Requests held back from reads so merges, closes and labels can still be written when the budget runs low.
+default_write_reserve = 50
+# Github asks for at least a second between content creating requests to avoid secondary rate limits.
+default_write_interval = 1.0
+default_max_retries = 5
+default_backoff = 2.0
+max_backoff = 120.0
+
+retry_statuses = [502, 503, 504]
+
+
+def getResource(request):
+    # GraphQL queries are POSTs but only read, and are budgeted separately from the REST api.
+    if request.url.rstrip('/').endswith('/graphql'):
+        return 'graphql'
+    return 'core'
+
+
+def getPriority(request):
+    if request.method in ['GET', 'HEAD']:
+        return READ
+    body = request.body or b''
+    if not isinstance(body, bytes):
+        body = body.encode('utf-8')
+    if getResource(request) == 'graphql' and b'mutation' not in body:
+        return READ
+    return WRITE
+
+
+def isRateLimited(response):
+    if response.status_code == 429:
+        return True
+    if response.status_code != 403:
+        return False
+    if response.headers.get('X-RateLimit-Remaining') == '0' or 'Retry-After' in response.headers:
+        return True
+    return b'rate limit' in (response.content or b'').lower()
+
+
+class RequestScheduler:
+    """Track the Github rate limit budget and decide when each request may be sent.
+
+    Reads are spread out over the time left until the budget resets and stop entirely once only the write reserve is
+    left. Writes always go ahead of waiting reads.
+    """
+
+    def __init__(self, write_reserve=default_write_reserve, write_interval=default_write_interval,
+                 max_retries=default_max_retries, backoff=default_backoff, clock=time.time):
+        self.write_reserve = write_reserve
+        self.write_interval = write_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.clock = clock
+        self.condition = threading.Condition()
+        self.budgets = {}
+        self.blocked_until = 0
+        self.last_read = 0
+        self.last_write = 0
+        self.waiting_writes = 0
+        self.metrics = {
+            'requests': 0,
+            'reads': 0,
+            'writes': 0,
+            'retries': 0,
+            'rate_limited': 0,
+            'throttled_seconds': 0.0,
+        }
+
+    def getBudget(self, resource):
+        if resource not in self.budgets:
+            self.budgets[resource] = {'remaining': None, 'limit': None, 'reset': None}
+        return self.budgets[resource]
+
+    def getDelay(self, priority, resource='core'):
+        now = self.clock()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if priority == WRITE:
+            return max(0, self.last_write + self.write_interval - now)
+        if self.waiting_writes:
+            return 0.05
+        budget = self.getBudget(resource)
+        if budget['remaining'] is None or budget['reset'] is None or budget['reset'] <= now:
+            return 0
+        if budget['remaining'] <= self.write_reserve:
+            return budget['reset'] - now
+        # Pace reads so the remaining budget lasts until it resets.
+        spacing = (budget['reset'] - now) / (budget['remaining'] - self.write_reserve)
+        return max(0, self.last_read + spacing - now)
+
+    def acquire(self, priority, resource='core'):
+        with self.condition:
+            if priority == WRITE:
+                self.waiting_writes += 1
+            try:
+                while True:
+                    delay = self.getDelay(priority, resource)
+                    if delay <= 0:
+                        break
+                    self.metrics['throttled_seconds'] += delay
+                    self.condition.wait(delay)
+            finally:
+                if priority == WRITE:
+                    self.waiting_writes -= 1
+            now = self.clock()
+            if priority == WRITE:
+                self.last_write = now
+                self.metrics['writes'] += 1
+            else:
+                self.last_read = now
+                self.metrics['reads'] += 1
+            self.metrics['requests'] += 1
+            budget = self.getBudget(resource)
+            if budget['remaining'] is not None:
+                budget['remaining'] -= 1
+
+    def update(self, response, resource='core'):
+        headers = response.headers
+        with self.condition:
+            if 'X-RateLimit-Remaining' in headers:
+                budget = self.getBudget(headers.get('X-RateLimit-Resource', resource))
+                budget['remaining'] = int(headers['X-RateLimit-Remaining'])
+                budget['limit'] = int(headers.get('X-RateLimit-Limit', budget['limit'] or 0))
+                budget['reset'] = float(headers.get('X-RateLimit-Reset', budget['reset'] or 0))
+            self.condition.notify_all()
+
+    def getRetryDelay(self, response, attempt):
+        if response is not None and 'Retry-After' in response.headers:
+            return float(response.headers['Retry-After'])
+        if response is not None and response.headers.get('X-RateLimit-Remaining') == '0':
+            if 'X-RateLimit-Reset' in response.headers:
+                return max(1, float(response.headers['X-RateLimit-Reset']) - self.clock())
+        # Full jitter keeps concurrent workers from retrying in lockstep.
+        return random.uniform(0, min(max_backoff, self.backoff * (2 ** attempt)))
+
+    def block(self, delay, rate_limited):
+        with self.condition:
+            self.metrics['retries'] += 1
+            if rate_limited:
+                self.metrics['rate_limited'] += 1
+            self.blocked_until = max(self.blocked_until, self.clock() + delay)
+
+    def getMetrics(self):
+        with self.condition:
+            metrics = dict(self.metrics)
+            for resource, budget in self.budgets.items():
+                for name, value in budget.items():
+                    metrics['%s_%s' % (resource, name)] = value
+        return metrics
+
+
+class RateLimitAdapter(BaseAdapter):
+    """Transport adapter that sends every request through a RequestScheduler and retries rate limited ones."""
+
+    def __init__(self, scheduler, adapter=None):
+        super(RateLimitAdapter, self).__init__()
+        self.scheduler = scheduler
+        self.adapter = adapter or HTTPAdapter()
+
+    def send(self, request, **kwargs):
+        priority = getPriority(request)
+        resource = getResource(request)
+        attempt = 0
+        while True:
+            self.scheduler.acquire(priority, resource)
+            response = self.adapter.send(request, **kwargs)
+            self.scheduler.update(response, resource)
+            limited = isRateLimited(response)
+            retryable = limited or (priority == READ and response.status_code in retry_statuses)
+            if not retryable or attempt >= self.scheduler.max_retries:
+                return response
+            self.scheduler.block(self.scheduler.getRetryDelay(response, attempt), limited)
+            response.close()
+            attempt += 1
+
+    def close(self):
+        self.adapter.close()
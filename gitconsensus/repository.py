@@ -1,121 +1,157 @@
-import base64
 import datetime
-import github3
+import itertools
 import json
-import requests
-from semantic_version import Version
-import yaml
+from urllib.parse import parse_qs, urlparse
+from gitconsensus.comments import CommentRenderer
+from gitconsensus.engine import parallelMap
+from gitconsensus.labels import applyLabelChanges, blocking_labels, status_labels
+from gitconsensus.membership import MembershipIndex
+from gitconsensus.rules import getRules, getRulesFromSettings
+from gitconsensus.snapshot import SnapshotLoader
+from gitconsensus.stats import timedCheck
+from gitconsensus.votes import ABSTAIN, castVote, NO, VoteTally, YES
 
-# .gitconsensus.yaml files with versions higher than this will be ignored.
-max_consensus_version = Version('3.0.0', partial=True)
 
-message_template = """
-This Pull Request has been %s by [GitConsensus](https://www.gitconsensus.com/).
+class lazyproperty:
+    """Compute an attribute on first access and store it on the instance, so the work (usually a request) runs once."""
 
-## Vote Totals
+    def __init__(self, function):
+        self.function = function
+        self.name = function.__name__
+        self.__doc__ = function.__doc__
 
-| Yes | No | Abstain | Voters |
-| --- | -- | ------- | ------ |
-| %s  | %s | %s      | %s     |
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = self.function(instance)
+        instance.__dict__[self.name] = value
+        return value
 
 
-## Vote Breakdown
-
-%s
-
+def githubApiRequest(url, client):
+    headers = {'Accept': 'application/vnd.github.squirrel-girl-preview'}
+    return client._get(url, headers=headers)
 
-## Vote Results
 
-| Criteria   | Result |
-| ---------- | ------ |
-| Has Quorum | %s     |
-| Has Votes  | %s     |
+reaction_page_size = 100
 
-"""
 
-consensus_url_template = "https://api.github.com/repos/%s/%s/contents/.gitconsensus.yaml"
+def getPageNumber(url):
+    return int(parse_qs(urlparse(url).query).get('page', ['1'])[0])
 
 
-def githubApiRequest(url, client):
-    headers = {'Accept': 'application/vnd.github.squirrel-girl-preview'}
-    return client._get(url, headers=headers)
+def iterReactionPages(url, client):
+    """Yield each page of reactions along with an upper bound on how many reactions are still to come."""
+    url = '%s?per_page=%s' % (url, reaction_page_size)
+    while url:
+        res = githubApiRequest(url, client)
+        reactions = json.loads(res.text)
+        links = res.links
+        remaining = 0
+        if 'last' in links:
+            remaining = (getPageNumber(links['last']['url']) - getPageNumber(res.url)) * reaction_page_size
+        yield reactions, remaining
+        url = links['next']['url'] if 'next' in links else None
 
 
 class Repository:
 
-    def __init__(self, user, repository, client):
+    def __init__(self, user, repository, client, state=None, rules=None):
         self.user = user
         self.name = repository
-        self.contributors = False
-        self.collaborators = {}
+        self.state = state
         self.client = client
         self.client.set_user_agent('gitconsensus')
         self.repository = self.client.repository(self.user, self.name)
-        consensusurl = consensus_url_template % (self.user, self.name)
+        self.members = MembershipIndex(self.repository, self.getFullName(), state)
+        self.rules_sha = None
+        # Rules that were already found, such as by an organization scan, save fetching them again.
+        if rules is None:
+            self.loadRules()
+        else:
+            self.setRules(rules)
+
+    def loadRules(self):
+        """Load the rules from .gitconsensus.yaml, parsing the file only when its blob SHA has not been seen before.
+
+        The response cache revalidates the file with its ETag. The migrated rules are also saved in the state store by
+        blob SHA, so a new process does not parse an unchanged file again.
+        """
+        if self.rules_sha is None and self.state:
+            stored = self.state.getRules(self.getFullName())
+            if stored:
+                # This puts the stored rules in the blob SHA memo that getRules checks first.
+                self.rules_sha = stored[0]
+                getRulesFromSettings(*stored)
+
+        consensusurl = self.client._build_url('repos', self.user, self.name, 'contents', '.gitconsensus.yaml')
         res = githubApiRequest(consensusurl, self.client)
-        self.rules = False
+        rules = False
+        sha = None
         if res.status_code == 200:
             ruleresults = res.json()
-            self.rules = yaml.safe_load(base64.b64decode(ruleresults['content']).decode('utf-8'))
-            # support older versions by converting from day to hours.
-            if 'version' not in self.rules or self.rules['version'] < 2:
-                if 'mergedelay' in self.rules and self.rules['mergedelay']:
-                    self.rules['mergedelay'] = self.rules['mergedelay'] * 24
-                if 'timeout' in self.rules and self.rules['timeout']:
-                    self.rules['timeout'] = self.rules['timeout'] * 24
-                self.rules['version'] = 2
-
-            if self.rules['version'] < 3:
-                self.rules['version'] = 3
-                self.rules['pull_requests'] = {
-                    "quorum": self.rules.get('quorum', False),
-                    "threshold": self.rules.get('threshold', False),
-                    "contributors_only": self.rules.get('contributorsonly', False),
-                    "collaborators_only": self.rules.get('collaboratorsonly', False),
-                    "whitelist": self.rules.get('whitelist'),
-                    "blacklist": self.rules.get('blacklist'),
-                    "merge_delay": self.rules.get('mergedelay', False),
-                    "delay_override": self.rules.get('delayoverride', False),
-                    "merge_delay_min": self.rules.get('mergedelaymin', False),
-                    "license_delay": self.rules.get('licenseddelay', False),
-                    "license_lock": self.rules.get('locklicense', False),
-                    "consensus_delay": self.rules.get('consensusdelay', False),
-                    "consensus_lock": self.rules.get('lockconsensus', False),
-                    "timeout": self.rules.get('timeout')
-                }
-
-            if int(self.rules['pull_requests']['threshold']) > 1:
-                self.rules['pull_requests']['threshold'] /= 100
-
-            # Treat higher version consensus rules are an unconfigured repository.
-            project_consensus_version = Version(str(self.rules['version']), partial=True)
-            if max_consensus_version < project_consensus_version:
-                self.rules = False
-
-    def getPullRequests(self):
-        prs = self.repository.iter_pulls(state="open")
-        retpr = []
-        for pr in prs:
-            newpr = PullRequest(self, pr.number)
-            retpr.append(newpr)
-        return retpr
-
-    def getPullRequest(self, number):
-        return PullRequest(self, number)
+            sha = ruleresults.get('sha')
+            rules = getRules(sha, ruleresults['content'])
+        if self.state and sha and sha != self.rules_sha:
+            self.state.saveRules(self.getFullName(), sha, rules.toSettings() if rules else None)
+        self.rules_sha = sha
+        self.setRules(rules)
+
+    def setRules(self, rules):
+        self.rules = rules or False
+        self.consensus = Consensus(self.rules)
+
+    def getPullRequests(self, workers=1, executor=None):
+        loader = SnapshotLoader(self.client, self.user, self.name)
+        if self.state:
+            snapshots = self.loadIncremental(loader)
+        else:
+            snapshots = loader.load()
+        return parallelMap(lambda snapshot: PullRequest(self, snapshot.number, snapshot), snapshots, workers, executor)
+
+    def loadIncremental(self, loader):
+        snapshots = loader.loadIndex()
+        changed = self.state.restore(self.getFullName(), snapshots, self.rules)
+        loaded = {snapshot.number: snapshot for snapshot in loader.loadPullRequests([s.number for s in changed])}
+        snapshots = [loaded.get(snapshot.number, snapshot) for snapshot in snapshots]
+        self.state.save(self.getFullName(), loaded.values(), self.rules, set(s.number for s in snapshots))
+        return snapshots
+
+    def getFullName(self):
+        return '%s/%s' % (self.user, self.name)
+
+    def recordDecision(self, number, decision):
+        if self.state:
+            self.state.recordDecision(self.getFullName(), number, decision)
+
+    def getPullRequest(self, number, data=None):
+        return PullRequest(self, number, data=data)
+
+    def mergePullRequest(self, number, sha=None, message='GitConsensus Merge'):
+        """Merge a pull request by number, without fetching it first."""
+        url = self.client._build_url('repos', self.user, self.name, 'pulls', str(number), 'merge')
+        parameters = {'commit_message': message}
+        if sha:
+            parameters['sha'] = sha
+        res = self.client._put(url, data=json.dumps(parameters))
+        return res.status_code == 200 and res.json().get('merged', False)
+
+    def closePullRequest(self, number):
+        url = self.client._build_url('repos', self.user, self.name, 'pulls', str(number))
+        res = self.client._patch(url, data=json.dumps({'state': 'closed'}))
+        return res.status_code == 200
+
+    def refreshMembers(self):
+        self.members.refresh()
 
     def isContributor(self, username):
-        if not self.contributors:
-            contributor_list = self.repository.contributors()
-            self.contributors = [str(contributor) for contributor in contributor_list]
-        return username in self.contributors
+        return self.members.isContributor(username)
 
     def isCollaborator(self, username):
-        if username not in self.collaborators:
-            self.collaborators[username] = self.repository.is_collaborator(username)
-        return self.repository.is_collaborator(username)
+        return self.members.isCollaborator(username)
 
     def getConsensus(self):
-        return Consensus(self.rules)
+        return self.consensus
 
     def setLabelColor(self, name, color):
         labels = self.get_labels()
@@ -132,121 +168,188 @@ class Repository:
 
 
 class PullRequest:
-    labels = False
 
-    def __init__(self, repository, number):
+    def __init__(self, repository, number, snapshot=None, data=None):
         self.repository = repository
         self.consensus = repository.getConsensus()
         self.number = number
-        self.pr = self.repository.client.pull_request(self.repository.user, self.repository.name, number)
+        self.snapshot = snapshot
+        # An already fetched pull request payload, from a list or a webhook, saves fetching it again.
+        self.data = data
 
-        # https://api.github.com/repos/OWNER/REPO/issues/1/reactions
-        reacturl = "https://api.github.com/repos/%s/%s/issues/%s/reactions" % (self.repository.user, self.repository.name, self.number)
-        res = githubApiRequest(reacturl, self.repository.client)
-        reactions = json.loads(res.text)
-
-        self.yes = []
-        self.no = []
-        self.abstain = []
-
-        self.contributors_yes = []
-        self.contributors_no = []
-        self.contributors_abstain = []
-
-        self.users = []
-        self.doubles = []
-        for reaction in reactions:
-            content = reaction['content']
-            user = reaction['user']
-            username = user['login']
-
-            if username in self.doubles:
-                continue
-
-            if 'blacklist' in self.repository.rules and self.repository.rules['blacklist']:
-                if username in self.repository.blacklist:
-                    continue
-
-            if 'collaborators_only' in self.repository.rules and self.repository.rules['collaborators_only']:
-                if not self.repository.isCollaborator(username):
-                    continue
-
-            if 'contributors_only' in self.repository.rules and self.repository.rules['contributors_only']:
-                if not self.repository.isContributor(username):
-                    continue
-
-            if 'whitelist' in self.repository.rules:
-                if username not in self.repository.rules['whitelist']:
-                    continue
-
-            if 'prevent_doubles' in self.repository.rules and self.repository.rules['prevent_doubles']:
-                # make sure user hasn't voted twice
-                if content == '+1' or content == '-1' or content == 'confused':
-                    if username in self.users:
-                        self.doubles.append(username)
-                        self.users.remove(username)
-                        if username in self.yes:
-                            self.yes.remove(username)
-                        if username in self.no:
-                            self.no.remove(username)
-                        if username in self.abstain:
-                            self.abstain.remove(username)
-                        if username in self.contributors_yes:
-                            self.contributors_yes.remove(username)
-                        if username in self.contributors_no:
-                            self.contributors_no.remove(username)
-                        if username in self.contributors_abstain:
-                            self.contributors_abstain.remove(username)
-                        continue
-
-            if content == '+1':
-                self.users.append(user['login'])
-                self.yes.append(user['login'])
-                if self.repository.isContributor(user['login']):
-                    self.contributors_yes.append(user['login'])
-            elif content == '-1':
-                self.users.append(user['login'])
-                self.no.append(user['login'])
-                if self.repository.isContributor(user['login']):
-                    self.contributors_no.append(user['login'])
-            elif content == 'confused':
-                self.users.append(user['login'])
-                self.abstain.append(user['login'])
-                if self.repository.isContributor(user['login']):
-                    self.contributors_abstain.append(user['login'])
-
-        files = self.pr.files()
-        self.changes_consensus = False
-        self.changes_license = False
-        for changed_file in files:
-            if changed_file.filename == '.gitconsensus.yaml':
-                self.changes_consensus = True
-            if changed_file.filename.lower().startswith('license'):
-                self.changes_license = True
+        self.votes = VoteTally()
+        self.reaction_pages = None
 
-    def hoursSinceLastCommit(self):
-        commits = self.pr.commits()
+        # Changed files are only read when a rule or label needs them, see hasChangedFile.
+        self.file_kinds = set()
 
-        for commit in commits:
-            commit_date_string = commit._json_data['commit']['author']['date']
+        if snapshot:
+            # Everything needed for evaluation was loaded in bulk, so no further requests are made here.
+            for reaction in snapshot.reactions:
+                self.addReaction(reaction)
+            self.labels = snapshot.labels
+        else:
+            # https://api.github.com/repos/OWNER/REPO/issues/1/reactions
+            reacturl = self.repository.client._build_url('repos', self.repository.user, self.repository.name, 'issues', str(self.number), 'reactions')
+            self.reaction_pages = iterReactionPages(reacturl, self.repository.client)
+            self.readReactions()
+
+    def readReactions(self, complete=False):
+        """Tally reactions page by page, stopping early once more votes can no longer change the outcome."""
+        for reactions, remaining in self.reaction_pages:
+            for reaction in reactions:
+                self.addReaction(reaction)
+            if not complete and remaining and self.consensus.isDecided(self, remaining):
+                return
+        self.reaction_pages = None
+
+    def completeVotes(self):
+        # Comments and vote labels list every voter, so any pages skipped by an early stop are read here.
+        if self.reaction_pages:
+            self.readReactions(complete=True)
+
+    def addReaction(self, reaction):
+        castVote(self.votes, self.repository.rules, self.repository, reaction['user']['login'], reaction['content'])
+
+    @property
+    def users(self):
+        return self.votes.getVoters()
+
+    @property
+    def yes(self):
+        return self.votes.getVoters(YES)
+
+    @property
+    def no(self):
+        return self.votes.getVoters(NO)
+
+    @property
+    def abstain(self):
+        return self.votes.getVoters(ABSTAIN)
+
+    @property
+    def contributors_yes(self):
+        return self.votes.getVoters(YES, contributors_only=True)
+
+    @property
+    def contributors_no(self):
+        return self.votes.getVoters(NO, contributors_only=True)
+
+    @property
+    def contributors_abstain(self):
+        return self.votes.getVoters(ABSTAIN, contributors_only=True)
+
+    @property
+    def doubles(self):
+        return self.votes.doubles
+
+    @lazyproperty
+    def pr(self):
+        return self.repository.client.pull_request(self.repository.user, self.repository.name, self.number)
+
+    def getField(self, name):
+        """Read a field of the pull request, fetching it only when the data it was built from lacks the field.
+
+        Github computes `mergeable` in the background, so list and webhook payloads usually leave it out.
+        """
+        if self.data and self.data.get(name) is not None:
+            return self.data[name]
+        return self.pr._json_data.get(name)
+
+    @lazyproperty
+    def state(self):
+        if self.snapshot:
+            return 'open'
+        return self.getField('state')
+
+    @lazyproperty
+    def issue(self):
+        return self.repository.repository.issue(self.number)
 
+    @lazyproperty
+    def labels(self):
+        if self.data and 'labels' in self.data:
+            return [label['name'] for label in self.data['labels']]
+        return [item.name for item in self.issue.labels()]
+
+    @lazyproperty
+    def changed_files(self):
+        """Iterator over the names of the changed files that fetches further pages only as it is consumed."""
+        if self.snapshot:
+            if not self.snapshot.files_cursor:
+                return iter(self.snapshot.files)
+            loader = SnapshotLoader(self.repository.client, self.repository.user, self.repository.name)
+            return itertools.chain(self.snapshot.files, loader.iterRemaining(self.number, 'files', self.snapshot.files_cursor))
+        # The diff stat tells whether there is anything to list at all.
+        if self.getField('changed_files') == 0:
+            return iter(())
+        return (changed_file.filename for changed_file in self.pr.files())
+
+    @lazyproperty
+    def changes_consensus(self):
+        return self.hasChangedFile('consensus')
+
+    @lazyproperty
+    def changes_license(self):
+        return self.hasChangedFile('license')
+
+    def hasChangedFile(self, kind):
+        """Read changed files until one of `kind` turns up or none are left.
+
+        Every file read is classified, so a later check for another kind continues from where this one stopped.
+        """
+        if kind in self.file_kinds:
+            return True
+        for filename in self.changed_files:
+            self.file_kinds.update(getFileKinds(filename))
+            if kind in self.file_kinds:
+                break
+        return kind in self.file_kinds
+
+    @lazyproperty
+    def head_sha(self):
+        if self.snapshot:
+            return self.snapshot.head_sha
+        return self.getField('head')['sha']
+
+    @lazyproperty
+    def created_at(self):
+        if self.snapshot:
+            return self.snapshot.created_at
+        return datetime.datetime.strptime(self.getField('created_at'), '%Y-%m-%dT%H:%M:%SZ')
+
+    @lazyproperty
+    def last_commit_at(self):
+        if self.snapshot:
+            return self.snapshot.last_commit_at
+        # The head commit is the latest one, so there is no need to page through the whole commit list.
+        commit = self.repository.repository.commit(self.head_sha)
         # 2017-08-19T23:29:31Z
-        commit_date = datetime.datetime.strptime(commit_date_string, '%Y-%m-%dT%H:%M:%SZ')
-        now = datetime.datetime.utcnow()
-        delta = now - commit_date
+        return datetime.datetime.strptime(commit._json_data['commit']['author']['date'], '%Y-%m-%dT%H:%M:%SZ')
+
+    @lazyproperty
+    def last_update_at(self):
+        if self.last_commit_at is None or self.created_at > self.last_commit_at:
+            return self.created_at
+        return self.last_commit_at
+
+    def hoursSince(self, timestamp):
+        delta = datetime.datetime.utcnow() - timestamp
         return delta.total_seconds() / 3600
 
+    def hoursSinceLastCommit(self):
+        return self.hoursSince(self.last_commit_at)
+
     def hoursSincePullOpened(self):
-        now = datetime.datetime.utcnow()
-        delta = now - self.pr.created_at.replace(tzinfo=None)
-        return delta.total_seconds() / 3600
+        return self.hoursSince(self.created_at)
 
     def hoursSinceLastUpdate(self):
-        hoursOpen = self.hoursSincePullOpened()
-        hoursSinceCommit = self.hoursSinceLastCommit()
-        if hoursOpen < hoursSinceCommit:
-            return hoursOpen
-        return hoursSinceCommit
+        return self.hoursSince(self.last_update_at)
+
+    def isMergeable(self):
+        if self.snapshot:
+            return self.snapshot.mergeable
+        return self.getField('mergeable')
 
     def changesConsensus(self):
         return self.changes_consensus
@@ -255,7 +358,7 @@ class PullRequest:
         return self.changes_license
 
     def getIssue(self):
-        return self.repository.repository.issue(self.number)
+        return self.issue
 
     def validate(self):
         if self.repository.rules == False:
@@ -263,230 +366,247 @@ class PullRequest:
         return self.consensus.validate(self)
 
     def shouldClose(self):
-        if not self.repository.rules:
-            return False
-        if 'pull_requests' not in self.repository.rules:
+        if not self.repository.rules or not self.repository.rules.timeout:
             return False
-        if 'timeout' in self.repository.rules['pull_requests']:
-            if self.hoursSinceLastUpdate() >= self.repository.rules['pull_requests']['timeout']:
-                return True
-        return False
+        return self.hoursSinceLastUpdate() >= self.repository.rules.timeout
 
     def close(self):
-        self.pr.close()
-        self.addLabels(['gc-closed'])
-        self.cleanInfoLabels()
+        self.repository.closePullRequest(self.number)
+        self.setLabels(*self.getLabelChanges('closed'))
         self.commentAction('closed')
 
     def vote_merge(self):
         if not self.repository.rules:
             return False
-        self.pr.merge('GitConsensus Merge')
-        self.addLabels(['gc-merged'])
-        self.cleanInfoLabels()
-
-        if 'extra_labels' in self.repository.rules and self.repository.rules['extra_labels']:
-            self.addLabels([
-            'gc-voters %s' % (len(self.users),),
-            'gc-yes %s' % (len(self.yes),),
-            'gc-no %s' % (len(self.no),),
-            'gc-age %s' % (int(self.hoursSinceLastUpdate()),)
-            ])
+        self.repository.mergePullRequest(self.number)
+        self.setLabels(*self.getLabelChanges('merged'))
         self.commentAction('merged')
 
-    def addInfoLabels(self):
-        labels = self.getLabelList()
-
-        licenseMessage = 'License Change'
-        if self.changesLicense():
-            self.addLabels([licenseMessage])
-        else:
-            self.removeLabels([licenseMessage])
+    def getLabelChanges(self, action=None):
+        """Work out which labels should be added and removed, either while voting or once `action` was taken."""
+        add = []
+        remove = []
 
-        consensusMessage = 'Consensus Change'
-        if self.changesConsensus():
-            self.addLabels([consensusMessage])
-        else:
-            self.removeLabels([consensusMessage])
+        def toggle(label, enabled):
+            if enabled:
+                add.append(label)
+            else:
+                remove.append(label)
+
+        toggle('License Change', self.changesLicense())
+        toggle('Consensus Change', self.changesConsensus())
+
+        if not action:
+            hasQuorum = self.consensus.hasQuorum(self)
+            toggle('Has Quorum', hasQuorum)
+            toggle('Needs Votes', not hasQuorum)
+            hasVotes = self.consensus.hasVotes(self)
+            toggle('Passing', hasVotes)
+            toggle('Failing', not hasVotes)
+            return add, remove
+
+        remove += status_labels
+        add.append('gc-%s' % (action,))
+        if action == 'merged' and self.repository.rules and self.repository.rules.extra_labels:
+            self.completeVotes()
+            add += [
+                'gc-voters %s' % (len(self.users),),
+                'gc-yes %s' % (len(self.yes),),
+                'gc-no %s' % (len(self.no),),
+                'gc-age %s' % (int(self.hoursSinceLastUpdate()),)
+            ]
+        return add, remove
 
-        hasQuorumMessage = 'Has Quorum'
-        needsQuorumMessage = 'Needs Votes'
-        if self.consensus.hasQuorum(self):
-            self.addLabels([hasQuorumMessage])
-            self.removeLabels([needsQuorumMessage])
-        else:
-            self.removeLabels([hasQuorumMessage])
-            self.addLabels([needsQuorumMessage])
-
-        passingMessage = 'Passing'
-        failingMessage = 'Failing'
-        if self.consensus.hasVotes(self):
-            self.addLabels([passingMessage])
-            self.removeLabels([failingMessage])
-        else:
-            self.removeLabels([passingMessage])
-            self.addLabels([failingMessage])
+    def addInfoLabels(self):
+        self.setLabels(*self.getLabelChanges())
 
     def cleanInfoLabels(self):
-        self.removeLabels(['Failing', 'Passing', 'Needs Votes', 'Has Quorum'])
+        self.removeLabels(status_labels)
+
+    def setLabels(self, add=(), remove=()):
+        """Apply a label diff with a single replace call, skipping the request when nothing would change."""
+        current = self.getLabelList()
+        desired = applyLabelChanges(current, add, remove)
+        if set(desired) == set(current):
+            return False
+        self.issue.replace_labels(desired)
+        self.labels = desired
+        return True
+
+    def getLabelDiff(self, add=(), remove=()):
+        """Reduce label changes to the ones that actually differ from the current labels."""
+        current = self.getLabelList()
+        return ([label for label in add if label not in current],
+                [label for label in remove if label in current and label not in add])
 
     def commentAction(self, action):
-        table = self.buildVoteTable()
-        message = message_template % (
-            action,
-            str(len(self.yes)),
-            str(len(self.no)),
-            str(len(self.abstain)),
-            str(len(self.users)),
-            table,
-            self.consensus.hasQuorum(self),
-            self.consensus.hasVotes(self)
-        )
-
-        if len(self.doubles) > 0:
-            duplist = ["[%s](https://github.com/%s)" % (username, username) for username in self.doubles]
-            dupuserstring = ', '.join(duplist)
-            dupstring = '\n\nThe following users voted for multiple options and were exlcuded: \n%s' % (dupuserstring)
-            message = "%s\n%s" % (message, dupstring)
-
-        self.addComment(message)
-
-    def buildVoteTable(self):
-        table = '| User | Yes | No | Abstain |\n|--------|-----|----|----|'
-        for user in self.users:
-            if user in self.yes:
-                yes = '✔'
-            else:
-                yes = '   '
-            if user in self.no:
-                no = '✔'
-            else:
-                no = '  '
-            if user in self.abstain:
-                abstain = '✔'
-            else:
-                abstain = '  '
+        self.addComment(self.buildComment(action))
 
-            user_label = '[%s](https://github.com/%s)' % (user, user)
-            row = "| %s | %s | %s | %s |" % (user_label, yes, no, abstain)
-            table = "%s\n%s" % (table, row)
-        return table
+    def buildComment(self, action):
+        self.completeVotes()
+        return CommentRenderer().render(action, self.votes, self.consensus.hasQuorum(self), self.consensus.hasVotes(self))
 
     def addLabels(self, labels):
-        existing = self.getLabelList()
-        issue = self.getIssue()
-        for label in labels:
-            if label not in existing:
-                issue.add_labels(label)
+        return self.setLabels(add=labels)
 
     def removeLabels(self, labels):
-        existing = self.getLabelList()
-        issue = self.getIssue()
-        for label in labels:
-            if label in existing:
-                issue.remove_label(label)
+        return self.setLabels(remove=labels)
 
     def addComment(self, comment_string):
         return self.getIssue().create_comment(comment_string)
 
     def getLabelList(self):
-        if not self.labels:
-            issue = self.getIssue()
-            self.labels = [item.name for item in issue.labels()]
         return self.labels
 
     def isBlocked(self):
-        labels = [item.lower() for item in self.getLabelList()]
-        if 'wip' in labels:
-            return True
-        if 'dontmerge' in labels:
-            return True
+        for label in self.getLabelList():
+            if label.lower() in blocking_labels:
+                return True
         return False
 
 
+def getFileKinds(filename):
+    """Return the kinds of change, 'consensus' and 'license', that changing `filename` makes."""
+    kinds = []
+    if filename == '.gitconsensus.yaml':
+        kinds.append('consensus')
+    if filename.lower().startswith('license'):
+        kinds.append('license')
+    return kinds
+
+
+def getRatio(yes, no):
+    if yes + no <= 0:
+        return None
+    return yes / (yes + no)
+
+
 class Consensus:
+    """Evaluate pull requests against compiled Rules.
+
+    The checks that can never fail under the rules are left out of `validate` when the Consensus is built.
+    """
+
     def __init__(self, rules):
         self.rules = rules
-
+        checks = []
+        if rules:
+            if rules.license_lock or rules.consensus_lock:
+                checks.append(self.isAllowed)
+            checks.append(self.isMergeable)
+            if rules.quorum:
+                checks.append(self.hasQuorum)
+            checks.append(self.hasVotes)
+            if rules.merge_delay or rules.license_delay or rules.consensus_delay:
+                checks.append(self.hasAged)
+        self.checks = tuple(checks)
+
+    @timedCheck
     def validate(self, pr):
         if not self.rules:
             return False
         if pr.isBlocked():
             return False
-        if not self.isAllowed(pr):
-            return False
-        if not self.isMergeable(pr):
-            return False
-        if not self.hasQuorum(pr):
-            return False
-        if not self.hasVotes(pr):
-            return False
-        if not self.hasAged(pr):
+        for check in self.checks:
+            if not check(pr):
+                return False
+        return True
+
+    def isDecided(self, pr, remaining):
+        """Check whether up to `remaining` more reactions could still change the vote based results.
+
+        This is used to stop reading reactions early. Every remaining reaction is assumed to either add a vote or, when
+        doubles are prevented, cancel an existing one.
+        """
+        rules = self.rules
+        if not rules:
+            return True
+        lost = remaining if rules.prevent_doubles else 0
+
+        if rules.quorum:
+            voters = len(pr.users)
+            if voters - lost < rules.quorum <= voters + remaining:
+                return False
+
+        # Without a threshold a pull request still needs one yes or no vote, which is a threshold of zero.
+        threshold = rules.threshold or 0
+        yes = len(pr.yes)
+        no = len(pr.no)
+        lowest = getRatio(max(0, yes - lost), no + remaining)
+        highest = getRatio(yes + remaining, max(0, no - lost))
+        always_passes = lowest is not None and lowest >= threshold
+        always_fails = highest is None or highest < threshold
+        if not always_passes and not always_fails:
             return False
+
+        if rules.merge_delay and rules.delay_override:
+            # The override needs zero "no" votes, which further reactions can only undo when doubles are prevented.
+            if lost or len(pr.no) == 0:
+                return False
+
         return True
 
+    @timedCheck
     def isAllowed(self, pr):
         if not self.rules:
             return False
-        if pr.changesLicense():
-            if 'license_lock' in self.rules['pull_requests'] and self.rules['pull_requests']['license_lock']:
-                return False
-        if pr.changesConsensus():
-            if 'consensus_lock' in self.rules['pull_requests'] and self.rules['pull_requests']['consensus_lock']:
-                return False
+        if self.rules.license_lock and pr.changesLicense():
+            return False
+        if self.rules.consensus_lock and pr.changesConsensus():
+            return False
         return True
 
+    @timedCheck
     def isMergeable(self, pr):
         if not self.rules:
             return False
-        if not pr.pr.mergeable:
+        if not pr.isMergeable():
             return False
         return True
 
+    @timedCheck
     def hasQuorum(self, pr):
         if not self.rules:
             return False
-        if 'quorum' in self.rules['pull_requests']:
-            if len(pr.users) < self.rules['pull_requests']['quorum']:
-                return False
+        if self.rules.quorum and len(pr.users) < self.rules.quorum:
+            return False
         return True
 
+    @timedCheck
     def hasVotes(self, pr):
         if not self.rules:
             return False
-        if 'threshold' in self.rules['pull_requests']:
-            total = (len(pr.yes) + len(pr.no))
-            if total <= 0:
-                return False
-            ratio = len(pr.yes) / total
-            if ratio < self.rules['pull_requests']['threshold']:
-                return False
+        ratio = getRatio(len(pr.yes), len(pr.no))
+        # At least one yes or no vote is needed, even when there is no threshold.
+        if ratio is None:
+            return False
+        if self.rules.threshold and ratio < self.rules.threshold:
+            return False
         return True
 
+    @timedCheck
     def hasAged(self, pr):
-        if not self.rules:
+        rules = self.rules
+        if not rules:
             return False
         hours = pr.hoursSinceLastUpdate()
-        if pr.changesLicense():
-            if 'license_delay' in self.rules['pull_requests'] and self.rules['pull_requests']['license_delay']:
-                if hours < self.rules['pull_requests']['license_delay']:
-                    return False
-        if pr.changesConsensus():
-            if 'consensus_delay' in self.rules['pull_requests'] and self.rules['pull_requests']['consensus_delay']:
-                if hours < self.rules['pull_requests']['consensus_delay']:
-                    return False
-        if 'merge_delay' not in self.rules['pull_requests'] or not self.rules['pull_requests']['merge_delay']:
+        if rules.license_delay and pr.changesLicense():
+            if hours < rules.license_delay:
+                return False
+        if rules.consensus_delay and pr.changesConsensus():
+            if hours < rules.consensus_delay:
+                return False
+        if not rules.merge_delay:
             return True
-        if hours >= self.rules['pull_requests']['merge_delay']:
+        if hours >= rules.merge_delay:
             return True
-        if 'delay_override' in self.rules['pull_requests'] and self.rules['pull_requests']['delay_override']:
+        if rules.delay_override:
             if pr.changesConsensus() or pr.changesLicense():
                 return False
-            if 'merge_delay_min' in self.rules['pull_requests'] and self.rules['pull_requests']['merge_delay_min']:
-                if hours < self.rules['pull_requests']['merge_delay_min']:
-                    return False
+            if rules.merge_delay_min and hours < rules.merge_delay_min:
+                return False
             if len(pr.no) > 0:
                 return False
-            if len(pr.contributors_yes) >= self.rules['pull_requests']['delay_override']:
+            if len(pr.contributors_yes) >= rules.delay_override:
                 return True
         return False
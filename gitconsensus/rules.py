@@ -0,0 +1,165 @@
+import base64
+import hashlib
+import json
+from semantic_version import Version
+import yaml
+
+# .gitconsensus.yaml files with versions higher than this will be ignored.
+max_consensus_version = Version('3.0.0', partial=True)
+
+# Compiled rules by the blob SHA of the .gitconsensus.yaml file they came from.
+max_cached_rules = 256
+compiled_rules = {}
+
+pull_request_settings = [
+    'quorum',
+    'threshold',
+    'contributors_only',
+    'collaborators_only',
+    'whitelist',
+    'blacklist',
+    'merge_delay',
+    'delay_override',
+    'merge_delay_min',
+    'license_delay',
+    'license_lock',
+    'consensus_delay',
+    'consensus_lock',
+    'timeout',
+]
+
+
+class Rules:
+    """Consensus rules migrated to version 3, with defaults resolved and the threshold normalized to a fraction.
+
+    Rules that are disabled, either set to false or left out, are None, so every check is a single attribute test.
+    Instances are immutable and shared by every pull request in a repository.
+    """
+    __slots__ = ['version', 'extra_labels', 'prevent_doubles', 'key'] + pull_request_settings
+
+    def __init__(self, **settings):
+        for name in self.__slots__:
+            object.__setattr__(self, name, settings.get(name))
+        object.__setattr__(self, 'key', hashlib.sha1(json.dumps(self.toSettings(), sort_keys=True).encode('utf-8')).hexdigest()[:12])
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Rules can not be modified')
+
+    def __delattr__(self, name):
+        raise AttributeError('Rules can not be modified')
+
+    def toSettings(self):
+        """Return the rules as version 3 .gitconsensus.yaml settings."""
+        pull_requests = {}
+        for name in pull_request_settings:
+            value = getattr(self, name)
+            pull_requests[name] = sorted(value) if isinstance(value, frozenset) else value
+        return {
+            'version': self.version,
+            'extra_labels': self.extra_labels,
+            'prevent_doubles': self.prevent_doubles,
+            'pull_requests': pull_requests,
+        }
+
+
+def migrateSettings(settings):
+    """Convert settings from older .gitconsensus.yaml versions to the version 3 layout, without modifying them."""
+    settings = dict(settings)
+    # support older versions by converting from day to hours.
+    if 'version' not in settings or settings['version'] < 2:
+        if settings.get('mergedelay'):
+            settings['mergedelay'] = settings['mergedelay'] * 24
+        if settings.get('timeout'):
+            settings['timeout'] = settings['timeout'] * 24
+        settings['version'] = 2
+
+    if settings['version'] < 3:
+        settings['version'] = 3
+        settings['pull_requests'] = {
+            "quorum": settings.get('quorum', False),
+            "threshold": settings.get('threshold', False),
+            "contributors_only": settings.get('contributorsonly', False),
+            "collaborators_only": settings.get('collaboratorsonly', False),
+            "whitelist": settings.get('whitelist'),
+            "blacklist": settings.get('blacklist'),
+            "merge_delay": settings.get('mergedelay', False),
+            "delay_override": settings.get('delayoverride', False),
+            "merge_delay_min": settings.get('mergedelaymin', False),
+            "license_delay": settings.get('licenseddelay', False),
+            "license_lock": settings.get('locklicense', False),
+            "consensus_delay": settings.get('consensusdelay', False),
+            "consensus_lock": settings.get('lockconsensus', False),
+            "timeout": settings.get('timeout')
+        }
+    return settings
+
+
+def compileRules(settings):
+    """Build Rules from parsed .gitconsensus.yaml settings, or return None for versions newer than supported."""
+    settings = migrateSettings(settings)
+
+    # Treat higher version consensus rules are an unconfigured repository.
+    if max_consensus_version < Version(str(settings['version']), partial=True):
+        return None
+
+    pull_requests = dict(settings.get('pull_requests') or {})
+    if 'license_delay' not in pull_requests:
+        # The README has documented this setting as `licensed_delay`.
+        pull_requests['license_delay'] = pull_requests.get('licensed_delay')
+
+    resolved = {}
+    for name in pull_request_settings:
+        resolved[name] = pull_requests.get(name) or None
+    for name in ['whitelist', 'blacklist']:
+        if resolved[name] is not None:
+            resolved[name] = frozenset(str(username) for username in resolved[name])
+    for name in ['contributors_only', 'collaborators_only', 'license_lock', 'consensus_lock']:
+        resolved[name] = bool(resolved[name])
+    if resolved['threshold'] is not None and int(resolved['threshold']) > 1:
+        resolved['threshold'] = resolved['threshold'] / 100
+
+    return Rules(
+        version=settings['version'],
+        extra_labels=bool(settings.get('extra_labels')),
+        prevent_doubles=bool(settings.get('prevent_doubles')),
+        **resolved
+    )
+
+
+def parseRules(text):
+    settings = yaml.safe_load(text)
+    if not isinstance(settings, dict):
+        return None
+    return compileRules(settings)
+
+
+def getRules(blob_sha, content):
+    """Return the Rules for base64 encoded .gitconsensus.yaml contents, parsing each blob only the first time it is seen."""
+    if blob_sha in compiled_rules:
+        return compiled_rules[blob_sha]
+    return getRulesFromText(blob_sha, base64.b64decode(content).decode('utf-8'))
+
+
+def getRulesFromText(blob_sha, text):
+    """Return the Rules for .gitconsensus.yaml text, such as a GraphQL Blob's, with the same caching as getRules."""
+    if blob_sha in compiled_rules:
+        return compiled_rules[blob_sha]
+    return cacheRules(blob_sha, parseRules(text))
+
+
+def getRulesFromSettings(blob_sha, settings):
+    """Return the Rules for settings that were already migrated, such as ones saved by Rules.toSettings in an earlier run.
+
+    None settings stand for a file that held no usable rules.
+    """
+    if blob_sha in compiled_rules:
+        return compiled_rules[blob_sha]
+    return cacheRules(blob_sha, compileRules(settings) if settings else None)
+
+
+def cacheRules(blob_sha, rules):
+    if blob_sha:
+        if len(compiled_rules) >= max_cached_rules:
+            del compiled_rules[next(iter(compiled_rules))]
+        compiled_rules[blob_sha] = rules
+    return rules
@@ -0,0 +1,279 @@
+import copy
+import datetime
+import itertools
+import json
+import yaml
+from gitconsensus import batch
+from gitconsensus.repository import Consensus, getFileKinds
+from gitconsensus.rules import compileRules, migrateSettings, pull_request_settings
+from gitconsensus.snapshot import convertReaction, formatTimestamp, parseTimestamp, SnapshotLoader
+from gitconsensus.votes import castVote, VoteTally
+
+dataset_version = 1
+
+states = {
+    'MERGED': 'merged',
+    'CLOSED': 'closed',
+    'OPEN': 'open',
+}
+
+
+def buildDataset(repository, limit=1000):
+    """Collect what the consensus rules look at for the most recent pull requests, so it can be replayed offline."""
+    loader = SnapshotLoader(repository.client, repository.user, repository.name)
+    created_at = formatTimestamp(datetime.datetime.utcnow())
+    pull_requests = []
+    for node in loader.loadHistory(limit):
+        kinds = set()
+        files = [changed_file['path'] for changed_file in node['files']['nodes']]
+        if node['files']['pageInfo']['hasNextPage']:
+            files = itertools.chain(files, loader.iterRemaining(node['number'], 'files', node['files']['pageInfo']['endCursor']))
+        for filename in files:
+            kinds.update(getFileKinds(filename))
+            if len(kinds) == 2:
+                break
+
+        reactions = []
+        for reaction_node in node['reactions']['nodes']:
+            reaction = convertReaction(reaction_node)
+            if reaction:
+                reactions.append({'user': reaction['user']['login'], 'content': reaction['content'],
+                                  'created_at': reaction_node.get('createdAt')})
+
+        commits = node['commits']['nodes']
+        pull_requests.append({
+            'number': node['number'],
+            'state': states.get(node['state'], 'open'),
+            'created_at': node['createdAt'],
+            'last_commit_at': commits[-1]['commit']['authoredDate'] if commits else None,
+            'decided_at': node['mergedAt'] or node['closedAt'] or created_at,
+            'mergeable': {'MERGEABLE': True, 'CONFLICTING': False}.get(node['mergeable']),
+            'labels': [label['name'] for label in node['labels']['nodes']],
+            'changes_license': 'license' in kinds,
+            'changes_consensus': 'consensus' in kinds,
+            'reactions': reactions,
+        })
+
+    collaborators = repository.members.getMembers('collaborators')
+    return {
+        'version': dataset_version,
+        'repository': repository.getFullName(),
+        'created_at': created_at,
+        'rules': repository.rules.toSettings() if repository.rules else None,
+        'contributors': sorted(repository.members.getMembers('contributors')),
+        'collaborators': sorted(collaborators) if collaborators is not None else None,
+        'pull_requests': pull_requests,
+    }
+
+
+def saveDataset(dataset, path):
+    with open(path, 'w') as f:
+        json.dump(dataset, f)
+
+
+class Dataset:
+    """Historical pull requests reduced to the features the consensus rules use.
+
+    Everything that does not depend on the rules, such as the age of each pull request when it was decided, is worked
+    out once when the dataset is loaded.
+    """
+
+    def __init__(self, data):
+        if data.get('version') != dataset_version:
+            raise ValueError('Unsupported dataset version %s' % (data.get('version'),))
+        self.repository = data['repository']
+        self.rules = data.get('rules')
+        self.contributors = set(data.get('contributors') or [])
+        self.collaborators = set(data['collaborators']) if data.get('collaborators') is not None else None
+        self.numbers = []
+        self.outcomes = []
+        self.hours = []
+        self.blocked = []
+        self.mergeable = []
+        self.changes_license = []
+        self.changes_consensus = []
+        self.reactions = []
+        for pull_request in data['pull_requests']:
+            decided_at = parseTimestamp(pull_request['decided_at'])
+            last_update_at = parseTimestamp(pull_request['created_at'])
+            if pull_request['last_commit_at']:
+                last_update_at = max(last_update_at, parseTimestamp(pull_request['last_commit_at']))
+            labels = [label.lower() for label in pull_request['labels']]
+            self.numbers.append(pull_request['number'])
+            self.outcomes.append(pull_request['state'])
+            self.hours.append((decided_at - last_update_at).total_seconds() / 3600)
+            self.blocked.append('wip' in labels or 'dontmerge' in labels)
+            # Github no longer reports whether merged or closed pull requests could be merged, so they are assumed to.
+            self.mergeable.append(bool(pull_request['mergeable']) or pull_request['state'] != 'open')
+            self.changes_license.append(pull_request['changes_license'])
+            self.changes_consensus.append(pull_request['changes_consensus'])
+            # Votes cast after the pull request was decided could not have affected the decision.
+            self.reactions.append([(reaction['user'], reaction['content']) for reaction in pull_request['reactions']
+                                   if not reaction.get('created_at') or parseTimestamp(reaction['created_at']) <= decided_at])
+
+    def __len__(self):
+        return len(self.numbers)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            return cls(json.load(f))
+
+    def isContributor(self, username):
+        return username in self.contributors
+
+    def isCollaborator(self, username):
+        # Without push access the collaborator list was not available, so nobody can be checked against it.
+        return self.collaborators is not None and username in self.collaborators
+
+
+class SimulatedPullRequest:
+    """Stand in for a PullRequest built from a dataset row, with the methods Consensus uses."""
+    __slots__ = ('number', 'votes', 'hours', 'license', 'consensus', 'blocked', 'mergeable')
+
+    def __init__(self, number, votes, hours, license, consensus, blocked, mergeable):
+        self.number = number
+        self.votes = votes
+        self.hours = hours
+        self.license = license
+        self.consensus = consensus
+        self.blocked = blocked
+        self.mergeable = mergeable
+
+    @property
+    def users(self):
+        return self.votes.getVoters()
+
+    @property
+    def yes(self):
+        return self.votes.getVoters('+1')
+
+    @property
+    def no(self):
+        return self.votes.getVoters('-1')
+
+    @property
+    def contributors_yes(self):
+        return self.votes.getVoters('+1', contributors_only=True)
+
+    def hoursSinceLastUpdate(self):
+        return self.hours
+
+    def changesLicense(self):
+        return self.license
+
+    def changesConsensus(self):
+        return self.consensus
+
+    def isBlocked(self):
+        return self.blocked
+
+    def isMergeable(self):
+        return self.mergeable
+
+
+def getVoterKey(rules):
+    # Only these rules decide which reactions count as votes, so tallies are shared between rules that agree on them.
+    if not rules:
+        return None
+    return (rules.prevent_doubles, rules.contributors_only, rules.collaborators_only, rules.whitelist, rules.blacklist)
+
+
+class Simulator:
+    """Replay a Dataset against candidate rules without making any requests.
+
+    Votes are tallied once for every distinct set of voter rules. Decisions use BatchConsensus when NumPy is installed
+    and the Consensus class otherwise.
+    """
+
+    def __init__(self, dataset, vectorized=None):
+        self.dataset = dataset
+        self.vectorized = batch.numpy is not None if vectorized is None else vectorized
+        self.pull_requests = {}
+        self.tables = {}
+        if self.vectorized:
+            self.actual = batch.numpy.asarray(dataset.outcomes, dtype=object)
+
+    def getPullRequests(self, rules):
+        key = getVoterKey(rules)
+        if key not in self.pull_requests:
+            dataset = self.dataset
+            requests = []
+            for index, reactions in enumerate(dataset.reactions):
+                votes = VoteTally()
+                for username, content in reactions:
+                    castVote(votes, rules, dataset, username, content)
+                requests.append(SimulatedPullRequest(dataset.numbers[index], votes, dataset.hours[index],
+                                                     dataset.changes_license[index], dataset.changes_consensus[index],
+                                                     dataset.blocked[index], dataset.mergeable[index]))
+            self.pull_requests[key] = requests
+        return self.pull_requests[key]
+
+    def getTable(self, rules):
+        key = getVoterKey(rules)
+        if key not in self.tables:
+            self.tables[key] = batch.PullRequestTable.fromPullRequests(self.getPullRequests(rules))
+        return self.tables[key]
+
+    def simulate(self, rules):
+        """Count how many pull requests the rules would merge, close and leave open, and how many of those outcomes
+        differ from what actually happened."""
+        if self.vectorized:
+            return self.simulateBatch(rules)
+        consensus = Consensus(rules)
+        outcomes = []
+        for request in self.getPullRequests(rules):
+            if consensus.validate(request):
+                outcomes.append('merged')
+            elif rules and rules.timeout and not request.blocked and request.hours >= rules.timeout:
+                outcomes.append('closed')
+            else:
+                outcomes.append('open')
+        return self.summarize(outcomes, [outcome != actual for outcome, actual in zip(outcomes, self.dataset.outcomes)])
+
+    def simulateBatch(self, rules):
+        numpy = batch.numpy
+        table = self.getTable(rules)
+        merged, reasons = batch.BatchConsensus(rules).evaluate(table)
+        closed = numpy.zeros(len(table), dtype=bool)
+        if rules and rules.timeout:
+            closed = ~merged & ~table.blocked & (table.hours_since_update >= rules.timeout)
+        outcomes = numpy.where(merged, 'merged', numpy.where(closed, 'closed', 'open')).astype(object)
+        return self.summarize(outcomes, outcomes != self.actual)
+
+    def summarize(self, outcomes, changed):
+        outcomes = [outcome for outcome in outcomes]
+        return {
+            'merged': outcomes.count('merged'),
+            'closed': outcomes.count('closed'),
+            'open': outcomes.count('open'),
+            'changed': int(sum(changed)),
+        }
+
+
+top_level_settings = ['extra_labels', 'prevent_doubles']
+
+
+def parseVariation(text):
+    """Parse `name=value,value,...`, such as `quorum=3,5,7`, into a setting name and the values to try."""
+    if '=' not in text:
+        raise ValueError('Expected name=value,value,... but got "%s"' % (text,))
+    name, values = text.split('=', 1)
+    name = name.strip()
+    if name not in pull_request_settings and name not in top_level_settings:
+        raise ValueError('Unknown rule "%s"' % (name,))
+    return name, [yaml.safe_load(value) for value in values.split(',')]
+
+
+def buildVariants(settings, variations):
+    """Yield a description and compiled Rules for every combination of the variations applied to `settings`."""
+    settings = migrateSettings(settings)
+    names = [name for name, values in variations]
+    for combination in itertools.product(*[values for name, values in variations]):
+        variant = copy.deepcopy(settings)
+        for name, value in zip(names, combination):
+            if name in top_level_settings:
+                variant[name] = value
+            else:
+                variant.setdefault('pull_requests', {})[name] = value
+        yield ' '.join('%s=%s' % (name, json.dumps(value)) for name, value in zip(names, combination)), compileRules(variant)
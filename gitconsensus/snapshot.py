@@ -0,0 +1,275 @@
+import datetime
+
+# Pull requests fetched per GraphQL page. Every pull request also pulls up to 100 labels, files and reactions, so this
+# is kept well below the GraphQL node limit.
+page_size = 50
+
+# Cheap fields that identify whether a pull request changed. The latest reaction id catches votes that were swapped
+# without changing the total count.
+index_fields = """
+number
+title
+createdAt
+updatedAt
+mergeable
+headRefOid
+labels(first: 100) { nodes { name } }
+latestReaction: reactions(last: 1) { totalCount nodes { id } }
+"""
+
+pull_request_fields = index_fields + """
+files(first: 100) { pageInfo { hasNextPage endCursor } nodes { path } }
+commits(last: 1) { nodes { commit { authoredDate } } }
+reactions(first: 100) { totalCount pageInfo { hasNextPage endCursor } nodes { content user { login } } }
+"""
+
+pull_requests_query = """
+query($owner: String!, $name: String!, $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    pullRequests(states: OPEN, first: %s, after: $cursor, orderBy: {field: CREATED_AT, direction: ASC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes { %%s }
+    }
+  }
+}
+""" % (page_size,)
+
+# Every pull request, open or not, newest first.
+history_query = """
+query($owner: String!, $name: String!, $cursor: String, $first: Int!) {
+  repository(owner: $owner, name: $name) {
+    pullRequests(first: $first, after: $cursor, orderBy: {field: CREATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        number
+        state
+        createdAt
+        closedAt
+        mergedAt
+        mergeable
+        labels(first: 100) { nodes { name } }
+        files(first: 100) { pageInfo { hasNextPage endCursor } nodes { path } }
+        commits(last: 1) { nodes { commit { authoredDate } } }
+        reactions(first: 100) { pageInfo { hasNextPage endCursor } nodes { content createdAt user { login } } }
+      }
+    }
+  }
+}
+"""
+
+selected_query = """
+query($owner: String!, $name: String!) {
+  repository(owner: $owner, name: $name) {
+    %s
+  }
+}
+"""
+
+connection_query = """
+query($owner: String!, $name: String!, $number: Int!, $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    pullRequest(number: $number) {
+      %s
+    }
+  }
+}
+"""
+
+connection_fields = {
+    'files': 'files(first: 100, after: $cursor) { pageInfo { hasNextPage endCursor } nodes { path } }',
+    'reactions': 'reactions(first: 100, after: $cursor) { pageInfo { hasNextPage endCursor } nodes { content createdAt user { login } } }',
+}
+
+# GraphQL reaction names mapped back to the names used by the REST api.
+reaction_content = {
+    'THUMBS_UP': '+1',
+    'THUMBS_DOWN': '-1',
+    'CONFUSED': 'confused',
+    'LAUGH': 'laugh',
+    'HOORAY': 'hooray',
+    'HEART': 'heart',
+    'ROCKET': 'rocket',
+    'EYES': 'eyes',
+}
+
+mergeable_states = {
+    'MERGEABLE': True,
+    'CONFLICTING': False,
+    'UNKNOWN': None,
+}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def graphqlUrl(client):
+    url = client._build_url('graphql')
+    # Github Enterprise serves GraphQL from /api/graphql rather than under the /api/v3 REST prefix.
+    if url.endswith('/api/v3/graphql'):
+        return url[:-len('/v3/graphql')] + '/graphql'
+    return url
+
+
+def graphqlRequest(query, variables, client):
+    res = client._post(graphqlUrl(client), data={'query': query, 'variables': variables})
+    if res.status_code != 200:
+        raise SnapshotError('GraphQL request failed with status %s' % (res.status_code,))
+    results = res.json()
+    if results.get('errors'):
+        raise SnapshotError('; '.join(error.get('message', '') for error in results['errors']))
+    return results['data']
+
+
+def parseTimestamp(timestamp):
+    if not timestamp:
+        return None
+    # 2017-08-19T23:29:31Z
+    return datetime.datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%SZ')
+
+
+def convertReaction(node):
+    if not node.get('user'):
+        # Reactions from deleted accounts have no user attached.
+        return None
+    return {
+        'content': reaction_content.get(node['content'], node['content'].lower()),
+        'user': {'login': node['user']['login']}
+    }
+
+
+def formatTimestamp(timestamp):
+    if not timestamp:
+        return None
+    return timestamp.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class PullRequestSnapshot:
+
+    def __init__(self, node):
+        self.number = node['number']
+        self.title = node['title']
+        self.created_at = parseTimestamp(node['createdAt'])
+        self.updated_at = parseTimestamp(node['updatedAt'])
+        self.mergeable = mergeable_states.get(node['mergeable'])
+        self.head_sha = node['headRefOid']
+        self.labels = [label['name'] for label in node['labels']['nodes']]
+        self.reaction_count = node['latestReaction']['totalCount']
+        latest = node['latestReaction']['nodes']
+        self.latest_reaction = latest[-1]['id'] if latest else None
+
+        # Index only snapshots are completed later, either from a full load or from stored state.
+        self.files = None
+        self.files_cursor = None
+        self.reactions = None
+        self.last_commit_at = None
+        if 'files' in node:
+            # Only the first page of files is kept; the rest is read when classifying the files needs it.
+            self.files = [changed_file['path'] for changed_file in node['files']['nodes']]
+            if node['files']['pageInfo']['hasNextPage']:
+                self.files_cursor = node['files']['pageInfo']['endCursor']
+            self.reactions = [reaction for reaction in map(convertReaction, node['reactions']['nodes']) if reaction]
+            commits = node['commits']['nodes']
+            self.last_commit_at = parseTimestamp(commits[-1]['commit']['authoredDate']) if commits else None
+
+    def isComplete(self):
+        return self.files is not None
+
+    def fingerprint(self):
+        return '%s:%s:%s' % (self.head_sha, self.reaction_count, self.latest_reaction)
+
+    def getState(self):
+        return {
+            'files': self.files,
+            'files_cursor': self.files_cursor,
+            'reactions': self.reactions,
+            'last_commit_at': formatTimestamp(self.last_commit_at),
+        }
+
+    def setState(self, state):
+        self.files = state['files']
+        self.files_cursor = state.get('files_cursor')
+        self.reactions = state['reactions']
+        self.last_commit_at = parseTimestamp(state['last_commit_at'])
+
+
+class SnapshotLoader:
+    """Load every open pull request, with the data needed to evaluate it, using batched GraphQL queries."""
+
+    def __init__(self, client, user, repository):
+        self.client = client
+        self.user = user
+        self.name = repository
+
+    def load(self):
+        return self.loadOpen(pull_request_fields)
+
+    def loadIndex(self):
+        return self.loadOpen(index_fields)
+
+    def loadOpen(self, fields):
+        snapshots = []
+        cursor = None
+        query = pull_requests_query % (fields,)
+        while True:
+            data = self.query(query, {'cursor': cursor})
+            connection = data['repository']['pullRequests']
+            snapshots += [self.buildSnapshot(node) for node in connection['nodes']]
+            if not connection['pageInfo']['hasNextPage']:
+                return snapshots
+            cursor = connection['pageInfo']['endCursor']
+
+    def loadHistory(self, limit):
+        """Load up to `limit` of the most recent pull requests in any state, with all of their reactions.
+
+        Only the first page of files is included; the rest can be read with iterRemaining.
+        """
+        nodes = []
+        cursor = None
+        while len(nodes) < limit:
+            data = self.query(history_query, {'cursor': cursor, 'first': min(page_size, limit - len(nodes))})
+            connection = data['repository']['pullRequests']
+            for node in connection['nodes']:
+                if node['reactions']['pageInfo']['hasNextPage']:
+                    node['reactions']['nodes'] += self.loadRemaining(node['number'], 'reactions', node['reactions']['pageInfo'])
+                nodes.append(node)
+            if not connection['pageInfo']['hasNextPage']:
+                break
+            cursor = connection['pageInfo']['endCursor']
+        return nodes
+
+    def loadPullRequests(self, numbers):
+        snapshots = []
+        numbers = [number for number in numbers]
+        for offset in range(0, len(numbers), page_size):
+            batch = numbers[offset:offset + page_size]
+            selections = ['pr%s: pullRequest(number: %s) { %s }' % (number, number, pull_request_fields) for number in batch]
+            data = self.query(selected_query % ('\n'.join(selections),), {})
+            snapshots += [self.buildSnapshot(data['repository']['pr%s' % (number,)]) for number in batch]
+        return snapshots
+
+    def buildSnapshot(self, node):
+        snapshot = PullRequestSnapshot(node)
+        if 'files' not in node:
+            return snapshot
+        if node['reactions']['pageInfo']['hasNextPage']:
+            reactions = self.loadRemaining(snapshot.number, 'reactions', node['reactions']['pageInfo'])
+            snapshot.reactions += [reaction for reaction in map(convertReaction, reactions) if reaction]
+        return snapshot
+
+    def loadRemaining(self, number, field, page_info):
+        return [node for node in self.iterRemaining(number, field, page_info['endCursor'])]
+
+    def iterRemaining(self, number, field, cursor):
+        """Yield the rest of a pull request's files or reactions, starting after `cursor`, one page at a time."""
+        query = connection_query % (connection_fields[field],)
+        while cursor:
+            data = self.query(query, {'number': number, 'cursor': cursor})
+            connection = data['repository']['pullRequest'][field]
+            for node in connection['nodes']:
+                yield node['path'] if field == 'files' else node
+            cursor = connection['pageInfo']['endCursor'] if connection['pageInfo']['hasNextPage'] else None
+
+    def query(self, query, variables):
+        variables = dict(variables, owner=self.user, name=self.name)
+        return graphqlRequest(query, variables, self.client)
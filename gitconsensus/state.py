@@ -0,0 +1,145 @@
+import json
+import sqlite3
+import threading
+import time
+
+schema = """
+CREATE TABLE IF NOT EXISTS pull_requests (
+    repository TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    head_sha TEXT,
+    reaction_count INTEGER,
+    labels TEXT,
+    state TEXT NOT NULL,
+    decision TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (repository, number)
+);
+CREATE TABLE IF NOT EXISTS members (
+    repository TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    users TEXT,
+    loaded_at REAL NOT NULL,
+    PRIMARY KEY (repository, kind)
+);
+CREATE TABLE IF NOT EXISTS rules (
+    repository TEXT PRIMARY KEY,
+    blob_sha TEXT NOT NULL,
+    settings TEXT,
+    loaded_at REAL NOT NULL
+);
+"""
+
+
+def rulesKey(rules):
+    # Stored votes depend on the voting rules (whitelists, doubles and so on), so a rule change invalidates them.
+    return rules.key if rules else 'none'
+
+
+class StateStore:
+    """Remember what each open pull request looked like the last time it was evaluated.
+
+    Pull requests whose head commit and reactions are unchanged are rebuilt from the stored data instead of being
+    fetched again. Time based checks still run against the stored timestamps, so they stay current.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(schema)
+        self.connection.commit()
+
+    def restore(self, repository, snapshots, rules):
+        """Fill in unchanged snapshots from the store and return the ones that need to be loaded from Github."""
+        rules_key = rulesKey(rules)
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT number, fingerprint, state FROM pull_requests WHERE repository = ?', (repository,))
+            stored = {number: (fingerprint, state) for number, fingerprint, state in rows}
+
+        changed = []
+        for snapshot in snapshots:
+            fingerprint = '%s:%s' % (snapshot.fingerprint(), rules_key)
+            if snapshot.number in stored and stored[snapshot.number][0] == fingerprint:
+                snapshot.setState(json.loads(stored[snapshot.number][1]))
+            else:
+                changed.append(snapshot)
+        return changed
+
+    def save(self, repository, snapshots, rules, open_numbers=None):
+        rules_key = rulesKey(rules)
+        rows = []
+        for snapshot in snapshots:
+            rows.append((
+                repository,
+                snapshot.number,
+                '%s:%s' % (snapshot.fingerprint(), rules_key),
+                snapshot.head_sha,
+                snapshot.reaction_count,
+                json.dumps(snapshot.labels),
+                json.dumps(snapshot.getState()),
+                time.time()
+            ))
+        with self.lock:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO pull_requests '
+                '(repository, number, fingerprint, head_sha, reaction_count, labels, state, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            if open_numbers is not None:
+                # Anything no longer open has been merged or closed and will not be seen again.
+                stored = self.connection.execute('SELECT number FROM pull_requests WHERE repository = ?', (repository,))
+                closed = [(repository, number) for (number,) in stored if number not in open_numbers]
+                self.connection.executemany('DELETE FROM pull_requests WHERE repository = ? AND number = ?', closed)
+            self.connection.commit()
+
+    def recordDecision(self, repository, number, decision):
+        with self.lock:
+            self.connection.execute(
+                'UPDATE pull_requests SET decision = ? WHERE repository = ? AND number = ?',
+                (decision, repository, number))
+            self.connection.commit()
+
+    def getDecision(self, repository, number):
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT decision FROM pull_requests WHERE repository = ? AND number = ?',
+                (repository, number)).fetchone()
+        return row[0] if row else None
+
+    def getMembers(self, repository, kind):
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT users, loaded_at FROM members WHERE repository = ? AND kind = ?', (repository, kind)).fetchone()
+        if not row:
+            return None
+        users = json.loads(row[0])
+        return row[1], set(users) if users is not None else None
+
+    def saveMembers(self, repository, kind, users, loaded_at):
+        users = sorted(users) if users is not None else None
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO members (repository, kind, users, loaded_at) VALUES (?, ?, ?, ?)',
+                (repository, kind, json.dumps(users), loaded_at))
+            self.connection.commit()
+
+    def getRules(self, repository):
+        """Return the blob SHA and migrated settings of the rules last loaded for a repository, or None."""
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT blob_sha, settings FROM rules WHERE repository = ?', (repository,)).fetchone()
+        if not row:
+            return None
+        return row[0], json.loads(row[1]) if row[1] else None
+
+    def saveRules(self, repository, blob_sha, settings):
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO rules (repository, blob_sha, settings, loaded_at) VALUES (?, ?, ?, ?)',
+                (repository, blob_sha, json.dumps(settings) if settings else None, time.time()))
+            self.connection.commit()
+
+    def close(self):
+        self.connection.close()
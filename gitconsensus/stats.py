@@ -0,0 +1,213 @@
+import functools
+import json
+import os
+import re
+import threading
+import time
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+endpoint_patterns = [
+    ('graphql', re.compile(r'/graphql$')),
+    ('reactions', re.compile(r'/reactions(\?|$)')),
+    ('labels', re.compile(r'/labels(/|\?|$)')),
+    ('comments', re.compile(r'/comments(\?|$)')),
+    ('files', re.compile(r'/pulls/\d+/files')),
+    ('commits', re.compile(r'/commits(/|\?|$)')),
+    ('content', re.compile(r'/contents/')),
+    ('members', re.compile(r'/(contributors|collaborators)(/|\?|$)')),
+    ('merge', re.compile(r'/pulls/\d+/merge$')),
+    ('pulls', re.compile(r'/pulls(/|\?|$)')),
+    ('issues', re.compile(r'/issues(/|\?|$)')),
+]
+
+
+# Pull requests with per check timings. Long running commands evaluate the same pull requests over and over, so only
+# the most recently recorded ones are kept.
+max_timed_pull_requests = 1000
+
+
+def getEndpoint(url):
+    path = url.split('?', 1)[0]
+    for name, pattern in endpoint_patterns:
+        if pattern.search(path):
+            return name
+    return 'other'
+
+
+class Stats:
+    """Collect request counts, latency and bytes per endpoint type, and how long each consensus check takes."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = {}
+            self.checks = {}
+            self.pull_requests = {}
+            self.transport = {'requests': 0, 'connections': 0}
+            self.started = time.time()
+
+    def recordRequest(self, endpoint, seconds, size, cached=False, error=False):
+        with self.lock:
+            entry = self.requests.setdefault(endpoint, {'count': 0, 'cached': 0, 'errors': 0, 'seconds': 0.0, 'bytes': 0})
+            entry['count'] += 1
+            entry['seconds'] += seconds
+            entry['bytes'] += size
+            if cached:
+                entry['cached'] += 1
+            if error:
+                entry['errors'] += 1
+
+    def recordTransport(self, requests=0, connections=0):
+        """Count requests sent over the network and the connections opened for them."""
+        with self.lock:
+            self.transport['requests'] += requests
+            self.transport['connections'] += connections
+
+    def recordCheck(self, check, pull_request, seconds):
+        """Record a check's time for a pull request, named like owner/repo#12 so repositories do not mix."""
+        with self.lock:
+            entry = self.checks.setdefault(check, {'count': 0, 'seconds': 0.0, 'slowest': 0.0, 'slowest_pr': None})
+            entry['count'] += 1
+            entry['seconds'] += seconds
+            if seconds > entry['slowest']:
+                entry['slowest'] = seconds
+                entry['slowest_pr'] = pull_request
+            key = str(pull_request)
+            # Moved to the end, so the pull requests dropped first are the ones not evaluated for the longest time.
+            timings = self.pull_requests.pop(key, {})
+            timings[check] = timings.get(check, 0.0) + seconds
+            self.pull_requests[key] = timings
+            if len(self.pull_requests) > max_timed_pull_requests:
+                del self.pull_requests[next(iter(self.pull_requests))]
+
+    def getSummary(self):
+        with self.lock:
+            return {
+                'elapsed': time.time() - self.started,
+                'requests': {name: dict(entry) for name, entry in self.requests.items()},
+                'checks': {name: dict(entry) for name, entry in self.checks.items()},
+                'pull_requests': {number: dict(timings) for number, timings in self.pull_requests.items()},
+                'transport': dict(self.transport,
+                                  reused=max(self.transport['requests'] - self.transport['connections'], 0)),
+            }
+
+    def formatSummary(self):
+        summary = self.getSummary()
+        lines = ['Elapsed: %.2fs' % (summary['elapsed'],), '']
+        lines.append('%-12s %8s %8s %8s %10s %12s' % ('Endpoint', 'Requests', 'Cached', 'Errors', 'Seconds', 'Bytes'))
+        for name, entry in sorted(summary['requests'].items()):
+            lines.append('%-12s %8s %8s %8s %10.3f %12s' % (
+                name, entry['count'], entry['cached'], entry['errors'], entry['seconds'], entry['bytes']))
+        lines.append('')
+        lines.append('%-12s %8s %10s %10s  %s' % ('Check', 'Calls', 'Seconds', 'Slowest', 'Pull Request'))
+        for name, entry in sorted(summary['checks'].items()):
+            lines.append('%-12s %8s %10.4f %10.4f  %s' % (
+                name, entry['count'], entry['seconds'], entry['slowest'], entry['slowest_pr']))
+        transport = summary['transport']
+        if transport['requests']:
+            lines.append('')
+            lines.append('Connections: %s opened for %s requests, %.0f%% reused' % (
+                transport['connections'], transport['requests'], 100.0 * transport['reused'] / transport['requests']))
+        return '\n'.join(lines)
+
+    def formatPrometheus(self):
+        summary = self.getSummary()
+        metrics = [
+            ('gitconsensus_requests_total', 'counter', 'Github api requests.', 'requests', 'endpoint', 'count'),
+            ('gitconsensus_requests_cached_total', 'counter', 'Requests answered from the cache.', 'requests', 'endpoint', 'cached'),
+            ('gitconsensus_request_errors_total', 'counter', 'Requests that failed.', 'requests', 'endpoint', 'errors'),
+            ('gitconsensus_request_seconds_total', 'counter', 'Time spent on requests.', 'requests', 'endpoint', 'seconds'),
+            ('gitconsensus_request_bytes_total', 'counter', 'Response bytes received.', 'requests', 'endpoint', 'bytes'),
+            ('gitconsensus_checks_total', 'counter', 'Consensus checks run.', 'checks', 'check', 'count'),
+            ('gitconsensus_check_seconds_total', 'counter', 'Time spent in consensus checks.', 'checks', 'check', 'seconds'),
+        ]
+        lines = []
+        for metric, kind, description, group, label, field in metrics:
+            lines.append('# HELP %s %s' % (metric, description))
+            lines.append('# TYPE %s %s' % (metric, kind))
+            for name, entry in sorted(summary[group].items()):
+                lines.append('%s{%s="%s"} %s' % (metric, label, name, entry[field]))
+        transport = [
+            ('gitconsensus_network_requests_total', 'Requests sent over the network.', 'requests'),
+            ('gitconsensus_connections_opened_total', 'Connections opened to Github.', 'connections'),
+            ('gitconsensus_connections_reused_total', 'Requests sent over an already open connection.', 'reused'),
+        ]
+        for metric, description, field in transport:
+            lines.append('# HELP %s %s' % (metric, description))
+            lines.append('# TYPE %s counter' % (metric,))
+            lines.append('%s %s' % (metric, summary['transport'][field]))
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write a JSON export, or a Prometheus textfile when the path ends in .prom."""
+        if path.endswith('.prom'):
+            contents = self.formatPrometheus()
+        else:
+            contents = json.dumps(self.getSummary(), indent=2)
+        # Write and rename so collectors never read a partially written file.
+        temp = '%s.tmp' % (path,)
+        with open(temp, 'w') as f:
+            f.write(contents)
+        os.replace(temp, path)
+
+
+collector = Stats()
+
+
+def getPullRequestName(pr):
+    number = getattr(pr, 'number', None)
+    repository = getattr(pr, 'repository', None)
+    if repository is None:
+        return number
+    return '%s#%s' % (repository.getFullName(), number)
+
+
+def timedCheck(function):
+    """Record how long a Consensus check takes for each pull request when stats are enabled."""
+    name = function.__name__
+
+    @functools.wraps(function)
+    def wrapper(self, pr, *args, **kwargs):
+        if not collector.enabled:
+            return function(self, pr, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return function(self, pr, *args, **kwargs)
+        finally:
+            collector.recordCheck(name, getPullRequestName(pr), time.perf_counter() - start)
+    return wrapper
+
+
+class StatsAdapter(BaseAdapter):
+    """Transport adapter that records every request in a Stats collector."""
+
+    def __init__(self, stats=None, adapter=None):
+        super(StatsAdapter, self).__init__()
+        self.stats = stats or collector
+        self.adapter = adapter or HTTPAdapter()
+
+    def send(self, request, **kwargs):
+        if not self.stats.enabled:
+            return self.adapter.send(request, **kwargs)
+        start = time.perf_counter()
+        try:
+            response = self.adapter.send(request, **kwargs)
+            # Read the body here so the download is part of the measured latency.
+            size = len(response.content or b'')
+        except Exception:
+            self.stats.recordRequest(getEndpoint(request.url), time.perf_counter() - start, 0, error=True)
+            raise
+        self.stats.recordRequest(
+            getEndpoint(request.url),
+            time.perf_counter() - start,
+            size,
+            cached=getattr(response, 'from_cache', False),
+            error=response.status_code >= 400)
+        return response
+
+    def close(self):
+        self.adapter.close()
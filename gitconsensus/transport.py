@@ -0,0 +1,164 @@
+import io
+import threading
+import weakref
+from requests import Response
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.exceptions import ConnectionError, ConnectTimeout, ReadTimeout
+from requests.structures import CaseInsensitiveDict
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from gitconsensus.stats import collector
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+backends = ['urllib3', 'httpx']
+
+# Enough connections for the default number of workers plus the writes and GraphQL requests running beside them.
+default_pool_size = 32
+default_connect_timeout = 10
+default_read_timeout = 60
+
+
+def requireHttpx():
+    if httpx is None:
+        raise ImportError('HTTP/2 requires httpx, install it with "pip install gitconsensus[http2]".')
+
+
+def countingPool(base, stats, keep_alive=True):
+    """Return a subclass of the urllib3 pool `base` that records every connection it opens.
+
+    urllib3 reconnects dropped connections in place, so connects are counted rather than new connection objects.
+    Without keep-alive connections are closed as they go back into the pool, so none can be reused after the server
+    has started closing it.
+    """
+    class CountingConnection(base.ConnectionCls):
+        def connect(self):
+            if stats.enabled:
+                stats.recordTransport(connections=1)
+            return super(CountingConnection, self).connect()
+
+    class CountingPool(base):
+        ConnectionCls = CountingConnection
+
+        def _put_conn(self, conn):
+            # urllib3 has no public setting for this. http.client only drops a connection when the response itself
+            # says Connection: close, and servers that close without saying so leave a dead connection in the pool.
+            if not keep_alive and conn is not None:
+                conn.close()
+            return super(CountingPool, self)._put_conn(conn)
+    return CountingPool
+
+
+class PooledAdapter(HTTPAdapter):
+    """Send requests with urllib3 over a pool of up to `pool_size` persistent connections per host.
+
+    Requests past the pool size wait for a free connection instead of opening ones that are thrown away afterwards.
+    Without keep-alive every request asks the server to close its connection.
+    """
+
+    def __init__(self, pool_size=default_pool_size, keep_alive=True, stats=None):
+        self.keep_alive = keep_alive
+        self.stats = stats or collector
+        super(PooledAdapter, self).__init__(pool_maxsize=pool_size, pool_block=True)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(PooledAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': countingPool(HTTPConnectionPool, self.stats, self.keep_alive),
+            'https': countingPool(HTTPSConnectionPool, self.stats, self.keep_alive),
+        }
+
+    def send(self, request, **kwargs):
+        if not self.keep_alive:
+            request.headers['Connection'] = 'close'
+        if self.stats.enabled:
+            self.stats.recordTransport(requests=1)
+        return super(PooledAdapter, self).send(request, **kwargs)
+
+
+class HttpxAdapter(BaseAdapter):
+    """Send requests with httpx, which can multiplex them over a single HTTP/2 connection per host.
+
+    Servers that do not offer HTTP/2 are spoken to over HTTP/1.1 with the same pooling and keep-alive settings.
+    """
+
+    def __init__(self, pool_size=default_pool_size, keep_alive=True, http2=True, stats=None):
+        super(HttpxAdapter, self).__init__()
+        requireHttpx()
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size if keep_alive else 0)
+        self.client = httpx.Client(http2=http2, limits=limits)
+        self.stats = stats or collector
+        self.lock = threading.Lock()
+        # Streams are kept weakly so a closed connection can not be mistaken for a reused one.
+        self.streams = weakref.WeakSet()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = httpx.Timeout(read, connect=connect)
+        else:
+            timeout = httpx.Timeout(timeout)
+        try:
+            response = self.client.request(request.method, request.url, headers=dict(request.headers),
+                                           content=request.body, timeout=timeout)
+        except httpx.ConnectTimeout as error:
+            raise ConnectTimeout(error, request=request)
+        except httpx.ReadTimeout as error:
+            raise ReadTimeout(error, request=request)
+        except httpx.TransportError as error:
+            raise ConnectionError(error, request=request)
+        if self.stats.enabled:
+            self.recordStream(response.extensions.get('network_stream'))
+        return self.buildResponse(request, response)
+
+    def recordStream(self, stream):
+        with self.lock:
+            opened = stream is not None and stream not in self.streams
+            if opened:
+                self.streams.add(stream)
+        self.stats.recordTransport(requests=1, connections=1 if opened else 0)
+
+    def buildResponse(self, request, response):
+        result = Response()
+        result.status_code = response.status_code
+        result.reason = response.reason_phrase
+        # httpx has already decoded the body, so it must not be decoded again.
+        result.headers = CaseInsensitiveDict((name, response.headers[name]) for name in response.headers.keys()
+                                             if name != 'content-encoding')
+        result._content = response.content
+        result.raw = io.BytesIO(response.content)
+        result.encoding = response.charset_encoding
+        result.url = str(response.url)
+        result.elapsed = response.elapsed
+        result.request = request
+        result.connection = self
+        return result
+
+    def close(self):
+        self.client.close()
+
+
+class Transport:
+    """The connection settings shared by every request a client sends, from github3 or from raw api requests."""
+
+    def __init__(self, backend='urllib3', pool_size=default_pool_size, keep_alive=True,
+                 connect_timeout=default_connect_timeout, read_timeout=default_read_timeout):
+        if backend not in backends:
+            raise ValueError('Unknown transport backend %s' % (backend,))
+        self.backend = backend
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    def buildAdapter(self):
+        if self.backend == 'httpx':
+            return HttpxAdapter(self.pool_size, self.keep_alive)
+        return PooledAdapter(self.pool_size, self.keep_alive)
+
+    def configure(self, session):
+        # github3 passes these with every request it sends, githubApiRequest included.
+        session.default_connect_timeout = self.connect_timeout
+        session.default_read_timeout = self.read_timeout
@@ -0,0 +1,125 @@
+YES = '+1'
+NO = '-1'
+ABSTAIN = 'confused'
+
+vote_options = (YES, NO, ABSTAIN)
+
+
+def castVote(tally, rules, members, username, option):
+    """Record a reaction in `tally` if the rules count it as a vote.
+
+    `members` answers isContributor and isCollaborator, and is only asked when the rules need it.
+    """
+    if option not in vote_options:
+        return
+
+    if tally.isDouble(username):
+        return
+
+    if rules:
+        if rules.blacklist and username in rules.blacklist:
+            return
+
+        if rules.collaborators_only and not members.isCollaborator(username):
+            return
+
+        if rules.contributors_only and not members.isContributor(username):
+            return
+
+        if rules.whitelist and username not in rules.whitelist:
+            return
+
+        if rules.prevent_doubles:
+            # make sure user hasn't voted twice
+            if tally.hasVoted(username):
+                tally.exclude(username)
+                return
+
+    tally.add(username, option, members.isContributor(username))
+
+
+class VoteTally:
+    """Record every user's votes with constant time updates, lookups and counts.
+
+    Without `prevent_doubles` a user may vote for several options, and each of those votes counts towards the total,
+    so every user maps to the list of options they picked.
+    """
+    __slots__ = ('votes', 'contributors', 'doubles', 'counts', 'contributor_counts', 'total')
+
+    def __init__(self):
+        self.votes = {}
+        self.contributors = set()
+        # Dictionaries keep insertion order, so they double as ordered sets.
+        self.doubles = {}
+        self.counts = dict.fromkeys(vote_options, 0)
+        self.contributor_counts = dict.fromkeys(vote_options, 0)
+        self.total = 0
+
+    def add(self, username, option, contributor=False):
+        self.votes.setdefault(username, []).append(option)
+        self.counts[option] += 1
+        self.total += 1
+        if contributor:
+            self.contributors.add(username)
+            self.contributor_counts[option] += 1
+
+    def hasVoted(self, username):
+        return username in self.votes
+
+    def isDouble(self, username):
+        return username in self.doubles
+
+    def exclude(self, username):
+        """Drop all of a user's votes and remember them as having voted for multiple options."""
+        self.doubles[username] = True
+        contributor = username in self.contributors
+        for option in self.votes.pop(username, []):
+            self.counts[option] -= 1
+            self.total -= 1
+            if contributor:
+                self.contributor_counts[option] -= 1
+        self.contributors.discard(username)
+
+    def hasOption(self, username, option):
+        return option in self.votes.get(username, ())
+
+    def getVoters(self, option=None, contributors_only=False):
+        return VoteView(self, option, contributors_only)
+
+
+class VoteView:
+    """Read only, list like view of the users who cast a vote, with constant time `len()` and `in`."""
+    __slots__ = ('tally', 'option', 'contributors_only')
+
+    def __init__(self, tally, option=None, contributors_only=False):
+        self.tally = tally
+        self.option = option
+        self.contributors_only = contributors_only
+
+    def __len__(self):
+        if self.option is None:
+            return self.tally.total
+        if self.contributors_only:
+            return self.tally.contributor_counts[self.option]
+        return self.tally.counts[self.option]
+
+    def __contains__(self, username):
+        if self.contributors_only and username not in self.tally.contributors:
+            return False
+        if self.option is None:
+            return self.tally.hasVoted(username)
+        return self.tally.hasOption(username, self.option)
+
+    def __iter__(self):
+        for username, options in self.tally.votes.items():
+            if self.contributors_only and username not in self.tally.contributors:
+                continue
+            for option in options:
+                if self.option is None or option == self.option:
+                    yield username
+
+    def __eq__(self, other):
+        return [username for username in self] == [username for username in other]
+
+    def __repr__(self):
+        return repr([username for username in self])
@@ -0,0 +1,255 @@
+import collections
+import hashlib
+import hmac
+import json
+import math
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+from gitconsensus.engine import Engine
+from gitconsensus.labels import blocking_labels
+from gitconsensus.planner import Executor, Planner
+
+# Pull request actions that can change a decision. Closing only needs the pending timer cancelled.
+pull_request_actions = [
+    'opened',
+    'reopened',
+    'synchronize',
+    'edited',
+    'labeled',
+    'unlabeled',
+    'ready_for_review',
+    'closed',
+]
+
+
+def verifySignature(secret, body, signature):
+    """Check the X-Hub-Signature-256 header Github sends with every delivery against the shared secret."""
+    if not secret or not signature or not signature.startswith('sha256='):
+        return False
+    expected = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest('sha256=%s' % (expected,), signature)
+
+
+def parseEvent(event, payload):
+    """Work out which pull request a webhook event can affect.
+
+    Returns a tuple of the repository name, the pull request number and whether the rules need reloading, or None
+    when the event can not change any decision. The number is None when every open pull request may be affected.
+    """
+    repository = (payload.get('repository') or {}).get('full_name')
+    if not repository:
+        return None
+    if event == 'pull_request':
+        if payload.get('action') in pull_request_actions:
+            return repository, int(payload['pull_request']['number']), False
+    elif event == 'issue_comment':
+        # Github sends no events for reactions, but a comment usually comes with some and is the nearest signal.
+        issue = payload['issue']
+        if 'pull_request' in issue and issue.get('state') == 'open':
+            return repository, int(issue['number']), False
+    elif event == 'push':
+        # Pushes to pull request branches arrive as `synchronize`, so only rule changes on the default branch matter.
+        if payload.get('ref') == 'refs/heads/%s' % (payload['repository'].get('default_branch'),):
+            for commit in payload.get('commits', []):
+                if '.gitconsensus.yaml' in commit.get('added', []) + commit.get('modified', []) + commit.get('removed', []):
+                    return repository, None, True
+    elif event == 'label':
+        # Renaming or deleting a blocking label unblocks every pull request that had it.
+        names = [payload['label']['name'], ((payload.get('changes') or {}).get('name') or {}).get('from', '')]
+        if payload.get('action') in ['edited', 'deleted'] and any(name.lower() in blocking_labels for name in names):
+            return repository, None, False
+    return None
+
+
+def getNextCheck(request, rules, now=None):
+    """Return when the next time based rule changes for the pull request, or None if none will."""
+    if not rules:
+        return None
+    thresholds = [rules.merge_delay, rules.merge_delay_min, rules.license_delay, rules.consensus_delay, rules.timeout]
+    thresholds = [threshold for threshold in thresholds if threshold]
+    if not thresholds:
+        return None
+    hours = request.hoursSinceLastUpdate()
+    upcoming = [threshold for threshold in thresholds if threshold > hours]
+    if not upcoming:
+        return None
+    return (now or time.time()) + (min(upcoming) - hours) * 3600
+
+
+class TimerWheel:
+    """Hashed timer wheel for the checks that only depend on time passing, such as delays and timeouts.
+
+    Timers are kept in `size` slots of `resolution` seconds each, so scheduling, cancelling and advancing do not depend
+    on how many timers are pending. Timers further out than one rotation wait in their slot for later rounds. Each key
+    has at most one timer and scheduling it again replaces the old one.
+    """
+
+    def __init__(self, resolution=60, size=1024, now=None):
+        self.resolution = resolution
+        self.slots = [{} for _ in range(size)]
+        self.timers = {}
+        self.tick = int((time.time() if now is None else now) // resolution)
+
+    def __len__(self):
+        return len(self.timers)
+
+    def schedule(self, key, when):
+        self.cancel(key)
+        # Rounding up means a timer never fires early, only up to one resolution late.
+        tick = max(int(math.ceil(when / self.resolution)), self.tick + 1)
+        self.slots[tick % len(self.slots)][key] = tick
+        self.timers[key] = tick
+
+    def cancel(self, key):
+        tick = self.timers.pop(key, None)
+        if tick is not None:
+            del self.slots[tick % len(self.slots)][key]
+
+    def advance(self, now):
+        """Move the wheel forward to `now` and return the keys of the timers that expired, earliest first."""
+        target = int(now // self.resolution)
+        due = []
+        for tick in range(self.tick + 1, min(target, self.tick + len(self.slots)) + 1):
+            slot = self.slots[tick % len(self.slots)]
+            for key, expires in [item for item in slot.items() if item[1] <= target]:
+                del slot[key]
+                del self.timers[key]
+                due.append((expires, key))
+        self.tick = max(self.tick, target)
+        return [key for expires, key in sorted(due, key=lambda item: item[0])]
+
+
+class EventProcessor:
+    """Re-evaluate only the pull requests that webhook events and expired timers point at.
+
+    Events are queued by the HTTP server threads and processed one at a time by `run`, so repositories are never
+    evaluated concurrently. Several events for the same pull request that arrive before it is processed are handled
+    once, using the pull request payload from the latest event that had one. Github sends no events for reactions, so
+    each repository is still swept at its configured interval.
+    """
+
+    def __init__(self, jobs, report=None, clock=time.time, wheel=None):
+        self.jobs = {('%s/%s' % (job.user, job.name)).lower(): job for job in jobs}
+        self.report = report
+        self.clock = clock
+        self.wheel = wheel or TimerWheel(now=clock())
+        self.pending = collections.OrderedDict()
+        self.condition = threading.Condition()
+        for name in self.jobs:
+            # The first sweep catches up on anything that happened while the receiver was not running.
+            self.pending[(name, None)] = (False, None)
+
+    def submit(self, event, payload):
+        """Queue the work for an event, returning False if the event was ignored."""
+        target = parseEvent(event, payload)
+        if not target or target[0].lower() not in self.jobs:
+            return False
+        name, number, reload = target
+        data = payload.get('pull_request') if event == 'pull_request' else None
+        with self.condition:
+            key = (name.lower(), number)
+            pending_reload, pending_data = self.pending.get(key, (False, None))
+            self.pending[key] = (pending_reload or reload, data or pending_data)
+            self.condition.notify()
+        return True
+
+    def processOnce(self, timeout=None):
+        with self.condition:
+            if not self.pending and timeout:
+                self.condition.wait(timeout)
+            pending = self.pending
+            self.pending = collections.OrderedDict()
+        for key in self.wheel.advance(self.clock()):
+            pending.setdefault(key, (False, None))
+        for (name, number), (reload, data) in pending.items():
+            try:
+                self.handle(name, number, reload, data)
+            except Exception:
+                # One failing pull request should not stop the others from being processed.
+                self.reportError(name, number)
+        return len(pending)
+
+    def reportError(self, name, number):
+        if self.report:
+            self.report('Error processing %s#%s:\n%s' % (name, number, traceback.format_exc()))
+
+    def run(self, stop=None):
+        while stop is None or not stop.is_set():
+            self.processOnce(self.wheel.resolution)
+
+    def handle(self, name, number, reload=False, data=None):
+        job = self.jobs[name]
+        if number is None:
+            # Scheduled first, so a sweep that fails is still retried at the next interval.
+            self.wheel.schedule((name, None), self.clock() + job.interval)
+        if reload:
+            job.expireRules()
+        repository = job.getRepository()
+        if number is None:
+            for request in Engine(repository, job.workers).getPullRequests():
+                try:
+                    self.evaluate(name, job, request)
+                except Exception:
+                    self.reportError(name, request.number)
+            return
+        request = repository.getPullRequest(number, data)
+        if request.state != 'open':
+            self.wheel.cancel((name, number))
+            return
+        self.evaluate(name, job, request)
+
+    def evaluate(self, name, job, request):
+        repository = job.repository
+        plan = Planner(Engine(repository, job.workers)).planPullRequest(request, job.commands)
+        results = Executor(repository).apply(plan, self.report)
+        key = (name, int(request.number))
+        decided = any(result and action['action'] in ['merge', 'close'] for action, result in zip(plan['actions'], results))
+        when = None if decided else getNextCheck(request, repository.rules, self.clock())
+        if when:
+            self.wheel.schedule(key, when)
+        else:
+            self.wheel.cancel(key)
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    server_version = 'gitconsensus'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not verifySignature(self.server.secret, body, self.headers.get('X-Hub-Signature-256')):
+            return self.respond(401, 'Invalid signature')
+        try:
+            if self.headers.get('Content-Type', '').startswith('application/x-www-form-urlencoded'):
+                body = parse_qs(body.decode('utf-8'))['payload'][0]
+            payload = json.loads(body)
+        except (KeyError, ValueError):
+            return self.respond(400, 'Invalid payload')
+        if self.server.processor.submit(self.headers.get('X-GitHub-Event'), payload):
+            self.respond(202, 'Queued')
+        else:
+            self.respond(200, 'Ignored')
+
+    def respond(self, status, message):
+        body = message.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.report:
+            self.server.report('%s %s' % (self.address_string(), format % args))
+
+
+class WebhookServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, secret, processor, report=None):
+        self.secret = secret
+        self.processor = processor
+        self.report = report
+        super().__init__(address, WebhookHandler)
@@ -9,7 +9,7 @@ setup(
   name = 'gitconsensus',
 
   version = version,
-  packages=find_packages(),
+  packages=find_packages(exclude=['benchmarks']),
 
   description = 'Automate Github Pull Requests using Reactions',
   long_description=open('README.md').read(),
@@ -39,10 +39,18 @@ setup(
     'github3.py>=1,<2',
     'PyYAML>=3.12,<6',
     'requests>=2.18.0,<3',
-    'semantic_version>=2.6.0,<3'
+    'semantic_version>=2.6.0,<3',
+    # gitconsensus.transport subclasses the urllib3 connection pools.
+    'urllib3>=1.21.1,<3'
   ],
 
   extras_require={
+    'batch': [
+      'numpy'
+    ],
+    'http2': [
+      'httpx[http2]'
+    ],
     'dev': [
       'twine',
       'wheel'
@@ -0,0 +1,52 @@
+import glob
+import http.server
+import json
+import os
+import threading
+
+fixture_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class ReplayServer:
+    """Stand in for the Github api by answering every request with the next recorded response, in order."""
+
+    def __init__(self, recording):
+        paths = sorted(glob.glob(os.path.join(fixture_dir, recording, '*.json')))
+        self.responses = [open(path, 'rb').read() for path in paths]
+        self.requests = []
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+
+            def handle_one_request_body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                server.requests.append((self.command, self.path, json.loads(body) if body else None))
+                if not server.responses:
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                payload = server.responses.pop(0)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = handle_one_request_body
+            do_POST = handle_one_request_body
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%s/' % (self.httpd.server_address[1],)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,77 @@
+import random
+import pytest
+from gitconsensus.repository import Consensus
+from gitconsensus.rules import compileRules
+
+numpy = pytest.importorskip('numpy')
+from gitconsensus.batch import BatchConsensus, PullRequestTable
+
+
+class FakePullRequest:
+
+    def __init__(self, number, rng):
+        self.number = number
+        yes = rng.randint(0, 8)
+        no = rng.randint(0, 4)
+        self.yes = ['yes%s' % (i,) for i in range(yes)]
+        self.no = ['no%s' % (i,) for i in range(no)]
+        self.users = self.yes + self.no + ['abstain%s' % (i,) for i in range(rng.randint(0, 2))]
+        self.contributors_yes = self.yes[:rng.randint(0, yes)]
+        self.hours = rng.uniform(0, 100)
+        self.license = rng.random() < 0.2
+        self.consensus = rng.random() < 0.2
+        self.blocked = rng.random() < 0.1
+        self.mergeable = rng.random() < 0.9
+
+    def hoursSinceLastUpdate(self):
+        return self.hours
+
+    def changesLicense(self):
+        return self.license
+
+    def changesConsensus(self):
+        return self.consensus
+
+    def isBlocked(self):
+        return self.blocked
+
+    def isMergeable(self):
+        return self.mergeable
+
+
+rule_sets = [
+    {'quorum': 4, 'threshold': 0.65},
+    {'quorum': 3, 'threshold': 0.5, 'merge_delay': 24, 'delay_override': 3, 'merge_delay_min': 2},
+    {'threshold': 0.75, 'license_lock': True, 'consensus_delay': 48, 'license_delay': 72, 'merge_delay': 12},
+    {'consensus_lock': True, 'merge_delay': 48},
+]
+
+
+@pytest.mark.parametrize('settings', rule_sets)
+def test_batch_matches_consensus(settings):
+    rules = compileRules({'version': 3, 'pull_requests': settings})
+    rng = random.Random(7)
+    requests = [FakePullRequest(number, rng) for number in range(1, 501)]
+    table = PullRequestTable.fromPullRequests(requests, rules)
+    passed, reasons = BatchConsensus(rules).evaluate(table)
+
+    consensus = Consensus(rules)
+    expected = [consensus.validate(request) for request in requests]
+    assert passed.tolist() == expected
+    assert all((reason == '') == result for reason, result in zip(reasons, expected))
+
+
+def test_failure_reasons():
+    rules = compileRules({'version': 3, 'pull_requests': {'quorum': 2, 'threshold': 0.5, 'merge_delay': 24}})
+    table = PullRequestTable({
+        'number': [1, 2, 3, 4, 5],
+        'voters': [3, 1, 3, 3, 3],
+        'yes': [3, 1, 0, 3, 3],
+        'no': [0, 0, 3, 0, 0],
+        'hours_since_update': [30, 30, 30, 1, 30],
+        'mergeable': [True, True, True, True, True],
+        'blocked': [False, False, False, False, True],
+    })
+    passed, reasons = BatchConsensus(rules).evaluate(table)
+    assert passed.tolist() == [True, False, False, False, False]
+    assert reasons.tolist() == ['', 'no quorum', 'not passing', 'too new', 'blocked']
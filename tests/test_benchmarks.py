@@ -0,0 +1,51 @@
+from benchmarks.run import findRegressions, runCommand
+from benchmarks.startup import parseImportTimes
+
+parameters = {
+    'pulls': 6,
+    'reactions': 8,
+    'files': 2,
+    'commits': 2,
+    'latency': 0,
+    'workers': 2,
+    'seed': 1,
+    'cache': False,
+}
+
+
+def test_list_end_to_end():
+    result = runCommand('list', parameters)
+    # The rules file, the repository and a single GraphQL page cover every pull request.
+    assert result['requests'] == 4
+    assert result['writes'] == 0
+    assert result['endpoints']['graphql'] == 1
+
+
+def test_merge_end_to_end():
+    result = runCommand('merge', parameters, trace_memory=True)
+    state = result['state']
+    assert state['merged']
+    assert state['comments'] == len(state['merged'])
+    assert sorted(state['open'] + state['merged']) == list(range(1, 7))
+    for number in state['merged']:
+        assert 'gc-merged' in state['labels'][str(number)]
+    assert result['peak_memory'] > 0
+
+
+def test_find_regressions():
+    baseline = {'results': {'list': {'requests': 4, 'seconds': 1.0, 'peak_memory': 1000}}}
+    assert findRegressions({'list': {'requests': 4, 'seconds': 1.1, 'peak_memory': 1000}}, baseline, 0.25) == []
+    regressions = findRegressions({'list': {'requests': 5, 'seconds': 2.0, 'peak_memory': 1000}}, baseline, 0.25)
+    assert len(regressions) == 2
+
+
+def test_parse_import_times():
+    output = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _json
+import time:       300 |        420 | json
+import time:        50 |         50 | gitconsensus
+something else printed to stderr
+import time:       900 |       1800 |   gitconsensus.engine
+import time:       100 |       1900 | gitconsensus.gitconsensus
+"""
+    assert parseImportTimes(output) == {'json': 420, 'gitconsensus': 50, 'gitconsensus.gitconsensus': 1900}
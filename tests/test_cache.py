@@ -0,0 +1,62 @@
+import requests
+from gitconsensus.cache import CachingAdapter, ResponseCache
+from requests.adapters import BaseAdapter
+from requests.models import Response
+
+
+class RecordingAdapter(BaseAdapter):
+
+    def __init__(self):
+        super(RecordingAdapter, self).__init__()
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(dict(request.headers))
+        response = Response()
+        response.request = request
+        response.url = request.url
+        if request.headers.get('If-None-Match') == '"abc"':
+            response.status_code = 304
+            response._content = b''
+        else:
+            response.status_code = 200
+            response.headers['ETag'] = '"abc"'
+            response._content = b'{"login": "alice"}'
+        return response
+
+    def close(self):
+        pass
+
+
+def test_conditional_requests(tmpdir):
+    transport = RecordingAdapter()
+    session = requests.Session()
+    session.mount('https://', CachingAdapter(ResponseCache(str(tmpdir)), transport))
+
+    assert session.get('https://api.github.com/users/alice').json() == {'login': 'alice'}
+    assert 'If-None-Match' not in transport.requests[0]
+
+    response = session.get('https://api.github.com/users/alice')
+    assert response.status_code == 200
+    assert response.json() == {'login': 'alice'}
+    assert transport.requests[1]['If-None-Match'] == '"abc"'
+
+
+def test_fresh_entries_skip_the_network(tmpdir):
+    transport = RecordingAdapter()
+    session = requests.Session()
+    session.mount('https://', CachingAdapter(ResponseCache(str(tmpdir), ttl=60), transport))
+    session.get('https://api.github.com/users/alice')
+    session.get('https://api.github.com/users/alice')
+    assert len(transport.requests) == 1
+
+
+def test_eviction(tmpdir):
+    transport = RecordingAdapter()
+    cache = ResponseCache(str(tmpdir), max_entries=10)
+    session = requests.Session()
+    session.mount('https://', CachingAdapter(cache, transport))
+    for number in range(25):
+        session.get('https://api.github.com/users/user%s' % (number,))
+    assert cache.entries <= 10
+    assert len(tmpdir.listdir()) == cache.entries
@@ -1,3 +1,5 @@
+import subprocess
+import sys
 from click.testing import CliRunner
 from gitconsensus.gitconsensus import cli
 
@@ -6,3 +8,20 @@ def test_cli_command():
     result = runner.invoke(cli, ["get-repository"])
     assert result.exit_code == 2
 
+def test_cli_import_is_light():
+    modules = ['github3', 'requests', 'yaml', 'semantic_version', 'numpy']
+    script = 'import sys, gitconsensus.gitconsensus; print(",".join(m for m in %r if m in sys.modules))' % (modules,)
+    output = subprocess.check_output([sys.executable, '-c', script], universal_newlines=True)
+    assert output.strip() == ''
+
+    # simulate works offline, so it should not load the Github client either.
+    script = 'import sys, gitconsensus.simulation; print("github3" in sys.modules)'
+    output = subprocess.check_output([sys.executable, '-c', script], universal_newlines=True)
+    assert output.strip() == 'False'
+
+def test_apply_reports_bad_plans(tmpdir):
+    plan = tmpdir.join('plan.json')
+    plan.write('{"version":')
+    result = CliRunner().invoke(cli, ['apply', str(plan)])
+    assert result.exit_code == 1
+    assert result.output.startswith('Error: ')
@@ -0,0 +1,55 @@
+from gitconsensus.comments import CommentRenderer, max_comment_length
+from gitconsensus.votes import ABSTAIN, NO, VoteTally, YES
+
+
+def buildTally(voters, doubles=0):
+    tally = VoteTally()
+    for index in range(voters):
+        tally.add('voter-with-a-long-name-%s' % (index,), [YES, NO, ABSTAIN][index % 3])
+    for index in range(doubles):
+        tally.exclude('voter-with-a-long-name-%s' % (index,))
+    return tally
+
+
+def test_small_table_is_complete():
+    comment = CommentRenderer().render('merged', buildTally(3), True, True)
+    assert '| [voter-with-a-long-name-1](https://github.com/voter-with-a-long-name-1) |     | ✔ |    |' in comment
+    assert 'not listed' not in comment
+    assert comment.endswith('| Has Votes  | True     |\n\n')
+
+
+def test_large_table_fits_the_limit():
+    tally = buildTally(5000, doubles=2000)
+    comment = CommentRenderer().render('merged', tally, True, False)
+    assert len(comment) <= max_comment_length
+    # The totals still count every vote, and the table says how much of it was left out.
+    assert '| 1000  | 1000 | 1000      | 3000     |' in comment
+    assert 'more voters are not listed |' in comment
+    assert comment.count('](https://github.com/') < 5000
+    assert '| Has Votes  | False     |' in comment
+    assert comment.split(' and ')[-1].endswith(' more')
+
+
+def test_limit_is_exact():
+    tally = buildTally(50)
+    full = CommentRenderer().render('closed', tally, False, False)
+    assert CommentRenderer(len(full)).render('closed', tally, False, False) == full
+    shorter = CommentRenderer(len(full) - 1).render('closed', tally, False, False)
+    assert len(shorter) <= len(full) - 1
+    assert 'more voters are not listed' in shorter
+
+
+def test_votes_for_several_options_each_have_a_row():
+    # Without prevent_doubles, c's yes and no votes both count, so both get a row as they always have.
+    tally = VoteTally()
+    for username, option in [('a', YES), ('c', YES), ('b', NO), ('c', NO)]:
+        tally.add(username, option)
+    comment = CommentRenderer().render('merged', tally, True, True)
+    assert '| 2  | 2 | 0      | 4     |' in comment
+    rows = [line for line in comment.splitlines() if line.startswith('| [')]
+    assert rows == [
+        '| [a](https://github.com/a) | ✔ |    |    |',
+        '| [c](https://github.com/c) | ✔ | ✔ |    |',
+        '| [c](https://github.com/c) | ✔ | ✔ |    |',
+        '| [b](https://github.com/b) |     | ✔ |    |',
+    ]
@@ -0,0 +1,37 @@
+from gitconsensus.daemon import buildJobs, Scheduler
+
+
+class Job:
+    def __init__(self, name, interval, fail=False):
+        self.user, self.name = name.split('/')
+        self.interval = interval
+        self.fail = fail
+        self.runs = 0
+
+    def run(self, report=None):
+        self.runs += 1
+        if self.fail:
+            raise Exception('broken')
+
+
+def test_scheduler_runs_jobs_by_interval():
+    fast = Job('user/fast', 0)
+    slow = Job('user/slow', 3600)
+    broken = Job('user/broken', 0, fail=True)
+    messages = []
+    Scheduler([fast, slow, broken], report=messages.append, sleep=lambda delay: None).run(ticks=9)
+    assert slow.runs == 1
+    assert fast.runs == 4
+    assert broken.runs == 4
+    assert len(messages) == 4
+
+
+def test_build_jobs():
+    settings = {
+        'interval': 600,
+        'repositories': ['user/one', {'name': 'user/two', 'interval': 60, 'commands': ['merge']}]
+    }
+    jobs = buildJobs(settings, client=None)
+    assert [(job.user, job.name, job.interval) for job in jobs] == [('user', 'one', 600), ('user', 'two', 60)]
+    assert jobs[0].commands == ['merge', 'close']
+    assert jobs[1].commands == ['merge']
@@ -0,0 +1,25 @@
+import threading
+import time
+from gitconsensus.engine import Engine, parallelMap
+
+
+def test_parallel_map_keeps_order():
+    def slow(number):
+        time.sleep(0.01 * (5 - number))
+        return (number, threading.current_thread().name)
+    results = parallelMap(slow, range(5), workers=5)
+    assert [number for number, thread in results] == [0, 1, 2, 3, 4]
+    assert len(set(thread for number, thread in results)) > 1
+
+
+def test_engine_evaluates_in_pull_request_order():
+    class Request:
+        def __init__(self, number):
+            self.number = number
+
+    class Repository:
+        def getPullRequests(self, workers=1, executor=None):
+            return [Request(3), Request(1), Request(2)]
+
+    results = Engine(Repository(), workers=3).evaluate(lambda request: request.number * 10)
+    assert [(request.number, result) for request, result in results] == [(1, 10), (2, 20), (3, 30)]
@@ -0,0 +1,63 @@
+from github3.exceptions import ForbiddenError
+from gitconsensus.membership import MembershipIndex
+from gitconsensus.state import StateStore
+
+
+class FakeRepository:
+
+    def __init__(self, collaborators_allowed=True):
+        self.calls = []
+        self.collaborators_allowed = collaborators_allowed
+
+    def contributors(self):
+        self.calls.append('contributors')
+        return ['alice', 'bob']
+
+    def collaborators(self):
+        self.calls.append('collaborators')
+        if not self.collaborators_allowed:
+            class Response:
+                status_code = 403
+                headers = {}
+                content = b''
+                def json(self):
+                    return {'message': 'Must have push access'}
+            raise ForbiddenError(Response())
+        return ['alice']
+
+    def is_collaborator(self, username):
+        self.calls.append('is_collaborator %s' % (username,))
+        return username == 'carol'
+
+
+def test_members_are_loaded_in_bulk():
+    repository = FakeRepository()
+    members = MembershipIndex(repository, 'user/repo')
+    for username in ['alice', 'bob', 'dan'] * 10:
+        members.isContributor(username)
+        members.isCollaborator(username)
+    assert repository.calls == ['contributors', 'collaborators']
+    assert members.isCollaborator('alice')
+    assert not members.isCollaborator('bob')
+
+
+def test_collaborator_fallback():
+    repository = FakeRepository(collaborators_allowed=False)
+    members = MembershipIndex(repository, 'user/repo')
+    assert members.isCollaborator('carol')
+    assert members.isCollaborator('carol')
+    assert repository.calls == ['collaborators', 'is_collaborator carol']
+
+
+def test_members_are_persisted(tmpdir):
+    store = StateStore(str(tmpdir.join('state.sqlite')))
+    MembershipIndex(FakeRepository(), 'user/repo', store).isContributor('alice')
+
+    repository = FakeRepository()
+    members = MembershipIndex(repository, 'user/repo', store)
+    assert members.isContributor('bob')
+    assert repository.calls == []
+
+    expired = MembershipIndex(repository, 'user/repo', store, ttl=0)
+    assert expired.isContributor('bob')
+    assert repository.calls == ['contributors']
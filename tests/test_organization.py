@@ -0,0 +1,32 @@
+from benchmarks.fakegithub import FakeGithub, SyntheticRepository
+from gitconsensus.client import getClient
+from gitconsensus.organization import discoverRepositories, OrganizationScan
+from gitconsensus.ratelimit import RequestScheduler
+
+
+def buildOrganization():
+    return [
+        SyntheticRepository('org', 'configured', pulls=6, reactions=8, files=2, commits=2, seed=1),
+        SyntheticRepository('org', 'quiet', pulls=0),
+        SyntheticRepository('org', 'unconfigured', pulls=6, rules=False),
+        SyntheticRepository('other', 'configured', pulls=6),
+    ]
+
+
+def test_org_merge_skips_unconfigured_repositories():
+    with FakeGithub(buildOrganization()) as server:
+        client = getClient('token', scheduler=RequestScheduler(write_interval=0), url=server.url)
+        repositories = discoverRepositories(client, 'org')
+        assert [(name, open_pull_requests) for name, rules, open_pull_requests in repositories] == [('configured', 6), ('quiet', 0)]
+        assert repositories[0][1].quorum == 5
+
+        messages = []
+        OrganizationScan(client, 'org', workers=2, repository_workers=2).merge(messages.append)
+        state = server.getState()
+        requests = server.getRequests()
+
+    assert state['org/configured']['merged']
+    assert all('org/configured: ' in message for message in messages[1:])
+    assert state['org/unconfigured']['merged'] == [] and state['other/configured']['merged'] == []
+    # The rules came with the discovery query, so no repository was probed for them.
+    assert 'content' not in requests['endpoints']
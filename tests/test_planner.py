@@ -0,0 +1,124 @@
+from gitconsensus.planner import Executor, Planner
+
+
+class Label:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeIssue:
+    def __init__(self, labels, log):
+        self.original_labels = [Label(label) for label in labels]
+        self.log = log
+
+    def replace_labels(self, labels):
+        self.log.append(('labels', labels))
+
+    def create_comment(self, comment):
+        self.log.append(('comment', comment))
+
+
+class FakeGithubRepository:
+    def __init__(self, log):
+        self.log = log
+
+    def issue(self, number):
+        return FakeIssue(['WIP', 'Failing'], self.log)
+
+
+class FakeRepository:
+    user = 'user'
+    name = 'repo'
+
+    def __init__(self):
+        self.log = []
+        self.repository = FakeGithubRepository(self.log)
+        self.decisions = {}
+
+    def getFullName(self):
+        return 'user/repo'
+
+    def recordDecision(self, number, decision):
+        self.decisions[number] = decision
+
+    def mergePullRequest(self, number, sha=None):
+        self.log.append(('merge', number, sha))
+        return True
+
+    def closePullRequest(self, number):
+        self.log.append(('close', number))
+        return True
+
+
+class FakeRequest:
+    def __init__(self, number, valid):
+        self.number = number
+        self.valid = valid
+        self.head_sha = 'sha%s' % (number,)
+
+    def validate(self):
+        return self.valid
+
+    def getLabelChanges(self, action=None):
+        if action:
+            return ['gc-%s' % (action,)], ['Failing']
+        return ['Failing'], ['Passing']
+
+    def getLabelDiff(self, add, remove):
+        current = ['Failing']
+        return [label for label in add if label not in current], [label for label in remove if label in current]
+
+    def buildComment(self, action):
+        return 'This Pull Request has been %s' % (action,)
+
+
+class FakeEngine:
+    def __init__(self, repository):
+        self.repository = repository
+
+    def evaluate(self, check):
+        return [(request, check(request)) for request in [FakeRequest(1, True), FakeRequest(2, False)]]
+
+
+def test_plan_has_no_side_effects():
+    repository = FakeRepository()
+    plan = Planner(FakeEngine(repository)).planMerge()
+    assert repository.log == []
+    assert plan['repository'] == 'user/repo'
+    # The second pull request already has the right labels, so it needs no action.
+    assert plan['actions'] == [{
+        'number': 1,
+        'action': 'merge',
+        'head_sha': 'sha1',
+        'labels': {'add': ['gc-merged'], 'remove': ['Failing']},
+        'comment': 'This Pull Request has been merged',
+    }]
+
+
+def test_executor_applies_plan():
+    repository = FakeRepository()
+    plan = Planner(FakeEngine(repository)).planMerge()
+    assert Executor(repository).apply(plan) == [True]
+    assert repository.log == [
+        ('merge', 1, 'sha1'),
+        ('labels', ['WIP', 'gc-merged']),
+        ('comment', 'This Pull Request has been merged'),
+    ]
+    assert repository.decisions == {1: 'merged'}
+
+
+class FailingRepository(FakeRepository):
+
+    def closePullRequest(self, number):
+        self.log.append(('close', number))
+        return False
+
+
+def test_executor_stops_when_close_fails():
+    repository = FailingRepository()
+    action = {'number': 3, 'action': 'close', 'labels': {'add': ['gc-closed'], 'remove': []}, 'comment': 'Closed'}
+    messages = []
+    assert Executor(repository).applyAction(action, messages.append) is False
+    assert repository.log == [('close', 3)]
+    assert repository.decisions == {}
+    assert messages == ['Closing PR#3', 'Unable to close PR#3']
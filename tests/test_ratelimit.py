@@ -0,0 +1,67 @@
+import requests
+from gitconsensus.ratelimit import RateLimitAdapter, READ, RequestScheduler, WRITE
+from requests.adapters import BaseAdapter
+from requests.models import Response
+
+
+class SequenceAdapter(BaseAdapter):
+
+    def __init__(self, statuses):
+        super(SequenceAdapter, self).__init__()
+        self.statuses = statuses
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        response = Response()
+        response.status_code = self.statuses[min(self.sent, len(self.statuses) - 1)]
+        response.headers['X-RateLimit-Remaining'] = '4000'
+        response.headers['X-RateLimit-Reset'] = '0'
+        response._content = b'{}'
+        response._content_consumed = True
+        response.request = request
+        self.sent += 1
+        return response
+
+    def close(self):
+        pass
+
+
+def test_reads_are_paced_and_reserved_for_writes():
+    scheduler = RequestScheduler(write_reserve=10, clock=lambda: 1000.0)
+    scheduler.budgets['core'] = {'remaining': 110, 'limit': 5000, 'reset': 1100.0}
+    scheduler.last_read = 1000.0
+    assert scheduler.getDelay(READ) == 1.0
+    scheduler.budgets['core']['remaining'] = 10
+    assert scheduler.getDelay(READ) == 100.0
+    assert scheduler.getDelay(WRITE) == 0
+    scheduler.budgets['core']['remaining'] = None
+    assert scheduler.getDelay(READ) == 0
+
+
+def test_rate_limited_requests_are_retried():
+    transport = SequenceAdapter([429, 502, 200])
+    scheduler = RequestScheduler(backoff=0.001)
+    session = requests.Session()
+    session.mount('https://', RateLimitAdapter(scheduler, transport))
+    assert session.get('https://api.github.com/repos/a/b').status_code == 200
+    metrics = scheduler.getMetrics()
+    assert metrics['retries'] == 2
+    assert metrics['rate_limited'] == 1
+    assert metrics['requests'] == 3
+    assert metrics['core_remaining'] == 4000
+
+
+def test_writes_are_not_retried_on_server_errors():
+    transport = SequenceAdapter([502, 200])
+    session = requests.Session()
+    session.mount('https://', RateLimitAdapter(RequestScheduler(write_interval=0), transport))
+    assert session.post('https://api.github.com/repos/a/b/merges').status_code == 502
+
+
+def test_graphql_queries_are_reads():
+    transport = SequenceAdapter([200])
+    scheduler = RequestScheduler()
+    session = requests.Session()
+    session.mount('https://', RateLimitAdapter(scheduler, transport))
+    session.post('https://api.github.com/graphql', json={'query': 'query { viewer { login } }'})
+    assert scheduler.getMetrics()['reads'] == 1
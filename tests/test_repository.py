@@ -0,0 +1,188 @@
+import datetime
+from gitconsensus.repository import lazyproperty, PullRequest
+from gitconsensus.rules import compileRules
+from gitconsensus.votes import NO, VoteTally, YES
+
+
+class Counter:
+    calls = 0
+
+    @lazyproperty
+    def value(self):
+        self.calls += 1
+        return 'fetched'
+
+
+def test_lazyproperty_fetches_once():
+    counter = Counter()
+    assert counter.value == 'fetched'
+    assert counter.value == 'fetched'
+    assert counter.calls == 1
+
+
+def test_last_update_is_memoized():
+    request = PullRequest.__new__(PullRequest)
+    request.created_at = datetime.datetime.utcnow() - datetime.timedelta(hours=10)
+    request.last_commit_at = datetime.datetime.utcnow() - datetime.timedelta(hours=4)
+    assert round(request.hoursSinceLastUpdate()) == 4
+    assert round(request.hoursSincePullOpened()) == 10
+    request.last_commit_at = datetime.datetime.utcnow() - datetime.timedelta(hours=12)
+    # The latest activity time was computed once and is not recomputed.
+    assert round(request.hoursSinceLastUpdate()) == 4
+
+
+class Votes:
+    def __init__(self, yes, no):
+        self.yes = ['y%s' % (i,) for i in range(yes)]
+        self.no = ['n%s' % (i,) for i in range(no)]
+        self.users = self.yes + self.no
+        self.contributors_yes = []
+
+
+def test_is_decided():
+    from gitconsensus.repository import Consensus
+    consensus = Consensus(compileRules({'version': 3, 'pull_requests': {'quorum': 5, 'threshold': 0.5}}))
+    assert consensus.isDecided(Votes(10, 0), 5)
+    assert not consensus.isDecided(Votes(10, 0), 15)
+    assert not consensus.isDecided(Votes(2, 1), 2)
+    assert consensus.isDecided(Votes(2, 1), 1)
+    assert consensus.isDecided(Votes(0, 1), 0)
+
+    doubles = Consensus(compileRules({'version': 3, 'prevent_doubles': True, 'pull_requests': {'quorum': 5, 'threshold': 0.5}}))
+    assert not doubles.isDecided(Votes(6, 0), 2)
+    assert doubles.isDecided(Votes(8, 0), 2)
+
+
+def test_reactions_stop_early_and_complete_later():
+    from gitconsensus.repository import Consensus
+
+    class Repository:
+        rules = compileRules({'version': 3, 'pull_requests': {'quorum': 2, 'threshold': 0.25}})
+
+        def isContributor(self, username):
+            return False
+
+    pages_read = []
+
+    def pages():
+        for page in range(3):
+            pages_read.append(page)
+            users = ['user%s-%s' % (page, i) for i in range(2)]
+            yield [{'content': '+1', 'user': {'login': user}} for user in users], (2 - page) * 2
+
+    request = PullRequest.__new__(PullRequest)
+    request.repository = Repository()
+    request.consensus = Consensus(Repository.rules)
+    request.votes = VoteTally()
+    request.reaction_pages = pages()
+    request.readReactions()
+    assert pages_read == [0]
+    assert len(request.yes) == 2
+    request.completeVotes()
+    assert pages_read == [0, 1, 2]
+    assert len(request.yes) == 6
+
+
+def test_vote_tally():
+    tally = VoteTally()
+    tally.add('alice', YES, contributor=True)
+    tally.add('bob', YES)
+    tally.add('bob', NO)
+    tally.add('carol', NO, contributor=True)
+    assert len(tally.getVoters()) == 4
+    assert len(tally.getVoters(YES)) == 2
+    assert 'bob' in tally.getVoters(NO)
+    assert tally.getVoters(NO, contributors_only=True) == ['carol']
+
+    tally.exclude('bob')
+    assert len(tally.getVoters()) == 2
+    assert tally.getVoters(YES) == ['alice']
+    assert tally.isDouble('bob')
+    tally.exclude('carol')
+    assert len(tally.getVoters(NO, contributors_only=True)) == 0
+
+
+class FakeIssue:
+
+    def __init__(self):
+        self.writes = []
+
+    def replace_labels(self, labels):
+        self.writes.append(labels)
+
+
+def test_label_changes_are_written_once():
+    from gitconsensus.repository import Consensus
+
+    class Repository:
+        rules = compileRules({'version': 3, 'pull_requests': {'quorum': 1, 'threshold': 0.5}})
+
+    request = PullRequest.__new__(PullRequest)
+    request.repository = Repository()
+    request.consensus = Consensus(Repository.rules)
+    request.votes = VoteTally()
+    request.votes.add('alice', YES)
+    request.changes_license = False
+    request.changes_consensus = True
+    request.issue = FakeIssue()
+    request.labels = ['WIP', 'Failing', 'Needs Votes']
+
+    request.addInfoLabels()
+    assert request.issue.writes == [['WIP', 'Consensus Change', 'Has Quorum', 'Passing']]
+    assert request.labels == ['WIP', 'Consensus Change', 'Has Quorum', 'Passing']
+
+    # Nothing changed, so nothing is written.
+    request.addInfoLabels()
+    assert len(request.issue.writes) == 1
+
+    request.setLabels(*request.getLabelChanges('closed'))
+    assert request.issue.writes[-1] == ['WIP', 'Consensus Change', 'gc-closed']
+
+
+def test_changed_files_are_classified_lazily():
+    read = []
+
+    def files():
+        for filename in ['LICENSE', 'README.md', '.gitconsensus.yaml', 'setup.py']:
+            read.append(filename)
+            yield filename
+
+    request = PullRequest.__new__(PullRequest)
+    request.file_kinds = set()
+    request.changed_files = files()
+    assert read == []
+    assert request.changesLicense()
+    assert read == ['LICENSE']
+    assert request.changesConsensus()
+    assert read == ['LICENSE', 'README.md', '.gitconsensus.yaml']
+    assert request.changesLicense()
+    assert len(read) == 3
+
+
+def test_fields_come_from_fetched_data():
+    fetched = []
+
+    class Client:
+        def pull_request(self, user, name, number):
+            fetched.append(number)
+            return type('PullRequest', (), {'_json_data': {'mergeable': True}})()
+
+    class Repository:
+        user = 'user'
+        name = 'repo'
+        client = Client()
+
+    request = PullRequest.__new__(PullRequest)
+    request.repository = Repository()
+    request.number = 3
+    request.snapshot = None
+    request.data = {'state': 'open', 'head': {'sha': 'abc'}, 'created_at': '2019-05-15T15:20:33Z', 'mergeable': None,
+                    'labels': [{'name': 'WIP'}]}
+    assert request.state == 'open'
+    assert request.head_sha == 'abc'
+    assert request.created_at == datetime.datetime(2019, 5, 15, 15, 20, 33)
+    assert request.isBlocked()
+    assert fetched == []
+    # Github had not worked out whether it could be merged yet, so only this needs the full pull request.
+    assert request.isMergeable()
+    assert fetched == [3]
@@ -0,0 +1,105 @@
+import base64
+import json
+import os
+import pytest
+from benchmarks.fakegithub import FakeGithub, SyntheticRepository
+from gitconsensus import rules as rules_module
+from gitconsensus.client import getClient
+from gitconsensus.ratelimit import RequestScheduler
+from gitconsensus.repository import Consensus, Repository
+from gitconsensus.rules import compileRules, getRules
+from gitconsensus.state import StateStore
+
+
+def test_version_one_rules_are_migrated():
+    rules = compileRules({'quorum': 3, 'threshold': 65, 'mergedelay': 2, 'whitelist': ['alice'], 'locklicense': True})
+    assert rules.version == 3
+    assert rules.quorum == 3
+    assert rules.threshold == 0.65
+    assert rules.merge_delay == 48
+    assert rules.whitelist == frozenset(['alice'])
+    assert rules.license_lock is True
+    assert rules.timeout is None
+
+
+def test_disabled_rules_are_skipped():
+    rules = compileRules({'version': 3, 'pull_requests': {'quorum': 2, 'threshold': False, 'timeout': False}})
+    assert rules.threshold is None
+    assert rules.timeout is None
+    consensus = Consensus(rules)
+    assert [check.__name__ for check in consensus.checks] == ['isMergeable', 'hasQuorum', 'hasVotes']
+
+
+class Votes:
+    def __init__(self, yes, no):
+        self.yes = ['yes%s' % (index,) for index in range(yes)]
+        self.no = ['no%s' % (index,) for index in range(no)]
+
+
+def test_votes_are_needed_without_a_threshold():
+    # Version one configs are migrated with the threshold turned off.
+    consensus = Consensus(compileRules({'mergedelay': 1}))
+    assert 'hasVotes' in [check.__name__ for check in consensus.checks]
+    assert not consensus.hasVotes(Votes(0, 0))
+    assert consensus.hasVotes(Votes(0, 1))
+    assert consensus.hasVotes(Votes(2, 1))
+
+
+def test_rules_are_immutable_and_versioned():
+    rules = compileRules({'version': 3, 'pull_requests': {'quorum': 2}})
+    with pytest.raises(AttributeError):
+        rules.quorum = 5
+    assert rules.key == compileRules({'version': 3, 'pull_requests': {'quorum': 2}}).key
+    assert rules.key != compileRules({'version': 3, 'pull_requests': {'quorum': 3}}).key
+    assert compileRules({'version': 4}) is None
+
+
+def test_rules_are_cached_by_blob_sha(monkeypatch):
+    parsed = []
+    parseRules = rules_module.parseRules
+    monkeypatch.setattr(rules_module, 'parseRules', lambda text: parsed.append(text) or parseRules(text))
+    monkeypatch.setattr(rules_module, 'compiled_rules', {})
+    content = base64.b64encode(b'version: 3\npull_requests:\n  quorum: 4\n').decode('ascii')
+    first = getRules('abc123', content)
+    assert getRules('abc123', content) is first
+    assert first.quorum == 4
+    assert len(parsed) == 1
+
+
+def test_migrated_settings_compile_to_the_same_rules():
+    rules = compileRules({'quorum': 3, 'threshold': 65, 'mergedelay': 2, 'whitelist': ['bob', 'alice'], 'locklicense': True})
+    assert compileRules(rules.toSettings()).key == rules.key
+    assert compileRules(rules.toSettings()).toSettings() == rules.toSettings()
+
+
+def test_rules_are_restored_from_disk_without_parsing(tmpdir, monkeypatch):
+    parsed = []
+    parseRules = rules_module.parseRules
+    monkeypatch.setattr(rules_module, 'parseRules', lambda text: parsed.append(text) or parseRules(text))
+    monkeypatch.setattr(rules_module, 'compiled_rules', {})
+    cache_dir = str(tmpdir)
+
+    def connect(url):
+        # The cli keeps the response cache and the state store in the same directory.
+        client = getClient('token', cache_dir, scheduler=RequestScheduler(write_interval=0), url=url)
+        return Repository('bench', 'repository', client, StateStore(os.path.join(cache_dir, 'state.sqlite')))
+
+    with FakeGithub([SyntheticRepository('bench', 'repository', pulls=1)]) as server:
+        first = connect(server.url)
+        assert len(parsed) == 1
+
+        # A process started after the cached response went stale has only the disk to go on.
+        monkeypatch.setattr(rules_module, 'compiled_rules', {})
+        responses = os.path.join(cache_dir, 'responses')
+        for name in os.listdir(responses):
+            with open(os.path.join(responses, name)) as f:
+                entry = json.load(f)
+            entry['stored_at'] = 0
+            with open(os.path.join(responses, name), 'w') as f:
+                json.dump(entry, f)
+        second = connect(server.url)
+        requests = server.getRequests()
+
+    assert len(parsed) == 1
+    assert second.rules.key == first.rules.key
+    assert requests['not_modified'] == 1
@@ -0,0 +1,99 @@
+import github3
+import json
+from click.testing import CliRunner
+from gitconsensus.gitconsensus import cli
+from gitconsensus.rules import compileRules
+from gitconsensus.simulation import buildDataset, buildVariants, Dataset, parseVariation, Simulator
+from tests.replay import ReplayServer
+
+
+class FakeMembers:
+
+    def getMembers(self, kind):
+        return set(['alice']) if kind == 'contributors' else None
+
+
+class FakeRepository:
+    user = 'gitconsensus'
+    name = 'example'
+    rules = compileRules({'version': 3, 'pull_requests': {'quorum': 2, 'threshold': 0.5}})
+    members = FakeMembers()
+
+    def __init__(self, client):
+        self.client = client
+
+    def getFullName(self):
+        return 'gitconsensus/example'
+
+
+def test_build_dataset():
+    with ReplayServer('history') as server:
+        data = buildDataset(FakeRepository(github3.GitHubEnterprise(server.url)), limit=10)
+    assert server.requests[0][2]['variables']['first'] == 10
+    assert data['contributors'] == ['alice']
+    assert data['rules']['pull_requests']['quorum'] == 2
+    newest, oldest = data['pull_requests']
+    assert newest['state'] == 'open' and newest['changes_license'] and not newest['changes_consensus']
+    assert oldest['state'] == 'merged' and oldest['changes_consensus']
+    assert oldest['decided_at'] == '2018-01-03T00:00:00Z'
+    assert [reaction['user'] for reaction in oldest['reactions']] == ['alice', 'bob', 'carol']
+
+    dataset = Dataset(data)
+    assert dataset.outcomes == ['open', 'merged']
+    assert dataset.blocked == [True, False]
+    assert dataset.hours[1] == 24
+    # carol voted after the merge, so only the first two votes count.
+    assert dataset.reactions[1] == [('alice', '+1'), ('bob', '+1')]
+
+
+def buildData(count):
+    pull_requests = []
+    for number in range(1, count + 1):
+        pull_requests.append({
+            'number': number,
+            'state': ['merged', 'closed', 'open'][number % 3],
+            'created_at': '2018-01-01T00:00:00Z',
+            'last_commit_at': '2018-01-01T00:00:00Z',
+            'decided_at': '2018-01-%02dT00:00:00Z' % (2 + number % 20,),
+            'mergeable': True,
+            'labels': ['WIP'] if number % 7 == 0 else [],
+            'changes_license': number % 5 == 0,
+            'changes_consensus': False,
+            'reactions': [{'user': 'user%s' % (voter,), 'content': '+1' if (number + voter) % 4 else '-1'}
+                          for voter in range(number % 9)],
+        })
+    return {'version': 1, 'repository': 'user/repo', 'created_at': '2018-02-01T00:00:00Z',
+            'rules': {'version': 3, 'pull_requests': {'quorum': 3}}, 'contributors': ['user1', 'user2'],
+            'collaborators': None, 'pull_requests': pull_requests}
+
+
+def test_simulator_matches_consensus():
+    dataset = Dataset(buildData(200))
+    variations = [parseVariation('quorum=2,4,6'), parseVariation('threshold=0.5,0.8'),
+                  parseVariation('merge_delay=false,48'), parseVariation('timeout=false,240'),
+                  parseVariation('contributors_only=false,true')]
+    variants = [rules for description, rules in buildVariants(dataset.rules, variations)]
+    assert len(variants) == 48
+
+    scalar = Simulator(dataset, vectorized=False)
+    results = [scalar.simulate(rules) for rules in variants]
+    assert all(result['merged'] + result['closed'] + result['open'] == 200 for result in results)
+    assert len(scalar.pull_requests) == 2
+
+    vectorized = Simulator(dataset)
+    if vectorized.vectorized:
+        assert [vectorized.simulate(rules) for rules in variants] == results
+
+
+def test_simulate_command(tmpdir):
+    dataset_file = str(tmpdir.join('dataset.json'))
+    with open(dataset_file, 'w') as f:
+        json.dump(buildData(30), f)
+    result = CliRunner().invoke(cli, ['simulate', dataset_file, '--vary', 'quorum=1,3', '--json'])
+    assert result.exit_code == 0, result.output
+    results = json.loads(result.output)
+    assert [entry['rules'] for entry in results] == ['quorum=1', 'quorum=3']
+    assert results[0]['merged'] >= results[1]['merged']
+
+    result = CliRunner().invoke(cli, ['simulate', dataset_file, '--vary', 'quorom=1'])
+    assert result.exit_code != 0
@@ -0,0 +1,64 @@
+import datetime
+import github3
+from gitconsensus.repository import Consensus, PullRequest
+from gitconsensus.rules import compileRules
+from gitconsensus.snapshot import SnapshotLoader
+from tests.replay import ReplayServer
+
+rules = compileRules({
+    'version': 3,
+    'pull_requests': {
+        'quorum': 3,
+        'threshold': 0.65,
+        'license_lock': True,
+    }
+})
+
+
+class FakeRepository:
+    user = 'gitconsensus'
+    name = 'example'
+    rules = rules
+
+    def __init__(self, client):
+        self.client = client
+
+    def getConsensus(self):
+        return Consensus(self.rules)
+
+    def isContributor(self, username):
+        return username in ['alice', 'bob']
+
+
+def test_snapshot_loader():
+    with ReplayServer('snapshot') as server:
+        client = github3.GitHubEnterprise(server.url)
+        snapshots = SnapshotLoader(client, 'gitconsensus', 'example').load()
+
+        assert [snapshot.number for snapshot in snapshots] == [1, 2, 3]
+        assert [request[1] for request in server.requests] == ['/api/graphql'] * 3
+        assert server.requests[0][2]['variables'] == {'cursor': None, 'owner': 'gitconsensus', 'name': 'example'}
+        assert server.requests[1][2]['variables']['number'] == 1
+        assert server.requests[2][2]['variables']['cursor'] == 'p1'
+
+        first, second, third = snapshots
+        assert [reaction['user']['login'] for reaction in first.reactions] == ['alice', 'bob', 'carol', 'dan']
+        assert first.mergeable is True
+        assert second.mergeable is False
+        assert third.mergeable is None
+        assert second.files == ['LICENSE', '.gitconsensus.yaml']
+        assert first.last_commit_at == datetime.datetime(2018, 1, 2)
+
+        # Evaluation works entirely from the snapshot.
+        repository = FakeRepository(client)
+        requests = [PullRequest(repository, snapshot.number, snapshot) for snapshot in snapshots]
+        consensus = repository.getConsensus()
+        assert len(server.requests) == 3
+
+        assert requests[0].validate()
+        assert requests[0].contributors_yes == ['alice', 'bob']
+        assert not requests[1].validate()
+        assert requests[1].isBlocked()
+        assert not consensus.isAllowed(requests[1])
+        assert not consensus.isMergeable(requests[2])
+        assert len(server.requests) == 3
@@ -0,0 +1,52 @@
+import copy
+import json
+from gitconsensus.rules import compileRules
+from gitconsensus.snapshot import PullRequestSnapshot
+from gitconsensus.state import StateStore
+from tests.replay import fixture_dir
+
+nodes = json.load(open('%s/snapshot/01_pull_requests.json' % (fixture_dir,)))['data']['repository']['pullRequests']['nodes']
+rules = compileRules({'version': 3, 'pull_requests': {'quorum': 3}})
+
+
+def index(node):
+    node = copy.deepcopy(node)
+    for field in ['files', 'commits', 'reactions']:
+        del node[field]
+    return PullRequestSnapshot(node)
+
+
+def test_unchanged_pull_requests_are_restored(tmpdir):
+    store = StateStore(str(tmpdir.join('state.sqlite')))
+    store.save('user/repo', [PullRequestSnapshot(node) for node in nodes], rules)
+
+    snapshots = [index(node) for node in nodes]
+    assert not snapshots[0].isComplete()
+    assert store.restore('user/repo', snapshots, rules) == []
+    assert snapshots[0].isComplete()
+    assert snapshots[1].files == ['LICENSE', '.gitconsensus.yaml']
+    assert snapshots[0].last_commit_at == PullRequestSnapshot(nodes[0]).last_commit_at
+
+
+def test_changes_are_detected(tmpdir):
+    store = StateStore(str(tmpdir.join('state.sqlite')))
+    store.save('user/repo', [PullRequestSnapshot(node) for node in nodes], rules)
+
+    voted = copy.deepcopy(nodes[0])
+    voted['latestReaction']['nodes'] = [{'id': 'new-reaction'}]
+    pushed = copy.deepcopy(nodes[1])
+    pushed['headRefOid'] = 'f' * 40
+    assert [s.number for s in store.restore('user/repo', [index(voted), index(pushed)], rules)] == [1, 2]
+
+    other_rules = compileRules({'version': 3, 'pull_requests': {'quorum': 5}})
+    assert len(store.restore('user/repo', [index(node) for node in nodes], other_rules)) == 2
+
+
+def test_closed_pull_requests_are_forgotten(tmpdir):
+    store = StateStore(str(tmpdir.join('state.sqlite')))
+    store.save('user/repo', [PullRequestSnapshot(node) for node in nodes], rules)
+    store.recordDecision('user/repo', 1, 'pending')
+    assert store.getDecision('user/repo', 1) == 'pending'
+    store.save('user/repo', [], rules, open_numbers=set([1]))
+    assert store.getDecision('user/repo', 1) == 'pending'
+    assert len(store.restore('user/repo', [index(nodes[1])], rules)) == 1
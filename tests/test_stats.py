@@ -0,0 +1,71 @@
+import json
+from gitconsensus import stats as stats_module
+from gitconsensus.stats import getEndpoint, Stats, timedCheck
+
+
+def test_endpoint_classification():
+    assert getEndpoint('https://api.github.com/repos/a/b/issues/1/reactions?per_page=100') == 'reactions'
+    assert getEndpoint('https://api.github.com/repos/a/b/pulls/1/files') == 'files'
+    assert getEndpoint('https://api.github.com/repos/a/b/commits/abc') == 'commits'
+    assert getEndpoint('https://api.github.com/repos/a/b/issues/1/labels') == 'labels'
+    assert getEndpoint('https://api.github.com/repos/a/b/contents/.gitconsensus.yaml') == 'content'
+    assert getEndpoint('https://api.github.com/graphql') == 'graphql'
+    assert getEndpoint('https://api.github.com/repos/a/b') == 'other'
+
+
+def test_exports(tmpdir):
+    stats = Stats()
+    stats.recordRequest('reactions', 0.5, 100)
+    stats.recordRequest('reactions', 0.25, 50, cached=True)
+    stats.recordCheck('hasQuorum', 7, 0.01)
+    stats.recordCheck('hasQuorum', 8, 0.02)
+
+    summary = stats.getSummary()
+    assert summary['requests']['reactions'] == {'count': 2, 'cached': 1, 'errors': 0, 'seconds': 0.75, 'bytes': 150}
+    assert summary['checks']['hasQuorum']['slowest_pr'] == 8
+    assert 'reactions' in stats.formatSummary()
+
+    stats.write(str(tmpdir.join('stats.prom')))
+    assert 'gitconsensus_requests_total{endpoint="reactions"} 2' in tmpdir.join('stats.prom').read()
+    stats.write(str(tmpdir.join('stats.json')))
+    assert json.loads(tmpdir.join('stats.json').read())['pull_requests']['7'] == {'hasQuorum': 0.01}
+
+
+class Repository:
+    def __init__(self, name):
+        self.name = name
+
+    def getFullName(self):
+        return self.name
+
+
+class PullRequest:
+    def __init__(self, repository, number):
+        self.repository = Repository(repository)
+        self.number = number
+
+
+class Checks:
+    @timedCheck
+    def hasQuorum(self, pr):
+        return True
+
+
+def test_pull_requests_are_timed_per_repository(monkeypatch):
+    stats = Stats()
+    stats.enabled = True
+    monkeypatch.setattr(stats_module, 'collector', stats)
+    Checks().hasQuorum(PullRequest('a/one', 12))
+    Checks().hasQuorum(PullRequest('b/two', 12))
+    assert sorted(stats.getSummary()['pull_requests']) == ['a/one#12', 'b/two#12']
+    assert stats.getSummary()['checks']['hasQuorum']['count'] == 2
+
+
+def test_pull_request_timings_are_bounded(monkeypatch):
+    monkeypatch.setattr(stats_module, 'max_timed_pull_requests', 3)
+    stats = Stats()
+    for number in range(5):
+        stats.recordCheck('hasQuorum', 'a/one#%s' % (number,), 0.01)
+    stats.recordCheck('hasVotes', 'a/one#2', 0.01)
+    stats.recordCheck('hasQuorum', 'a/one#5', 0.01)
+    assert list(stats.getSummary()['pull_requests']) == ['a/one#4', 'a/one#2', 'a/one#5']
@@ -0,0 +1,57 @@
+import pytest
+from benchmarks.fakegithub import FakeGithub, SyntheticRepository
+from gitconsensus.client import getClient
+from gitconsensus.ratelimit import RequestScheduler
+from gitconsensus.repository import Repository
+from gitconsensus.stats import Stats
+from gitconsensus.transport import HttpxAdapter, PooledAdapter, Transport
+
+
+class StatsTransport(Transport):
+    """A transport that counts into its own collector, so tests do not share the global one."""
+
+    def __init__(self, stats, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = stats
+
+    def buildAdapter(self):
+        if self.backend == 'httpx':
+            return HttpxAdapter(self.pool_size, self.keep_alive, http2=False, stats=self.stats)
+        return PooledAdapter(self.pool_size, self.keep_alive, stats=self.stats)
+
+
+def fetchPullRequests(backend, keep_alive):
+    stats = Stats()
+    stats.enabled = True
+    transport = StatsTransport(stats, backend, pool_size=4, keep_alive=keep_alive, read_timeout=5)
+    with FakeGithub([SyntheticRepository('bench', 'repository', pulls=3, reactions=4)]) as server:
+        client = getClient('token', scheduler=RequestScheduler(write_interval=0), url=server.url, transport=transport)
+        assert client.session.timeout == (10, 5)
+        repository = Repository('bench', 'repository', client)
+        assert len(repository.getPullRequests()) == 3
+        received = server.getRequests()
+    transport = stats.getSummary()['transport']
+    # github3 calls, raw api requests for the rules and GraphQL queries all went through the one transport.
+    assert set(received['endpoints']) >= {'other', 'content', 'graphql'}
+    assert transport['requests'] == received['total']
+    return transport
+
+
+def test_keep_alive_reuses_connections():
+    transport = fetchPullRequests('urllib3', True)
+    assert transport['requests'] > 3
+    assert transport['connections'] == 1
+    assert transport['reused'] == transport['requests'] - 1
+
+
+def test_without_keep_alive_every_request_connects():
+    transport = fetchPullRequests('urllib3', False)
+    assert transport['connections'] == transport['requests']
+    assert transport['reused'] == 0
+
+
+def test_httpx_backend_reuses_connections():
+    pytest.importorskip('httpx')
+    transport = fetchPullRequests('httpx', True)
+    assert transport['requests'] > 3
+    assert transport['connections'] == 1
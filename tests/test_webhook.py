@@ -0,0 +1,140 @@
+import hashlib
+import hmac
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from gitconsensus.webhook import EventProcessor, parseEvent, TimerWheel, verifySignature, WebhookServer
+from tests.replay import fixture_dir
+
+secret = 'webhook-secret'
+
+
+def loadPayload(name):
+    with open(os.path.join(fixture_dir, 'webhooks', '%s.json' % (name,)), 'rb') as f:
+        return f.read()
+
+
+def sign(body, key=secret):
+    return 'sha256=%s' % (hmac.new(key.encode('utf-8'), body, hashlib.sha256).hexdigest(),)
+
+
+def test_verify_signature():
+    body = loadPayload('issue_comment_created')
+    assert verifySignature(secret, body, sign(body))
+    assert not verifySignature(secret, body, sign(body, 'other'))
+    assert not verifySignature(secret, body + b' ', sign(body))
+    assert not verifySignature(secret, body, None)
+    assert not verifySignature('', body, sign(body, ''))
+
+
+def test_parse_event():
+    assert parseEvent('pull_request', json.loads(loadPayload('pull_request_labeled'))) == ('gitconsensus/example', 12, False)
+    assert parseEvent('issue_comment', json.loads(loadPayload('issue_comment_created'))) == ('gitconsensus/example', 12, False)
+    assert parseEvent('push', json.loads(loadPayload('push_rules'))) == ('gitconsensus/example', None, True)
+    assert parseEvent('label', json.loads(loadPayload('label_deleted'))) == ('gitconsensus/example', None, False)
+
+    push = json.loads(loadPayload('push_rules'))
+    push['commits'][0]['modified'] = ['README.md']
+    assert parseEvent('push', push) is None
+    comment = json.loads(loadPayload('issue_comment_created'))
+    del comment['issue']['pull_request']
+    assert parseEvent('issue_comment', comment) is None
+    assert parseEvent('star', {'repository': {'full_name': 'gitconsensus/example'}}) is None
+
+
+def test_timer_wheel():
+    wheel = TimerWheel(resolution=60, size=8, now=0)
+    wheel.schedule('soon', 90)
+    wheel.schedule('later', 30 * 60)
+    wheel.schedule('moved', 100)
+    wheel.schedule('moved', 600)
+    wheel.schedule('cancelled', 100)
+    wheel.cancel('cancelled')
+    assert len(wheel) == 3
+    assert wheel.advance(100) == []
+    assert wheel.advance(120) == ['soon']
+    # Timers more than one rotation away stay in their slot until their round comes.
+    assert wheel.advance(900) == ['moved']
+    assert wheel.advance(1799) == []
+    assert wheel.advance(3600) == ['later']
+    assert len(wheel) == 0
+
+
+class Job:
+    user = 'gitconsensus'
+    name = 'example'
+    interval = 900
+
+
+class RecordingProcessor(EventProcessor):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.handled = []
+
+    def handle(self, name, number, reload=False, data=None):
+        self.handled.append((name, number, reload))
+        self.data = data
+
+
+def post(url, event, body, signature):
+    request = urllib.request.Request(url, data=body, headers={
+        'Content-Type': 'application/json',
+        'X-GitHub-Event': event,
+        'X-Hub-Signature-256': signature,
+    })
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+def test_server_queues_signed_events():
+    now = [0]
+    processor = RecordingProcessor([Job()], clock=lambda: now[0])
+    server = WebhookServer(('127.0.0.1', 0), secret, processor)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:%s/' % (server.server_address[1],)
+    try:
+        labeled = loadPayload('pull_request_labeled')
+        comment = loadPayload('issue_comment_created')
+        assert post(url, 'pull_request', labeled, sign(labeled)) == 202
+        assert post(url, 'issue_comment', comment, sign(comment)) == 202
+        assert post(url, 'issue_comment', comment, sign(comment, 'wrong')) == 401
+        assert post(url, 'ping', b'{"zen": "Keep it simple."}', sign(b'{"zen": "Keep it simple."}')) == 200
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # The startup sweep runs first and both events for pull request 12 are handled once.
+    assert processor.processOnce() == 2
+    assert processor.handled == [('gitconsensus/example', None, False), ('gitconsensus/example', 12, False)]
+    # The pull request payload is kept so it does not have to be fetched again.
+    assert processor.data['head']['sha'] == 'ec26c3e57ca3a959ca5aad62de7213c562f8c821'
+
+    processor.wheel.schedule(('gitconsensus/example', 12), 300)
+    now[0] = 400
+    processor.processOnce()
+    assert processor.handled[-1] == ('gitconsensus/example', 12, False)
+
+
+class FailingJob(Job):
+    interval = 300
+
+    def getRepository(self):
+        raise IOError('Github is down')
+
+
+def test_failed_sweep_is_retried():
+    now = [0]
+    messages = []
+    processor = EventProcessor([FailingJob()], messages.append, clock=lambda: now[0])
+    assert processor.processOnce() == 1
+    assert 'Github is down' in messages[0]
+    assert len(processor.wheel) == 1
+    now[0] = 400
+    assert processor.processOnce() == 1
+    assert len(messages) == 2